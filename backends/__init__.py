@@ -0,0 +1,52 @@
+"""
+Backends de armazenamento usados por database.py.
+
+Cada backend é um módulo com as mesmas funções assíncronas (listadas em
+FUNCOES). Elas devolvem dicts/listas de dicts e levantam exceção em caso de
+erro — o tratamento, o cache e a normalização ficam na fachada database.py.
+Todas recebem o user_id como primeiro argumento e só leem/alteram as linhas
+desse usuário.
+
+Seleção via variável de ambiente DB_BACKEND ("supabase" ou "sqlite").
+"""
+import importlib
+
+BACKENDS = {
+    "supabase": "backends.supabase_backend",
+    "sqlite": "backends.sqlite_backend",
+}
+
+FUNCOES = (
+    "get_listas",
+    "get_listas_pagina",
+    "get_lista_by_id",
+    "create_lista",
+    "update_lista",
+    "delete_lista",
+    "get_itens_lista",
+    "get_itens_pagina",
+    "get_nomes_itens",
+    "insert_itens",
+    "update_item",
+    "update_itens",
+    "delete_item",
+    "delete_itens",
+    "get_changes_since",
+    "registrar_compra",
+    "get_lista_por_chave_nfe",
+    "finalizar_compra",
+    "backfill_historico",
+    "get_historico_compras",
+    "get_totais_por_categoria",
+)
+
+
+def carregar_backend(nome: str):
+    """Importa o backend `nome` e confere se ele implementa toda a interface."""
+    if nome not in BACKENDS:
+        raise ValueError(f"DB_BACKEND inválido: {nome!r} (opções: {', '.join(BACKENDS)})")
+    modulo = importlib.import_module(BACKENDS[nome])
+    faltando = [f for f in FUNCOES if not callable(getattr(modulo, f, None))]
+    if faltando:
+        raise TypeError(f"Backend {nome!r} não implementa: {', '.join(faltando)}")
+    return modulo
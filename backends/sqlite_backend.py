@@ -0,0 +1,578 @@
+"""
+Backend SQLite embutido (modo offline, testes e benchmarks).
+
+O esquema é gerado a partir do schema.sql (tabelas e views, traduzidas do
+dialeto Postgres); as RPCs do Supabase são implementadas aqui em SQL local.
+Mesmas funções assíncronas do backend Supabase — sem RLS, o escopo por
+usuário vem só dos filtros user_id de cada consulta.
+"""
+import os
+import re
+import asyncio
+import sqlite3
+import threading
+from models import COLUNAS_LISTA, COLUNAS_ITEM, COLUNAS_HISTORICO
+
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "listacompras.db")
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schema.sql")
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+
+# Traduções Postgres → SQLite aplicadas em cada statement do schema.sql
+_TRADUCOES = [
+    (r"\bSERIAL PRIMARY KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (r"\bTIMESTAMPTZ\b", "TEXT"),
+    (r"\bNOW\(\)", "CURRENT_TIMESTAMP"),
+    (r"\bCREATE OR REPLACE VIEW\b", "CREATE VIEW IF NOT EXISTS"),
+    (r"::\w+", ""),
+]
+
+
+def schema_sqlite(caminho: str = SCHEMA_PATH) -> list[str]:
+    """Extrai os CREATE TABLE/VIEW/INDEX do schema.sql já no dialeto SQLite."""
+    with open(caminho, encoding="utf-8") as f:
+        sql = f.read()
+    sql = re.sub(r"--[^\n]*", "", sql)
+    # Funções plpgsql (RPCs) não existem no SQLite — implementadas em Python abaixo
+    sql = re.sub(r"CREATE OR REPLACE FUNCTION.*?\$\$.*?\$\$\s*;", "", sql, flags=re.S | re.I)
+    statements = []
+    for stmt in sql.split(";"):
+        stmt = stmt.strip()
+        if not re.match(r"CREATE\s+(TABLE|(OR REPLACE\s+)?VIEW|(UNIQUE\s+)?INDEX)", stmt, re.I):
+            continue
+        for padrao, troca in _TRADUCOES:
+            stmt = re.sub(padrao, troca, stmt, flags=re.I)
+        statements.append(stmt)
+    return statements
+
+
+# Mesmo formato (ISO 8601, UTC, milissegundos) usado nas marcas d'água
+_AGORA = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+# Equivalente local de migrations/0001_resumo_listas.sql (triggers por linha;
+# tombstones de 0003 não contam — a coluna é resolvida só quando o trigger
+# dispara, e 0003 roda na mesma transação).
+_RESUMO_COLUNAS = {
+    "total": "REAL NOT NULL DEFAULT 0",
+    "qtd_itens": "INTEGER NOT NULL DEFAULT 0",
+    "qtd_pendentes": "INTEGER NOT NULL DEFAULT 0",
+}
+_SOMAR = """
+        UPDATE listas SET total = total + {s} * COALESCE({r}.preco, 0) * ({r}.deleted_at IS NULL),
+            qtd_itens = qtd_itens + {s} * ({r}.deleted_at IS NULL),
+            qtd_pendentes = qtd_pendentes + {s} * ({r}.deleted_at IS NULL AND NOT COALESCE({r}.comprado, 0))
+        WHERE id = {r}.lista_id;"""
+_RESUMO_TRIGGERS = {
+    "itens_resumo_insert": f"AFTER INSERT ON itens_lista BEGIN {_SOMAR.format(s='+1', r='NEW')} END",
+    "itens_resumo_update": f"AFTER UPDATE ON itens_lista BEGIN {_SOMAR.format(s='-1', r='OLD')} {_SOMAR.format(s='+1', r='NEW')} END",
+    "itens_resumo_delete": f"AFTER DELETE ON itens_lista BEGIN {_SOMAR.format(s='-1', r='OLD')} END",
+}
+
+
+def _migrar_resumo_listas(conn: sqlite3.Connection):
+    existentes = {r["name"] for r in conn.execute("PRAGMA table_info(listas)")}
+    faltando = [c for c in _RESUMO_COLUNAS if c not in existentes]
+    for coluna in faltando:
+        conn.execute(f"ALTER TABLE listas ADD COLUMN {coluna} {_RESUMO_COLUNAS[coluna]}")
+    for nome, corpo in _RESUMO_TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {nome}")
+        conn.execute(f"CREATE TRIGGER {nome} {corpo}")
+    if faltando:
+        # Bancos anteriores a 0001 ainda não têm tombstones
+        conn.execute("""
+            UPDATE listas SET
+                total = (SELECT COALESCE(SUM(preco), 0) FROM itens_lista WHERE lista_id = listas.id),
+                qtd_itens = (SELECT COUNT(*) FROM itens_lista WHERE lista_id = listas.id),
+                qtd_pendentes = (SELECT COUNT(*) FROM itens_lista
+                                 WHERE lista_id = listas.id AND NOT COALESCE(comprado, 0))
+        """)
+
+
+# Equivalente local de migrations/0003_delta_sync.sql. ALTER TABLE no SQLite
+# não aceita default não constante: updated_at é carimbado por triggers.
+def _migrar_delta_sync(conn: sqlite3.Connection):
+    for tabela in ("listas", "itens_lista"):
+        existentes = {r["name"] for r in conn.execute(f"PRAGMA table_info({tabela})")}
+        novas = [c for c in ("updated_at", "deleted_at") if c not in existentes]
+        for coluna in novas:
+            conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} TEXT")
+        if "updated_at" in novas:
+            conn.execute(f"UPDATE {tabela} SET updated_at = {_AGORA}")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_updated_at_insert AFTER INSERT ON {tabela}
+            WHEN NEW.updated_at IS NULL
+            BEGIN UPDATE {tabela} SET updated_at = {_AGORA} WHERE id = NEW.id; END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_updated_at AFTER UPDATE ON {tabela}
+            WHEN NEW.updated_at IS OLD.updated_at
+            BEGIN UPDATE {tabela} SET updated_at = {_AGORA} WHERE id = NEW.id; END
+        """)
+    conn.execute("CREATE INDEX IF NOT EXISTS itens_lista_lista_updated_idx ON itens_lista (lista_id, updated_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS listas_updated_idx ON listas (updated_at)")
+
+
+# Equivalente local de migrations/0002_historico_compras.sql
+_HISTORICO_COLUNAS = {
+    "lista_id": "INTEGER REFERENCES listas(id) ON DELETE SET NULL",
+    "descricao": "TEXT",
+    "qtd_itens": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def _migrar_historico_compras(conn: sqlite3.Connection):
+    existentes = {r["name"] for r in conn.execute("PRAGMA table_info(historico_compras)")}
+    for coluna, tipo in _HISTORICO_COLUNAS.items():
+        if coluna not in existentes:
+            conn.execute(f"ALTER TABLE historico_compras ADD COLUMN {coluna} {tipo}")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS historico_compras_lista_id_key ON historico_compras (lista_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS historico_compras_data_idx ON historico_compras (data DESC)")
+
+
+# Equivalente local de migrations/0005_escopo_usuario.sql
+_INDICES_USUARIO = {
+    "listas_user_data_idx": "listas (user_id, data DESC, id DESC)",
+    "itens_lista_user_lista_idx": "itens_lista (user_id, lista_id, id DESC)",
+    "historico_compras_user_data_idx": "historico_compras (user_id, data DESC, id DESC)",
+}
+
+
+def _migrar_escopo_usuario(conn: sqlite3.Connection):
+    existentes = {r["name"] for r in conn.execute("PRAGMA table_info(listas)")}
+    if "user_id" not in existentes:
+        conn.execute("ALTER TABLE listas ADD COLUMN user_id TEXT")
+    for nome, alvo in _INDICES_USUARIO.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON {alvo}")
+
+
+# Equivalente local de migrations/0006_indices.sql (sem INCLUDE no SQLite:
+# as colunas extras entram na chave para a leitura sair só do índice)
+_INDICES_CONSULTAS = {
+    "itens_lista_user_comprados_categoria_idx":
+        "itens_lista (user_id, categoria, preco, lista_id) WHERE comprado = 1 AND deleted_at IS NULL",
+    "itens_lista_lista_comprados_idx":
+        "itens_lista (lista_id, preco) WHERE comprado = 1 AND deleted_at IS NULL",
+}
+
+
+def _migrar_indices(conn: sqlite3.Connection):
+    for nome, alvo in _INDICES_CONSULTAS.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON {alvo}")
+    conn.execute("ANALYZE")
+
+
+# Equivalente local de migrations/0007_chave_nfe.sql
+def _migrar_chave_nfe(conn: sqlite3.Connection):
+    existentes = {r["name"] for r in conn.execute("PRAGMA table_info(listas)")}
+    if "chave_nfe" not in existentes:
+        conn.execute("ALTER TABLE listas ADD COLUMN chave_nfe TEXT")
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS listas_user_chave_nfe_key ON listas (user_id, chave_nfe) "
+        "WHERE chave_nfe IS NOT NULL AND deleted_at IS NULL"
+    )
+
+
+# Equivalente local de migrations/0008_exclusao_lista.sql
+_TRIGGER_EXCLUSAO = """
+    CREATE TRIGGER IF NOT EXISTS listas_excluir_filhos AFTER UPDATE OF deleted_at ON listas
+    WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL
+    BEGIN
+        UPDATE itens_lista SET deleted_at = NEW.deleted_at WHERE lista_id = NEW.id AND deleted_at IS NULL;
+        DELETE FROM historico_compras WHERE lista_id = NEW.id;
+    END
+"""
+
+
+def _migrar_exclusao_lista(conn: sqlite3.Connection):
+    conn.execute(_TRIGGER_EXCLUSAO)
+    # Listas já excluídas antes do trigger
+    conn.execute("""
+        UPDATE itens_lista SET deleted_at = (SELECT deleted_at FROM listas WHERE id = itens_lista.lista_id)
+        WHERE deleted_at IS NULL
+          AND lista_id IN (SELECT id FROM listas WHERE deleted_at IS NOT NULL)
+    """)
+    conn.execute(
+        "DELETE FROM historico_compras WHERE lista_id IN (SELECT id FROM listas WHERE deleted_at IS NOT NULL)"
+    )
+
+
+# Equivalente local de migrations/0009_historico_atualizado.sql
+_RECALCULAR = """
+        UPDATE historico_compras SET
+            total = (SELECT COALESCE(SUM(preco), 0) FROM itens_lista
+                     WHERE lista_id = {r}.lista_id AND comprado = 1 AND deleted_at IS NULL),
+            qtd_itens = (SELECT COUNT(*) FROM itens_lista
+                         WHERE lista_id = {r}.lista_id AND comprado = 1 AND deleted_at IS NULL)
+        WHERE lista_id = {r}.lista_id;"""
+_HISTORICO_TRIGGERS = {
+    "itens_historico_insert": f"AFTER INSERT ON itens_lista BEGIN {_RECALCULAR.format(r='NEW')} END",
+    "itens_historico_update": (
+        "AFTER UPDATE OF preco, comprado, deleted_at, lista_id ON itens_lista "
+        f"BEGIN {_RECALCULAR.format(r='NEW')} {_RECALCULAR.format(r='OLD')} END"
+    ),
+    "itens_historico_delete": f"AFTER DELETE ON itens_lista BEGIN {_RECALCULAR.format(r='OLD')} END",
+    "listas_historico_update": """AFTER UPDATE OF nome, data, descricao ON listas BEGIN
+        UPDATE historico_compras SET mercado = NEW.nome, data = NEW.data, descricao = NEW.descricao
+        WHERE lista_id = NEW.id;
+    END""",
+}
+
+
+def _migrar_historico_atualizado(conn: sqlite3.Connection):
+    for nome, corpo in _HISTORICO_TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {nome}")
+        conn.execute(f"CREATE TRIGGER {nome} {corpo}")
+    # Rollups que já estavam defasados
+    conn.execute("""
+        UPDATE historico_compras SET
+            total = (SELECT COALESCE(SUM(i.preco), 0) FROM itens_lista i
+                     WHERE i.lista_id = historico_compras.lista_id AND i.comprado = 1 AND i.deleted_at IS NULL),
+            qtd_itens = (SELECT COUNT(*) FROM itens_lista i
+                         WHERE i.lista_id = historico_compras.lista_id AND i.comprado = 1 AND i.deleted_at IS NULL)
+        WHERE lista_id IS NOT NULL
+    """)
+    # Backfill de todos os usuários (o app não chama backfill_historico)
+    conn.execute("""
+        INSERT INTO historico_compras (lista_id, user_id, data, mercado, descricao, total, qtd_itens)
+        SELECT l.id, l.user_id, l.data, l.nome, l.descricao, COALESCE(SUM(i.preco), 0), COUNT(i.id)
+        FROM listas l
+        JOIN itens_lista i ON i.lista_id = l.id AND i.comprado = 1 AND i.deleted_at IS NULL
+        WHERE l.deleted_at IS NULL
+        GROUP BY l.id
+        ON CONFLICT (lista_id) DO NOTHING
+    """)
+
+
+# Equivalente local de migrations/0010_remover_historico_listas.sql
+def _migrar_remover_historico_listas(conn: sqlite3.Connection):
+    conn.execute("DROP VIEW IF EXISTS historico_listas")
+
+
+# Migrações versionadas: mesmos nomes de migrations/*.sql, aplicadas uma vez
+# cada e registradas em schema_migrations (ver migrar.py). Todas são
+# idempotentes — bancos criados antes do controle de versões as reaplicam
+# sem efeito.
+MIGRACOES = (
+    ("0001_resumo_listas", _migrar_resumo_listas),
+    ("0002_historico_compras", _migrar_historico_compras),
+    ("0003_delta_sync", _migrar_delta_sync),
+    ("0004_realtime", None),   # só no Supabase
+    ("0005_escopo_usuario", _migrar_escopo_usuario),
+    ("0006_indices", _migrar_indices),
+    ("0007_chave_nfe", _migrar_chave_nfe),
+    ("0008_exclusao_lista", _migrar_exclusao_lista),
+    ("0009_historico_atualizado", _migrar_historico_atualizado),
+    ("0010_remover_historico_listas", _migrar_remover_historico_listas),
+)
+
+
+def aplicar_migracoes(conn: sqlite3.Connection) -> list[str]:
+    """Aplica as migrações pendentes (dentro da transação de quem chama). Retorna as novas."""
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "versao TEXT PRIMARY KEY, aplicada_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+    aplicadas = {r[0] for r in conn.execute("SELECT versao FROM schema_migrations")}
+    novas = []
+    for versao, migrar in MIGRACOES:
+        if versao in aplicadas:
+            continue
+        if migrar:
+            migrar(conn)
+        conn.execute("INSERT INTO schema_migrations (versao) VALUES (?)", (versao,))
+        novas.append(versao)
+    return novas
+
+
+def adotar_sem_dono(conn: sqlite3.Connection, dono: str | None = None) -> int:
+    """
+    Linhas anteriores ao escopo por usuário (user_id NULL, invisíveis) passam
+    a ser de `dono` (padrão: APP_USER_ID). Sem dono, só avisa. Retorna as linhas adotadas.
+    """
+    dono = dono or os.environ.get("APP_USER_ID")
+    if not dono:
+        orfas = conn.execute("SELECT COUNT(*) FROM listas WHERE user_id IS NULL").fetchone()[0]
+        if orfas:
+            print(f"[DB] {orfas} lista(s) sem dono estão invisíveis: defina APP_USER_ID "
+                  "ou rode python migrar.py --sqlite <arquivo> --adotar <uuid>.")
+        return 0
+    return sum(
+        conn.execute(f"UPDATE {tabela} SET user_id = ? WHERE user_id IS NULL", (dono,)).rowcount
+        for tabela in ("listas", "itens_lista", "historico_compras")
+    )
+
+
+def conectar(caminho: str = None) -> sqlite3.Connection:
+    """Abre (ou cria) o banco SQLite, aplica o esquema e as migrações pendentes."""
+    global _conn
+    conn = sqlite3.connect(caminho or SQLITE_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    with conn:
+        for stmt in schema_sqlite():
+            conn.execute(stmt)
+        novas = aplicar_migracoes(conn)
+        adotar_sem_dono(conn)
+    if novas:
+        print(f"[DB] SQLite: migrações aplicadas: {', '.join(novas)}")
+    _conn = conn
+    return conn
+
+
+def _row(row: sqlite3.Row | None) -> dict | None:
+    if row is None:
+        return None
+    d = dict(row)
+    if "comprado" in d and d["comprado"] is not None:
+        d["comprado"] = bool(d["comprado"])
+    return d
+
+
+def _executar(fn):
+    """Roda `fn(conn)` numa thread, serializado pelo lock da conexão."""
+    def _run():
+        with _lock:
+            conn = _conn or conectar()
+            return fn(conn)
+    return asyncio.to_thread(_run)
+
+
+def _consultar(sql: str, params: tuple = ()):
+    return _executar(lambda c: [_row(r) for r in c.execute(sql, params).fetchall()])
+
+
+def _insert(conn, tabela: str, dados: dict) -> dict:
+    colunas = ", ".join(dados)
+    marcadores = ", ".join("?" for _ in dados)
+    cur = conn.execute(f"INSERT INTO {tabela} ({colunas}) VALUES ({marcadores})", tuple(dados.values()))
+    return _row(conn.execute(f"SELECT * FROM {tabela} WHERE id = ?", (cur.lastrowid,)).fetchone())
+
+
+def _update(conn, tabela: str, user_id: str, registro_id: int, dados: dict) -> int:
+    sets = ", ".join(f"{c} = ?" for c in dados)
+    cur = conn.execute(
+        f"UPDATE {tabela} SET {sets} WHERE id = ? AND user_id = ?", (*dados.values(), registro_id, user_id)
+    )
+    return cur.rowcount
+
+# ─────────────────────────────────────────────────
+# LISTAS
+# ─────────────────────────────────────────────────
+
+_LISTAS_ATIVAS = f"SELECT {COLUNAS_LISTA} FROM listas WHERE user_id = ? AND deleted_at IS NULL"
+
+async def get_listas(user_id: str):
+    return await _consultar(f"{_LISTAS_ATIVAS} ORDER BY data DESC", (user_id,))
+
+async def get_listas_pagina(user_id: str, limite: int, cursor: tuple | None = None):
+    if cursor:
+        data, lid = cursor
+        return await _consultar(
+            f"{_LISTAS_ATIVAS} AND (data < ? OR (data = ? AND id < ?)) ORDER BY data DESC, id DESC LIMIT ?",
+            (user_id, data, data, lid, limite),
+        )
+    return await _consultar(f"{_LISTAS_ATIVAS} ORDER BY data DESC, id DESC LIMIT ?", (user_id, limite))
+
+async def get_lista_by_id(user_id: str, lista_id: int):
+    rows = await _consultar(f"{_LISTAS_ATIVAS} AND id = ?", (user_id, lista_id))
+    return rows[0] if rows else None
+
+async def create_lista(user_id: str, payload: dict):
+    def _run(conn):
+        with conn:
+            return _insert(conn, "listas", {**payload, "user_id": user_id})
+    return await _executar(_run)
+
+async def update_lista(user_id: str, lista_id: int, dados: dict):
+    def _run(conn):
+        with conn:
+            _update(conn, "listas", user_id, lista_id, dados)
+    await _executar(_run)
+
+async def delete_lista(user_id: str, lista_id: int):
+    def _run(conn):
+        with conn:
+            conn.execute(
+                f"UPDATE listas SET deleted_at = {_AGORA} WHERE id = ? AND user_id = ?", (lista_id, user_id)
+            )
+    await _executar(_run)
+
+# ─────────────────────────────────────────────────
+# ITENS
+# ─────────────────────────────────────────────────
+
+_ITENS_ATIVOS = f"SELECT {COLUNAS_ITEM} FROM itens_lista WHERE user_id = ? AND lista_id = ? AND deleted_at IS NULL"
+
+async def get_itens_lista(user_id: str, lista_id: int):
+    return await _consultar(f"{_ITENS_ATIVOS} ORDER BY id DESC", (user_id, lista_id))
+
+async def get_itens_pagina(user_id: str, lista_id: int, limite: int, cursor: int | None = None):
+    if cursor is not None:
+        return await _consultar(
+            f"{_ITENS_ATIVOS} AND id < ? ORDER BY id DESC LIMIT ?", (user_id, lista_id, cursor, limite)
+        )
+    return await _consultar(f"{_ITENS_ATIVOS} ORDER BY id DESC LIMIT ?", (user_id, lista_id, limite))
+
+async def get_nomes_itens(user_id: str):
+    return await _consultar("SELECT id, nome FROM itens_lista WHERE user_id = ? AND deleted_at IS NULL", (user_id,))
+
+async def insert_itens(user_id: str, linhas: list):
+    def _run(conn):
+        with conn:
+            return [_insert(conn, "itens_lista", {**linha, "user_id": user_id}) for linha in linhas]
+    return await _executar(_run)
+
+async def update_item(user_id: str, item_id: int, dados: dict):
+    def _run(conn):
+        with conn:
+            return _update(conn, "itens_lista", user_id, item_id, dados) > 0
+    return await _executar(_run)
+
+async def update_itens(user_id: str, ids: list, dados: dict):
+    def _run(conn):
+        sets = ", ".join(f"{c} = ?" for c in dados)
+        marcadores = ", ".join("?" for _ in ids)
+        with conn:
+            cur = conn.execute(
+                f"UPDATE itens_lista SET {sets} WHERE user_id = ? AND id IN ({marcadores})",
+                (*dados.values(), user_id, *ids),
+            )
+            return cur.rowcount
+    return await _executar(_run)
+
+async def delete_item(user_id: str, item_id: int):
+    def _run(conn):
+        with conn:
+            conn.execute(
+                f"UPDATE itens_lista SET deleted_at = {_AGORA} WHERE id = ? AND user_id = ?", (item_id, user_id)
+            )
+    await _executar(_run)
+
+async def delete_itens(user_id: str, ids: list):
+    def _run(conn):
+        marcadores = ", ".join("?" for _ in ids)
+        with conn:
+            return conn.execute(
+                f"UPDATE itens_lista SET deleted_at = {_AGORA} WHERE user_id = ? AND id IN ({marcadores})",
+                (user_id, *ids),
+            ).rowcount
+    return await _executar(_run)
+
+async def get_changes_since(user_id: str, lista_id: int, desde: str):
+    return await _consultar(
+        f"SELECT {COLUNAS_ITEM}, deleted_at FROM itens_lista "
+        "WHERE user_id = ? AND lista_id = ? AND updated_at > strftime('%Y-%m-%dT%H:%M:%fZ', ?) ORDER BY updated_at",
+        (user_id, lista_id, desde),
+    )
+
+# ─────────────────────────────────────────────────
+# NF-e / HISTÓRICO
+# ─────────────────────────────────────────────────
+
+async def get_lista_por_chave_nfe(user_id: str, chave: str):
+    rows = await _consultar(f"{_LISTAS_ATIVAS} AND chave_nfe = ?", (user_id, chave))
+    return rows[0] if rows else None
+
+async def registrar_compra(user_id: str, nome: str, descricao: str, data: str, itens: list,
+                           chave_nfe: str | None = None):
+    """Equivalente local da RPC `registrar_compra_nfe` (uma transação)."""
+    def _run(conn):
+        with conn:
+            if chave_nfe:
+                # Nota já importada: devolve a lista existente (o lock serializa as leituras)
+                existente = conn.execute(
+                    "SELECT * FROM listas WHERE user_id = ? AND chave_nfe = ? AND deleted_at IS NULL",
+                    (user_id, chave_nfe),
+                ).fetchone()
+                if existente:
+                    return _row(existente)
+            lista = _insert(conn, "listas", {
+                "nome": nome, "descricao": descricao, "data": data, "user_id": user_id, "chave_nfe": chave_nfe,
+            })
+            for item in itens:
+                _insert(conn, "itens_lista", {**item, "lista_id": lista["id"], "user_id": user_id})
+            _finalizar(conn, user_id, lista["id"])
+            # relê a lista com o resumo já atualizado pelos triggers
+            return _row(conn.execute("SELECT * FROM listas WHERE id = ?", (lista["id"],)).fetchone())
+    return await _executar(_run)
+
+# Soma dos itens comprados de cada lista, no formato de historico_compras
+_SQL_ROLLUP = """
+    SELECT l.id, l.user_id, l.data, l.nome, l.descricao, COALESCE(SUM(i.preco), 0), COUNT(i.id)
+    FROM listas l
+    {juncao} itens_lista i ON i.lista_id = l.id AND i.comprado = 1 AND i.deleted_at IS NULL
+    WHERE l.user_id = ? AND {filtro}
+    GROUP BY l.id
+"""
+_INSERT_ROLLUP = "INSERT INTO historico_compras (lista_id, user_id, data, mercado, descricao, total, qtd_itens) "
+
+def _finalizar(conn, user_id: str, lista_id: int):
+    conn.execute(
+        _INSERT_ROLLUP
+        + _SQL_ROLLUP.format(juncao="LEFT JOIN", filtro="l.id = ? AND l.deleted_at IS NULL")
+        + """
+        ON CONFLICT (lista_id) DO UPDATE SET
+            data = excluded.data, mercado = excluded.mercado, descricao = excluded.descricao,
+            total = excluded.total, qtd_itens = excluded.qtd_itens
+        """,
+        (user_id, lista_id),
+    )
+    return _row(conn.execute(
+        f"SELECT {COLUNAS_HISTORICO} FROM historico_compras WHERE lista_id = ? AND user_id = ?", (lista_id, user_id)
+    ).fetchone())
+
+async def finalizar_compra(user_id: str, lista_id: int):
+    """Equivalente local da RPC `finalizar_compra`."""
+    def _run(conn):
+        with conn:
+            return _finalizar(conn, user_id, lista_id)
+    return await _executar(_run)
+
+async def backfill_historico(user_id: str):
+    """Equivalente local da RPC `backfill_historico_compras`."""
+    def _run(conn):
+        with conn:
+            return conn.execute(
+                _INSERT_ROLLUP
+                + _SQL_ROLLUP.format(juncao="JOIN", filtro="l.deleted_at IS NULL")
+                + " ON CONFLICT (lista_id) DO NOTHING",
+                (user_id,),
+            ).rowcount
+    return await _executar(_run)
+
+def _janela(coluna: str, inicio: str | None, fim: str | None):
+    """Cláusulas AND opcionais de intervalo de datas."""
+    sql, params = "", []
+    if inicio:
+        sql += f" AND {coluna} >= ?"
+        params.append(inicio)
+    if fim:
+        sql += f" AND {coluna} <= ?"
+        params.append(fim)
+    return sql, params
+
+async def get_historico_compras(user_id: str, inicio: str | None = None, fim: str | None = None):
+    filtro, params = _janela("data", inicio, fim)
+    return await _consultar(
+        f"SELECT {COLUNAS_HISTORICO} FROM historico_compras WHERE user_id = ?{filtro} ORDER BY data DESC, id DESC",
+        (user_id, *params),
+    )
+
+async def get_totais_por_categoria(user_id: str, inicio: str | None = None, fim: str | None = None):
+    filtro, params = _janela("l.data", inicio, fim)
+    return await _consultar(
+        f"""
+        SELECT COALESCE(i.categoria, 'Outros') AS categoria,
+               COALESCE(SUM(i.preco), 0) AS total,
+               COUNT(*) AS qtd_itens
+        FROM itens_lista i
+        JOIN listas l ON l.id = i.lista_id
+        WHERE i.user_id = ? AND l.user_id = ?
+          AND i.comprado = 1 AND i.deleted_at IS NULL AND l.deleted_at IS NULL{filtro}
+        GROUP BY 1
+        ORDER BY total DESC
+        """,
+        (user_id, user_id, *params),
+    )
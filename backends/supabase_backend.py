@@ -0,0 +1,269 @@
+"""
+Backend Supabase (PostgREST hospedado).
+
+Cliente assíncrono nativo: todas as sessões Flet compartilham um único
+httpx.AsyncClient com pool de conexões keep-alive (HTTP/2 quando o pacote
+h2 está instalado) — nenhuma thread do executor fica presa por requisição.
+
+Funções assíncronas de acesso a dados; erros sobem como exceção e são
+tratados pela fachada em database.py. Toda consulta filtra por user_id —
+esse filtro é o que isola os usuários. O cabeçalho x-user-id alimenta as
+RPCs e as políticas de RLS, mas é escolhido pelo cliente: não é controle de
+acesso (migrations/0005_escopo_usuario.sql). Use a chave service_role, que
+fica só neste processo.
+"""
+import os
+import asyncio
+import functools
+from datetime import datetime, timezone
+import httpx
+from postgrest import AsyncPostgrestClient
+from metrics import registrar_bytes
+from models import COLUNAS_LISTA, COLUNAS_ITEM, COLUNAS_HISTORICO
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "")
+
+# Limites do pool e prazo por chamada (segundos)
+DB_TIMEOUT = float(os.environ.get("DB_TIMEOUT", "10"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "20"))
+DB_POOL_KEEPALIVE = int(os.environ.get("DB_POOL_KEEPALIVE", "20"))
+DB_HTTP2 = os.environ.get("DB_HTTP2", "1") == "1"
+
+try:
+    import h2  # noqa: F401 — habilita HTTP/2 no httpx
+except ImportError:
+    DB_HTTP2 = False
+
+
+async def _contar_bytes(resposta: httpx.Response):
+    """Hook de resposta: bytes recebidos entram nas métricas da operação em andamento."""
+    await resposta.aread()
+    registrar_bytes(len(resposta.content))
+
+
+def _criar_cliente() -> AsyncPostgrestClient:
+    """Um único httpx.AsyncClient (pool keep-alive) para todas as sessões."""
+    http = httpx.AsyncClient(
+        base_url=f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+        timeout=httpx.Timeout(DB_TIMEOUT, connect=min(DB_TIMEOUT, 5.0)),
+        limits=httpx.Limits(
+            max_connections=DB_POOL_MAX,
+            max_keepalive_connections=DB_POOL_KEEPALIVE,
+        ),
+        http2=DB_HTTP2,
+        follow_redirects=True,
+        event_hooks={"response": [_contar_bytes]},
+    )
+    return AsyncPostgrestClient(
+        f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+        headers=_HEADERS,
+        http_client=http,
+    )
+
+
+_HEADERS = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
+
+supabase = _criar_cliente() if SUPABASE_URL and SUPABASE_KEY else None
+
+
+@functools.lru_cache(maxsize=1024)
+def _cliente_usuario(user_id: str) -> AsyncPostgrestClient:
+    """Cliente leve por usuário: mesmo pool httpx, com o cabeçalho x-user-id (app_user_id() nas RPCs)."""
+    return AsyncPostgrestClient(
+        f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+        headers={**_HEADERS, "x-user-id": user_id},
+        http_client=supabase.session,
+    )
+
+
+def _client(user_id: str) -> AsyncPostgrestClient:
+    if not supabase:
+        raise RuntimeError("Supabase não configurado (SUPABASE_URL/SUPABASE_KEY)")
+    if not isinstance(supabase, AsyncPostgrestClient):
+        return supabase   # cliente substituto (benchmarks)
+    return _cliente_usuario(user_id)
+
+
+async def _exec(query):
+    """Executa a query com prazo total de DB_TIMEOUT segundos."""
+    return await asyncio.wait_for(query.execute(), DB_TIMEOUT)
+
+
+def _tombstone() -> dict:
+    """Exclusão lógica: o updated_at é carimbado pelo trigger no servidor."""
+    return {"deleted_at": datetime.now(timezone.utc).isoformat()}
+
+# ─────────────────────────────────────────────────
+# LISTAS
+# ─────────────────────────────────────────────────
+
+def _listas(user_id: str):
+    return _client(user_id).table("listas").select(COLUNAS_LISTA).eq("user_id", user_id).is_("deleted_at", "null")
+
+async def get_listas(user_id: str):
+    res = await _exec(
+        _listas(user_id).order("data", desc=True)
+    )
+    return res.data or []
+
+async def get_listas_pagina(user_id: str, limite: int, cursor: tuple | None = None):
+    """Página de listas por keyset (data desc, id desc); cursor = (data, id) da última linha."""
+    q = _listas(user_id).order("data", desc=True).order("id", desc=True)
+    if cursor:
+        data, lid = cursor
+        q = q.or_(f"data.lt.{data},and(data.eq.{data},id.lt.{lid})")
+    res = await _exec(q.limit(limite))
+    return res.data or []
+
+async def get_lista_by_id(user_id: str, lista_id: int):
+    res = await _exec(
+        _listas(user_id).eq("id", lista_id).single()
+    )
+    return res.data
+
+async def create_lista(user_id: str, payload: dict):
+    res = await _exec(
+        _client(user_id).table("listas").insert({**payload, "user_id": user_id})
+    )
+    return res.data[0] if res.data else None
+
+async def update_lista(user_id: str, lista_id: int, dados: dict):
+    await _exec(
+        _client(user_id).table("listas").update(dados).eq("id", lista_id).eq("user_id", user_id)
+    )
+
+async def delete_lista(user_id: str, lista_id: int):
+    await _exec(
+        _client(user_id).table("listas").update(_tombstone()).eq("id", lista_id).eq("user_id", user_id)
+    )
+
+# ─────────────────────────────────────────────────
+# ITENS
+# ─────────────────────────────────────────────────
+
+def _itens(user_id: str, colunas: str = COLUNAS_ITEM):
+    return _client(user_id).table("itens_lista").select(colunas).eq("user_id", user_id)
+
+async def get_itens_lista(user_id: str, lista_id: int):
+    res = await _exec(
+        _itens(user_id)
+            .eq("lista_id", lista_id)
+            .is_("deleted_at", "null")
+            .order("id", desc=True)
+    )
+    return res.data or []
+
+async def get_itens_pagina(user_id: str, lista_id: int, limite: int, cursor: int | None = None):
+    """Página de itens por keyset (id desc); cursor = id do último item recebido."""
+    q = _itens(user_id).eq("lista_id", lista_id).is_("deleted_at", "null")
+    if cursor is not None:
+        q = q.lt("id", cursor)
+    res = await _exec(q.order("id", desc=True).limit(limite))
+    return res.data or []
+
+async def get_nomes_itens(user_id: str):
+    res = await _exec(
+        _itens(user_id, "id, nome").is_("deleted_at", "null")
+    )
+    return res.data or []
+
+async def insert_itens(user_id: str, linhas: list):
+    res = await _exec(
+        _client(user_id).table("itens_lista").insert([{**linha, "user_id": user_id} for linha in linhas])
+    )
+    return res.data or []
+
+async def update_item(user_id: str, item_id: int, dados: dict):
+    res = await _exec(
+        _client(user_id).table("itens_lista").update(dados).eq("id", item_id).eq("user_id", user_id)
+    )
+    return len(res.data) > 0
+
+async def update_itens(user_id: str, ids: list, dados: dict):
+    res = await _exec(
+        _client(user_id).table("itens_lista").update(dados).in_("id", ids).eq("user_id", user_id)
+    )
+    return len(res.data or [])
+
+async def delete_item(user_id: str, item_id: int):
+    await _exec(
+        _client(user_id).table("itens_lista").update(_tombstone()).eq("id", item_id).eq("user_id", user_id)
+    )
+
+async def delete_itens(user_id: str, ids: list):
+    res = await _exec(
+        _client(user_id).table("itens_lista").update(_tombstone()).in_("id", ids).eq("user_id", user_id)
+    )
+    return len(res.data or [])
+
+async def get_changes_since(user_id: str, lista_id: int, desde: str):
+    """Itens da lista alterados (ou excluídos) depois de `desde`, em ordem de updated_at."""
+    res = await _exec(
+        _itens(user_id, f"{COLUNAS_ITEM}, deleted_at")
+            .eq("lista_id", lista_id)
+            .gt("updated_at", desde)
+            .order("updated_at")
+    )
+    return res.data or []
+
+# ─────────────────────────────────────────────────
+# NF-e / HISTÓRICO
+# ─────────────────────────────────────────────────
+# As RPCs leem o usuário do cabeçalho x-user-id (app_user_id() no servidor).
+
+async def get_lista_por_chave_nfe(user_id: str, chave: str):
+    res = await _exec(
+        _listas(user_id).eq("chave_nfe", chave).limit(1)
+    )
+    return res.data[0] if res.data else None
+
+async def registrar_compra(user_id: str, nome: str, descricao: str, data: str, itens: list,
+                           chave_nfe: str | None = None):
+    """
+    Lista + itens numa transação via RPC `registrar_compra_nfe`. Com a chave
+    de acesso, uma nota já importada devolve a lista existente (0007_chave_nfe).
+    """
+    params = {"p_nome": nome, "p_descricao": descricao, "p_data": data, "p_itens": itens}
+    if chave_nfe:
+        params["p_chave_nfe"] = chave_nfe
+    res = await _exec(
+        _client(user_id).rpc("registrar_compra_nfe", params)
+    )
+    lista = res.data
+    if isinstance(lista, list):
+        lista = lista[0] if lista else None
+    return lista or None
+
+async def finalizar_compra(user_id: str, lista_id: int):
+    """Grava (ou atualiza) o rollup da lista em historico_compras via RPC."""
+    res = await _exec(
+        _client(user_id).rpc("finalizar_compra", {"p_lista_id": lista_id})
+    )
+    linha = res.data
+    if isinstance(linha, list):
+        linha = linha[0] if linha else None
+    return linha or None
+
+async def backfill_historico(user_id: str):
+    res = await _exec(
+        _client(user_id).rpc("backfill_historico_compras", {})
+    )
+    return int(res.data or 0)
+
+async def get_historico_compras(user_id: str, inicio: str | None = None, fim: str | None = None):
+    q = _client(user_id).table("historico_compras").select(COLUNAS_HISTORICO).eq("user_id", user_id)
+    if inicio:
+        q = q.gte("data", inicio)
+    if fim:
+        q = q.lte("data", fim)
+    res = await _exec(q.order("data", desc=True).order("id", desc=True))
+    return res.data or []
+
+async def get_totais_por_categoria(user_id: str, inicio: str | None = None, fim: str | None = None):
+    """Agregado no servidor pela RPC `totais_por_categoria`."""
+    params = {"p_inicio": inicio, "p_fim": fim}
+    res = await _exec(
+        _client(user_id).rpc("totais_por_categoria", params)
+    )
+    return res.data or []
@@ -0,0 +1,69 @@
+"""
+Benchmark: mesmas operações de database.py no SQLite local e no Supabase.
+
+Uso:
+    python benchmarks/bench_backends.py [repeticoes]
+
+O SQLite (arquivo temporário) serve de linha de base: a diferença para o
+Supabase é o custo das idas e voltas pela rede. O Supabase só é medido se
+SUPABASE_URL/SUPABASE_KEY estiverem configurados (cria e apaga uma lista).
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SNAPSHOT", "0")   # não grava snapshots das telas em disco
+
+import database  # noqa: E402
+from backends import sqlite_backend  # noqa: E402
+
+
+async def cronometrar(coro_fn, repeticoes):
+    t0 = time.perf_counter()
+    for _ in range(repeticoes):
+        await coro_fn()
+    return (time.perf_counter() - t0) / repeticoes * 1000
+
+
+async def medir_backend(nome, repeticoes):
+    database.usar_backend(nome)
+    database.CACHE_TTL = 0  # mede o backend, não o cache
+    user_id = str(uuid.uuid4())
+    lista = await database.create_lista("bench", "benchmark de backends", user_id=user_id)
+    if not lista:
+        print(f"{nome}: não foi possível criar lista de teste")
+        return
+    itens = [{"nome": f"Item {i}", "preco": 1.0, "categoria": "Mercado"} for i in range(50)]
+    try:
+        resultados = {
+            "insert_items_bulk(50)": await cronometrar(
+                lambda: database.insert_items_bulk(lista.id, itens, user_id=user_id), 1),
+            "get_listas": await cronometrar(lambda: database.get_listas(user_id=user_id), repeticoes),
+            "get_itens_lista": await cronometrar(lambda: database.get_itens_lista(lista.id, user_id=user_id), repeticoes),
+            "get_historico_compras": await cronometrar(
+                lambda: database.get_historico_compras(user_id=user_id), repeticoes),
+        }
+    finally:
+        await database.delete_lista(lista.id, user_id=user_id)
+    print(f"\n[{nome}]")
+    for op, ms in resultados.items():
+        print(f"  {op:<24} {ms:8.2f} ms")
+
+
+async def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_backend.conectar(os.path.join(tmp, "bench.db"))
+        await medir_backend("sqlite", repeticoes)
+    if os.environ.get("SUPABASE_URL") and os.environ.get("SUPABASE_KEY"):
+        await medir_backend("supabase", repeticoes)
+    else:
+        print("\n[supabase] não configurado — apenas a linha de base SQLite foi medida.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
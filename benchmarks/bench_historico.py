@@ -0,0 +1,62 @@
+"""
+Benchmark: get_historico_compras — loop N+1 antigo vs. rollup historico_compras.
+
+Uso:
+    python benchmarks/bench_historico.py [latencia_ms]
+
+Para cada tamanho de histórico, mede quantas requisições e quanto tempo
+cada abordagem leva com uma latência simulada por ida ao servidor.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SNAPSHOT", "0")   # não grava snapshots das telas em disco
+
+import database  # noqa: E402
+from backends import supabase_backend  # noqa: E402
+from fake_supabase import FakeSupabase, USUARIO  # noqa: E402
+
+
+async def historico_n_mais_1(client):
+    """Implementação anterior: uma consulta de itens por lista."""
+    res = await client.table("listas").select("*").order("data", desc=True).execute()
+    historico = []
+    for lista in res.data or []:
+        res_itens = await client.table("itens_lista").select("preco, nome").eq("lista_id", lista["id"]).execute()
+        itens = res_itens.data or []
+        historico.append({
+            "id": lista["id"],
+            "total": sum(float(i.get("preco") or 0) for i in itens),
+            "qtd_itens": len(itens),
+        })
+    return historico
+
+
+async def medir(coro_fn, client):
+    client.chamadas = 0
+    t0 = time.perf_counter()
+    resultado = await coro_fn()
+    return client.chamadas, time.perf_counter() - t0, len(resultado)
+
+
+async def main():
+    latencia = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.02
+    client = FakeSupabase(latencia=latencia)
+    supabase_backend.supabase = client
+    database.usar_backend(supabase_backend)
+
+    print(f"Latência simulada: {latencia * 1000:.0f} ms/requisição\n")
+    print(f"{'listas':>7} | {'N+1 req':>8} {'N+1 s':>8} | {'rollup req':>10} {'rollup s':>8}")
+    print("-" * 50)
+    for n in (10, 50, 100, 300):
+        client.popular(n)
+        req_a, t_a, _ = await medir(lambda: historico_n_mais_1(client), client)
+        req_b, t_b, _ = await medir(lambda: database.get_historico_compras(user_id=USUARIO), client)
+        print(f"{n:>7} | {req_a:>8} {t_a:>8.2f} | {req_b:>10} {t_b:>8.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,299 @@
+"""
+Benchmark + verificação de planos: consultas quentes com e sem os índices.
+
+Uso:
+    python benchmarks/bench_indices.py [n_itens] [dsn_postgres]
+
+Gera uma base sintética (padrão: 1M itens, 1000 usuários, 50 itens por
+lista) com todas as migrações aplicadas pelo runner, mede cada consulta
+quente do app e confere o plano (EXPLAIN): nenhuma delas pode varrer a
+tabela inteira nem ordenar as páginas em memória. Depois remove os índices
+das migrações e mede de novo, para comparação.
+
+Sem dsn, usa o backend SQLite num arquivo temporário. Com dsn (Postgres
+local), cria e descarta o schema bench_indices. Sai com código 1 se algum
+plano com índices falhar na verificação.
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import COLUNAS_LISTA, COLUNAS_ITEM, COLUNAS_HISTORICO  # noqa: E402
+
+ITENS_POR_LISTA = 50
+USUARIOS = 1000
+REPETICOES = 20
+TABELAS = ("listas", "itens_lista", "historico_compras")
+
+# Índices criados pelas migrações (0003, 0005, 0006); PK e a chave única de
+# historico_compras (usada no ON CONFLICT) ficam
+INDICES = (
+    "itens_lista_lista_updated_idx",
+    "listas_updated_idx",
+    "historico_compras_data_idx",
+    "listas_user_data_idx",
+    "itens_lista_user_lista_idx",
+    "historico_compras_user_data_idx",
+    "itens_lista_user_comprados_categoria_idx",
+    "itens_lista_lista_comprados_idx",
+)
+
+# Consultas quentes, como os backends as fazem. {V} = literal verdadeiro,
+# {DESDE} = marca d'água. `paginada`: o plano não pode ter ordenação.
+CONSULTAS = {
+    "listas (página)": (
+        f"SELECT {COLUNAS_LISTA} FROM listas WHERE user_id = ? AND deleted_at IS NULL "
+        "ORDER BY data DESC, id DESC LIMIT 20",
+        lambda u, lid: (u,), True,
+    ),
+    "itens (página)": (
+        f"SELECT {COLUNAS_ITEM} FROM itens_lista WHERE user_id = ? AND lista_id = ? AND deleted_at IS NULL "
+        "ORDER BY id DESC LIMIT 50",
+        lambda u, lid: (u, lid), True,
+    ),
+    "delta (changes_since)": (
+        f"SELECT {COLUNAS_ITEM}, deleted_at FROM itens_lista "
+        "WHERE user_id = ? AND lista_id = ? AND updated_at > {DESDE} ORDER BY updated_at",
+        lambda u, lid: (u, lid, "2024-01-01T00:00:00Z"), False,
+    ),
+    "histórico": (
+        f"SELECT {COLUNAS_HISTORICO} FROM historico_compras WHERE user_id = ? ORDER BY data DESC, id DESC",
+        lambda u, lid: (u,), True,
+    ),
+    "totais por categoria": (
+        """SELECT COALESCE(i.categoria, 'Outros') AS categoria, COALESCE(SUM(i.preco), 0) AS total, COUNT(*)
+           FROM itens_lista i JOIN listas l ON l.id = i.lista_id
+           WHERE i.user_id = ? AND l.user_id = ? AND i.comprado = {V}
+             AND i.deleted_at IS NULL AND l.deleted_at IS NULL
+           GROUP BY 1 ORDER BY 2 DESC""",
+        lambda u, lid: (u, u), False,
+    ),
+    "rollup (finalizar)": (
+        "SELECT COALESCE(SUM(preco), 0), COUNT(*) FROM itens_lista "
+        "WHERE lista_id = ? AND comprado = {V} AND deleted_at IS NULL",
+        lambda u, lid: (lid,), False,
+    ),
+    "nomes (itens inválidos)": (
+        "SELECT id, nome FROM itens_lista WHERE user_id = ? AND deleted_at IS NULL",
+        lambda u, lid: (u,), False,
+    ),
+}
+
+
+def usuario(n: int) -> str:
+    return f"{n:08x}-0000-4000-8000-{n:012x}"
+
+
+def medir(executar, sql, params) -> float:
+    tempos = []
+    for _ in range(REPETICOES):
+        t0 = time.perf_counter()
+        executar(sql, params)
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000
+
+
+# ─────────────────────────────────────────────────
+# SQLITE
+# ─────────────────────────────────────────────────
+
+class SQLite:
+    nome = "sqlite"
+
+    def __init__(self, pasta):
+        from backends import sqlite_backend
+        self.conn = sqlite_backend.conectar(os.path.join(pasta, "bench.db"))
+
+    def sql(self, sql):
+        return sql.replace("{V}", "1").replace("{DESDE}", "strftime('%Y-%m-%dT%H:%M:%fZ', ?)")
+
+    def popular(self, n_itens):
+        n_listas = max(1, n_itens // ITENS_POR_LISTA)
+        cats = ("Mercado", "Hortifruti", "Limpeza", "Açougue", "Outros")
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO listas (id, nome, descricao, data, user_id, updated_at) VALUES (?, ?, '', ?, ?, ?)",
+                ((lid, f"Lista {lid}", f"2024-{lid % 12 + 1:02d}-{lid % 28 + 1:02d}", usuario(lid % USUARIOS),
+                  "2024-01-01T00:00:00.000Z") for lid in range(1, n_listas + 1)),
+            )
+            self.conn.executemany(
+                "INSERT INTO itens_lista (lista_id, nome, categoria, comprado, preco, user_id, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((lid, f"Item {k}", cats[k % 5], k % 3 == 0, k % 50 + 0.99, usuario(lid % USUARIOS),
+                  f"2024-{lid % 12 + 1:02d}-01T00:00:00.000Z")
+                 for lid in range(1, n_listas + 1) for k in range(ITENS_POR_LISTA)),
+            )
+            self.conn.execute(
+                "INSERT INTO historico_compras (lista_id, user_id, data, mercado, descricao, total, qtd_itens) "
+                "SELECT id, user_id, data, nome, '', total, qtd_itens FROM listas WHERE id % 2 = 0"
+            )
+        self.conn.execute("ANALYZE")
+        return n_listas
+
+    def executar(self, sql, params):
+        return self.conn.execute(sql, params).fetchall()
+
+    def plano(self, sql, params) -> list[str]:
+        return [r[3] for r in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    def problemas(self, plano, paginada) -> list[str]:
+        erros = [p for p in plano if p.startswith("SCAN ") and "INDEX" not in p]
+        if paginada:
+            erros += [p for p in plano if "TEMP B-TREE" in p]
+        return erros
+
+    def remover_indices(self):
+        for nome in INDICES:
+            self.conn.execute(f"DROP INDEX IF EXISTS {nome}")
+        self.conn.execute("ANALYZE")
+
+    def fechar(self):
+        self.conn.close()
+
+
+# ─────────────────────────────────────────────────
+# POSTGRES
+# ─────────────────────────────────────────────────
+
+class Postgres:
+    nome = "postgres"
+    SCHEMA = "bench_indices"
+
+    def __init__(self, dsn):
+        import psycopg
+        from psycopg.conninfo import make_conninfo
+        import migrar
+
+        admin = psycopg.connect(dsn, autocommit=True)
+        admin.execute(f"DROP SCHEMA IF EXISTS {self.SCHEMA} CASCADE")
+        admin.execute(f"CREATE SCHEMA {self.SCHEMA}")
+        # Postgres puro (fora do Supabase): auth.uid() usado pela RLS de 0005
+        if admin.execute("SELECT to_regprocedure('auth.uid()')").fetchone()[0] is None:
+            admin.execute("CREATE SCHEMA IF NOT EXISTS auth")
+            admin.execute("CREATE FUNCTION auth.uid() RETURNS UUID LANGUAGE sql STABLE AS 'SELECT NULL::UUID'")
+        admin.close()
+
+        self.dsn = make_conninfo(dsn, options=f"-c search_path={self.SCHEMA},public")
+        migrar.aplicar_postgres(self.dsn)
+        self.conn = psycopg.connect(self.dsn, autocommit=True)
+
+    def sql(self, sql):
+        return sql.replace("{V}", "TRUE").replace("{DESDE}", "?::TIMESTAMPTZ").replace("?", "%s")
+
+    def popular(self, n_itens):
+        n_listas = max(1, n_itens // ITENS_POR_LISTA)
+        self.conn.execute(
+            """INSERT INTO listas (nome, descricao, data, user_id)
+               SELECT 'Lista ' || g, '', DATE '2024-01-01' + (g %% 365), (%s || lpad(to_hex(g %% %s), 12, '0'))::UUID
+               FROM generate_series(1, %s) g""",
+            ("00000000-0000-4000-8000-", USUARIOS, n_listas),
+        )
+        self.conn.execute(
+            """INSERT INTO itens_lista (lista_id, nome, categoria, comprado, preco, user_id)
+               SELECT l.id, 'Item ' || k,
+                      (ARRAY['Mercado', 'Hortifruti', 'Limpeza', 'Açougue', 'Outros'])[1 + k %% 5],
+                      k %% 3 = 0, k %% 50 + 0.99, l.user_id
+               FROM listas l, generate_series(0, %s) k""",
+            (ITENS_POR_LISTA - 1,),
+        )
+        self.conn.execute(
+            """INSERT INTO historico_compras (lista_id, user_id, data, mercado, descricao, total, qtd_itens)
+               SELECT id, user_id, data, nome, '', total, qtd_itens FROM listas WHERE id %% 2 = 0"""
+        )
+        self.conn.execute("VACUUM ANALYZE listas")
+        self.conn.execute("VACUUM ANALYZE itens_lista")
+        self.conn.execute("VACUUM ANALYZE historico_compras")
+        return n_listas
+
+    def executar(self, sql, params):
+        return self.conn.execute(sql, params).fetchall()
+
+    def plano(self, sql, params) -> list[str]:
+        (doc,), = self.conn.execute(f"EXPLAIN (FORMAT JSON) {sql}", params).fetchall()
+        doc = json.loads(doc) if isinstance(doc, str) else doc
+        nos, pilha = [], [doc[0]["Plan"]]
+        while pilha:
+            no = pilha.pop()
+            nome = no["Node Type"] + (f" on {no['Relation Name']}" if "Relation Name" in no else "")
+            if "Index Name" in no:
+                nome += f" using {no['Index Name']}"
+            nos.append(nome)
+            pilha.extend(no.get("Plans", []))
+        return nos
+
+    def problemas(self, plano, paginada) -> list[str]:
+        erros = [p for p in plano if p.startswith("Seq Scan") and any(t in p for t in TABELAS)]
+        if paginada:
+            erros += [p for p in plano if p.startswith(("Sort", "Incremental Sort"))]
+        return erros
+
+    def remover_indices(self):
+        for nome in INDICES:
+            self.conn.execute(f"DROP INDEX IF EXISTS {nome}")
+        self.conn.execute("ANALYZE")
+
+    def fechar(self):
+        self.conn.execute(f"DROP SCHEMA IF EXISTS {self.SCHEMA} CASCADE")
+        self.conn.close()
+
+
+def rodada(banco, amostras):
+    """Mediana (ms) e plano de cada consulta, usando usuários/listas sorteados."""
+    resultado = {}
+    for nome, (sql, params_de, paginada) in CONSULTAS.items():
+        sql = banco.sql(sql)
+        u, lid = amostras[0]
+        plano = banco.plano(sql, params_de(u, lid))
+        ms = statistics.median(medir(banco.executar, sql, params_de(u, lid)) for u, lid in amostras)
+        resultado[nome] = (ms, plano, banco.problemas(plano, paginada))
+    return resultado
+
+
+def main():
+    n_itens = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    dsn = sys.argv[2] if len(sys.argv) > 2 else None
+
+    with tempfile.TemporaryDirectory() as pasta:
+        banco = Postgres(dsn) if dsn else SQLite(pasta)
+        try:
+            t0 = time.perf_counter()
+            n_listas = banco.popular(n_itens)
+            print(f"[{banco.nome}] {n_itens} itens, {n_listas} listas, {USUARIOS} usuários "
+                  f"(carga em {time.perf_counter() - t0:.1f} s)\n")
+
+            rnd = random.Random(42)
+            amostras = []
+            for _ in range(5):
+                lid = rnd.randint(1, n_listas)
+                amostras.append((usuario(lid % USUARIOS), lid))
+
+            com = rodada(banco, amostras)
+            banco.remover_indices()
+            sem = rodada(banco, amostras)
+        finally:
+            banco.fechar()
+
+    print(f"{'consulta':<26} {'sem índices':>12} {'com índices':>12} {'ganho':>8}")
+    print("-" * 62)
+    for nome in CONSULTAS:
+        ms_sem, ms_com = sem[nome][0], com[nome][0]
+        print(f"{nome:<26} {ms_sem:>9.2f} ms {ms_com:>9.2f} ms {ms_sem / max(ms_com, 1e-6):>7.0f}x")
+
+    print("\nPlanos com índices:")
+    falhas = 0
+    for nome, (_, plano, erros) in com.items():
+        print(f"  {'FALHA' if erros else 'ok':<5} {nome}: {' | '.join(plano)}")
+        falhas += bool(erros)
+    if falhas:
+        print(f"\n{falhas} consulta(s) sem índice adequado.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: dicts de select("*") vs. modelos com __slots__ e colunas projetadas.
+
+Uso:
+    python benchmarks/bench_modelos.py [n_itens]
+
+Simula o payload JSON de uma lista com 10k itens e compara:
+  - bytes trafegados (todas as colunas vs. COLUNAS_ITEM);
+  - memória retida pelas linhas já decodificadas (tracemalloc);
+  - tempo de decodificação e de um passe de renderização típico
+    (filtrar pendentes, ordenar por nome, somar preços).
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Item, COLUNAS_ITEM  # noqa: E402
+
+
+def gerar_linhas(n: int) -> list[dict]:
+    """Linhas como o PostgREST devolve para select("*") em itens_lista."""
+    return [
+        {
+            "id": i, "lista_id": 1, "nome": f"Produto {i:05d}", "categoria": "Mercado",
+            "comprado": i % 3 == 0, "preco": f"{(i % 50) + 0.99:.2f}",
+            "user_id": "9f1c2e4a-1b2c-4d5e-8f90-1234567890ab",
+            "updated_at": f"2026-10-18T12:{i // 60 % 60:02d}:{i % 60:02d}.000000+00:00", "deleted_at": None,
+        }
+        for i in range(n)
+    ]
+
+
+def medir(nome, decodificar, payload):
+    t0 = time.perf_counter()
+    decodificar(json.loads(payload))
+    t_decode = time.perf_counter() - t0
+
+    # Memória retida pelas linhas depois de descartar o JSON intermediário
+    tracemalloc.start()
+    linhas = decodificar(json.loads(payload))
+    retida, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    for _ in range(10):
+        renderizar = RENDER[nome]
+        renderizar(linhas)
+    t_render = (time.perf_counter() - t0) / 10
+    print(f"{nome:<8} {len(payload) / 1024:>9.0f} KiB {retida / 1024:>9.0f} KiB {t_decode * 1000:>9.1f} ms {t_render * 1000:>9.2f} ms")
+
+
+def render_dict(itens):
+    pendentes = sorted([i for i in itens if not i.get("comprado", False)], key=lambda x: x.get("nome", "").lower())
+    return sum(float(i.get("preco", 0)) for i in pendentes)
+
+
+def render_modelo(itens):
+    pendentes = sorted([i for i in itens if not i.comprado], key=lambda x: x.nome.lower())
+    return sum(i.preco for i in pendentes)
+
+
+RENDER = {"dict": render_dict, "slots": render_modelo}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    linhas = gerar_linhas(n)
+    colunas = [c.strip() for c in COLUNAS_ITEM.split(",")]
+    payload_todas = json.dumps(linhas)
+    payload_proj = json.dumps([{c: r[c] for c in colunas} for r in linhas])
+
+    print(f"{n} itens\n")
+    print(f"{'formato':<8} {'payload':>13} {'memória':>13} {'decode':>12} {'render':>12}")
+    print("-" * 62)
+    medir("dict", lambda rows: rows, payload_todas)
+    medir("slots", lambda rows: [Item.from_row(r) for r in rows], payload_proj)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: tentativas repetidas de importar a mesma NF-e, sem e com o
+cache em disco (nfe_cache).
+
+Uso:
+    python benchmarks/bench_nfe_cache.py [tentativas] [latencia_ms] [falhas_pct]
+
+Sobe uma SEFAZ falsa local (página de NFC-e com 150 itens) que demora
+`latencia_ms` por resposta e devolve 503 em `falhas_pct`% delas. O Groq é
+simulado (1,5 s por chamada, itens do parser HTML). Cada tentativa é uma
+nova leitura da mesma nota — o usuário repetindo após um erro, ou a lista
+excluída e importada de novo. Mede o tempo por tentativa, quantas deram
+certo e quantas vezes a SEFAZ e o "Groq" foram chamados.
+"""
+import io
+import os
+import sys
+import time
+import tempfile
+import statistics
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+_TMP = tempfile.TemporaryDirectory()
+os.environ["NFE_CACHE_DIR"] = _TMP.name
+
+from fake_sefaz import SefazFalsa, pagina_nfce  # noqa: E402
+import nfe_cache  # noqa: E402
+import qrcode_service  # noqa: E402
+
+GROQ_LATENCIA = 1.5
+
+
+def rodada(url: str, tentativas: int):
+    tempos, ok = [], 0
+    for _ in range(tentativas):
+        t0 = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                ok += bool(qrcode_service.get_items_from_nfe_url(url))
+        except ValueError:
+            pass
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tempos), sum(tempos) / 1000, ok
+
+
+def main():
+    tentativas = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    latencia = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.8
+    falhas = float(sys.argv[3]) / 100 if len(sys.argv) > 3 else 0.3
+
+    contagem = {"groq": 0}
+
+    def groq_simulado(texto):
+        contagem["groq"] += 1
+        time.sleep(GROQ_LATENCIA)
+        return qrcode_service.parse_nfe_items(pagina_nfce())
+
+    qrcode_service.extract_items_with_groq = groq_simulado
+    resultados = {}
+    with SefazFalsa(latencia, falhas) as sefaz:
+        for nome, ativo in (("sem cache", False), ("nfe_cache", True)):
+            nfe_cache.ATIVO = ativo
+            sefaz.zerar()
+            contagem["groq"] = 0
+            p50, total, ok = rodada(sefaz.url(), tentativas)
+            resultados[nome] = (p50, total, ok, sefaz.contagem["requisicoes"], contagem["groq"])
+
+    print(f"\n{tentativas} tentativas da mesma nota; SEFAZ com {latencia * 1000:.0f} ms e "
+          f"{falhas:.0%} de falhas, Groq simulado com {GROQ_LATENCIA:.1f} s\n")
+    print(f"{'':<10} {'p50':>10} {'total':>9} {'ok':>6} {'SEFAZ':>6} {'Groq':>5}")
+    print("-" * 52)
+    for nome, (p50, total, ok, sefaz, groq) in resultados.items():
+        print(f"{nome:<10} {p50:>7.1f} ms {total:>7.1f} s {ok:>3}/{tentativas} {sefaz:>6} {groq:>5}")
+    print(f"\nCache: {nfe_cache.stats()}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        _TMP.cleanup()
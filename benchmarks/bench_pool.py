@@ -0,0 +1,93 @@
+"""
+Benchmark de carga: cliente síncrono em asyncio.to_thread vs. cliente
+assíncrono com pool keep-alive compartilhado.
+
+Uso:
+    python benchmarks/bench_pool.py [sessoes] [requisicoes_por_sessao] [latencia_ms]
+
+Sobe o PostgREST falso (fake_postgrest.py) e simula `sessoes` usuários
+concorrentes abrindo listas (get_itens_lista, 80 ms de latência simulada por
+padrão). Reporta vazão, p50/p95 e quantas conexões TCP cada abordagem
+abriu. A abordagem antiga fica limitada pelo tamanho do executor de threads
+padrão; a nova só pelo DB_POOL_MAX.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_postgrest  # noqa: E402
+
+SERVIDOR = fake_postgrest.iniciar(latencia=0.02)
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{SERVIDOR.server_port}"
+os.environ["SUPABASE_KEY"] = "chave-de-teste"
+
+from postgrest import SyncPostgrestClient  # noqa: E402
+from backends import supabase_backend  # noqa: E402
+from models import COLUNAS_ITEM  # noqa: E402
+
+URL_REST = f"{os.environ['SUPABASE_URL']}/rest/v1"
+CABECALHOS = {"apikey": "chave-de-teste", "Authorization": "Bearer chave-de-teste"}
+USUARIO = "00000000-0000-4000-8000-000000000001"
+
+
+def cliente_antigo():
+    """Como antes: cliente síncrono, cada chamada ocupa uma thread do executor."""
+    client = SyncPostgrestClient(URL_REST, headers=CABECALHOS)
+
+    async def get_itens(lista_id):
+        res = await asyncio.to_thread(
+            lambda: client.table("itens_lista").select(COLUNAS_ITEM).eq("lista_id", lista_id).order("id", desc=True).execute()
+        )
+        return res.data
+
+    return get_itens
+
+
+async def carga(get_itens, sessoes: int, por_sessao: int):
+    latencias = []
+
+    async def sessao(n):
+        for k in range(por_sessao):
+            t0 = time.perf_counter()
+            await get_itens(n * por_sessao + k + 1)
+            latencias.append(time.perf_counter() - t0)
+
+    SERVIDOR.requisicoes = SERVIDOR.conexoes = 0
+    t0 = time.perf_counter()
+    await asyncio.gather(*(sessao(n) for n in range(sessoes)))
+    total = time.perf_counter() - t0
+    latencias.sort()
+    return {
+        "vazao": len(latencias) / total,
+        "p50": statistics.median(latencias) * 1000,
+        "p95": latencias[int(len(latencias) * 0.95) - 1] * 1000,
+        "conexoes": SERVIDOR.conexoes,
+    }
+
+
+def imprimir(nome, r):
+    print(f"{nome:<18} {r['vazao']:>9.0f} req/s {r['p50']:>8.1f} ms {r['p95']:>8.1f} ms {r['conexoes']:>9}")
+
+
+async def main():
+    sessoes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    por_sessao = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    SERVIDOR.latencia = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.08
+
+    print(f"{sessoes} sessões × {por_sessao} requisições, {SERVIDOR.latencia * 1000:.0f} ms/req no servidor")
+    print(f"pool: max={supabase_backend.DB_POOL_MAX} keep-alive={supabase_backend.DB_POOL_KEEPALIVE} "
+          f"http2={supabase_backend.DB_HTTP2}\n")
+    print(f"{'cliente':<18} {'vazão':>15} {'p50':>11} {'p95':>11} {'conexões':>9}")
+    print("-" * 68)
+    imprimir("to_thread (sync)", await carga(cliente_antigo(), sessoes, por_sessao))
+    imprimir("async + pool", await carga(
+        lambda lista_id: supabase_backend.get_itens_lista(USUARIO, lista_id), sessoes, por_sessao
+    ))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
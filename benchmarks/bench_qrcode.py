@@ -0,0 +1,112 @@
+"""
+Benchmark: leitura do QR da NFC-e em fotos grandes — decodificação em
+resolução cheia (implementação anterior) vs. pirâmide de escalas.
+
+Uso:
+    python benchmarks/bench_qrcode.py [repeticoes]
+
+Gera fotos sintéticas de 12MP (4000x3000, JPEG) com o QR de uma NFC-e em
+tamanhos diferentes, ruído e desfoque, uma delas gravada de lado com a
+orientação no EXIF. Mede o tempo por leitura, o pico de memória alocada
+pelo numpy (tracemalloc) e, para a pirâmide, o tempo de cada etapa.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import qrcode_service  # noqa: E402
+
+URL = (
+    "https://www.fazenda.pr.gov.br/nfce/qrcode?p="
+    "41240612345678000190650010000123451123456789|2|1|1|"
+    "0A1B2C3D4E5F60718293A4B5C6D7E8F901234567"
+)
+
+# nome -> (lado do QR em px na foto de 4000x3000, orientação EXIF)
+CASOS = {
+    "QR grande (1200px)": (1200, 1),
+    "QR médio (600px)": (600, 1),
+    "QR pequeno (300px)": (300, 1),
+    "foto de lado (EXIF 6)": (600, 6),
+}
+
+
+def gerar_foto(caminho: str, lado_qr: int, orientacao: int):
+    rnd = np.random.default_rng(lado_qr)
+    qr = cv2.QRCodeEncoder.create().encode(URL)
+    qr = cv2.resize(qr, (lado_qr, lado_qr), interpolation=cv2.INTER_NEAREST)
+    foto = np.full((3000, 4000), 200, np.uint8)
+    foto += rnd.integers(0, 40, foto.shape, dtype=np.uint8)
+    foto[1400:1400 + lado_qr, 2200:2200 + lado_qr] = qr
+    foto = cv2.GaussianBlur(foto, (5, 5), 0)
+    img = Image.fromarray(cv2.cvtColor(foto, cv2.COLOR_GRAY2RGB))
+    exif = Image.Exif()
+    if orientacao == 6:
+        img = img.transpose(Image.Transpose.ROTATE_90)   # gravada de lado; EXIF 6 a endireita
+        exif[0x0112] = 6
+    img.save(caminho, "JPEG", quality=90, exif=exif)
+
+
+def decode_antigo(image_path: str) -> str | None:
+    """Implementação anterior: imread colorido em resolução cheia, depois Otsu."""
+    img = cv2.imread(image_path)
+    detector = cv2.QRCodeDetector()
+    data, _, _ = detector.detectAndDecode(img)
+    if data and data.startswith("http"):
+        return data
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    data, _, _ = detector.detectAndDecode(thresh)
+    return data if data and data.startswith("http") else None
+
+
+def medir(fn, caminho, repeticoes):
+    tempos, pico, url = [], 0, None
+    for _ in range(repeticoes):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        url = fn(caminho)
+        tempos.append((time.perf_counter() - t0) * 1000)
+        pico = max(pico, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(tempos), pico / 2**20, url == URL
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    novo = lambda caminho: qrcode_service.decode_qrcode_timed(caminho)[0]  # noqa: E731
+    etapas = {}
+
+    with tempfile.TemporaryDirectory() as pasta:
+        resultados = {}
+        for nome, (lado_qr, orientacao) in CASOS.items():
+            caminho = os.path.join(pasta, f"foto_{lado_qr}_{orientacao}.jpg")
+            gerar_foto(caminho, lado_qr, orientacao)
+            antes = medir(decode_antigo, caminho, repeticoes)
+            depois = medir(novo, caminho, repeticoes)
+            _, etapas[nome] = qrcode_service.decode_qrcode_timed(caminho)
+            resultados[nome] = (antes, depois)
+
+    print(f"\n{'foto 12MP':<24} {'antes':>22} {'depois':>22}")
+    print("-" * 70)
+    for nome, ((ms_a, mb_a, ok_a), (ms_d, mb_d, ok_d)) in resultados.items():
+        a = f"{ms_a:6.0f} ms {mb_a:5.1f} MB {'ok' if ok_a else '--'}"
+        d = f"{ms_d:6.0f} ms {mb_d:5.1f} MB {'ok' if ok_d else '--'}"
+        print(f"{nome:<24} {a:>22} {d:>22}")
+
+    print("\nEtapas da pirâmide (ms):")
+    for nome, t in etapas.items():
+        print(f"  {nome:<24} " + ", ".join(f"{k}={v:.0f}" for k, v in t.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: leituras de QR concorrentes em threads (asyncio.to_thread) vs.
+no pool de processos (scan_pool), do ponto de vista do loop de eventos.
+
+Uso:
+    python benchmarks/bench_scan_pool.py [leituras] [workers]
+
+Enquanto as leituras rodam, uma tarefa "batimento" acorda a cada 10 ms,
+como o loop do Flet atendendo as outras sessões; o atraso de cada batida
+mostra quanto o trabalho de CPU trava o loop. Cada leitura decodifica uma
+foto de 12MP (as de bench_qrcode.py) e extrai o texto de uma página de
+NFC-e com 150 itens (BeautifulSoup, que segura o GIL).
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_qrcode import gerar_foto  # noqa: E402
+from fake_sefaz import pagina_nfce  # noqa: E402
+import qrcode_service  # noqa: E402
+import scan_pool  # noqa: E402
+
+BATIDA = 0.01
+
+
+async def leitura(executar, foto, html):
+    url = await executar(qrcode_service.decode_qrcode, foto)
+    texto = await executar(qrcode_service.visible_text, html)
+    return url if texto else None
+
+
+async def batimento(atrasos, parar):
+    while not parar.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(BATIDA)
+        atrasos.append((time.perf_counter() - t0 - BATIDA) * 1000)
+
+
+async def rodada(executar, fotos):
+    atrasos, parar = [], asyncio.Event()
+    batidas = asyncio.ensure_future(batimento(atrasos, parar))
+    t0 = time.perf_counter()
+    html = pagina_nfce()
+    urls = await asyncio.gather(*(leitura(executar, f, html) for f in fotos))
+    total = time.perf_counter() - t0
+    parar.set()
+    await batidas
+    atrasos.sort()
+    p99 = atrasos[int(len(atrasos) * 0.99)] if atrasos else 0
+    return total, statistics.median(atrasos), p99, max(atrasos), sum(1 for u in urls if u)
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    scan_pool.SCAN_WORKERS = int(sys.argv[2]) if len(sys.argv) > 2 else scan_pool.SCAN_WORKERS
+
+    with tempfile.TemporaryDirectory() as pasta:
+        fotos = []
+        for i, lado in enumerate((1200, 600, 300, 600) * (n // 4 + 1)):
+            if i == n:
+                break
+            fotos.append(os.path.join(pasta, f"foto_{i}.jpg"))
+            gerar_foto(fotos[-1], lado, 1)
+
+        t0 = time.perf_counter()
+        scan_pool.iniciar()
+        aquecimento = time.perf_counter() - t0
+
+        em_thread = await rodada(lambda fn, *a: asyncio.to_thread(fn, *a), fotos)
+        no_pool = await rodada(scan_pool.executar, fotos)
+        scan_pool.encerrar()
+
+    print(f"\n{n} leituras (foto 12MP + HTML da NFC-e); pool com {scan_pool.SCAN_WORKERS} worker(s), "
+          f"aquecido em {aquecimento * 1000:.0f} ms na inicialização\n")
+    print(f"{'':<18} {'total':>8} {'atraso loop p50':>16} {'p99':>8} {'máx':>8} {'lidos':>6}")
+    print("-" * 70)
+    for nome, (total, p50, p99, maximo, lidos) in (("asyncio.to_thread", em_thread), ("scan_pool", no_pool)):
+        print(f"{nome:<18} {total:>6.2f} s {p50:>13.1f} ms {p99:>5.1f} ms {maximo:>5.1f} ms {lidos:>4}/{n}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""
+Benchmark: busca das páginas da SEFAZ com a implementação anterior
+(requests.get numa thread, sem sessão nem novas tentativas) vs. o cliente
+assíncrono (sefaz_client: pool keep-alive por host, novas tentativas com
+jitter, limite por host e prazo total).
+
+O requests saiu das dependências; o "antes" é reproduzido com urllib.request
+da biblioteca padrão, com o mesmo comportamento: uma conexão nova por
+requisição, timeout de 15 s e nenhuma nova tentativa.
+
+Uso:
+    python benchmarks/bench_sefaz.py [importacoes_por_host] [latencia_ms] [falhas_pct]
+
+Sobe três SEFAZ falsas (127.0.0.1, .2 e .3 — três estados) e dispara as
+importações todas ao mesmo tempo, em duas rodadas seguidas (a segunda já
+encontra as conexões abertas). Mede o tempo total, quantas páginas vieram,
+as requisições e conexões que cada portal recebeu e o pico de requisições
+simultâneas num mesmo portal.
+"""
+import io
+import os
+import sys
+import time
+import asyncio
+import threading
+import contextlib
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_sefaz import SefazFalsa  # noqa: E402
+import sefaz_client  # noqa: E402
+
+HOSTS = ("127.0.0.1", "127.0.0.2", "127.0.0.3")
+RODADAS = 2
+
+
+def buscar_antigo(url: str) -> str | None:
+    """Implementação anterior de fetch_nfe_page (requests.get, aqui com urllib)."""
+    try:
+        req = urllib.request.Request(url, headers=sefaz_client.HEADERS)
+        with urllib.request.urlopen(req, timeout=15) as resp:
+            return resp.read().decode("utf-8") if resp.status == 200 else None
+    except Exception:
+        return None
+
+
+async def rodada(buscar, urls):
+    t0 = time.perf_counter()
+    paginas = await asyncio.gather(*(buscar(u) for u in urls))
+    return time.perf_counter() - t0, sum(1 for p in paginas if p)
+
+
+async def medir(buscar, portais, urls):
+    for p in portais:
+        p.zerar()
+    resultados = [await rodada(buscar, urls) for _ in range(RODADAS)]
+    soma = lambda chave: sum(p.contagem[chave] for p in portais)  # noqa: E731
+    return (
+        [t for t, _ in resultados], [ok for _, ok in resultados],
+        soma("requisicoes"), soma("conexoes"), max(p.contagem["simultaneas_max"] for p in portais),
+    )
+
+
+async def main():
+    por_host = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    latencia = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.8
+    falhas = float(sys.argv[3]) / 100 if len(sys.argv) > 3 else 0.3
+
+    with contextlib.ExitStack() as pilha:
+        portais = [pilha.enter_context(SefazFalsa(latencia, falhas, host=h, semente=i)) for i, h in enumerate(HOSTS)]
+        urls = [p.url() for p in portais for _ in range(por_host)]
+
+        threads_antes = threading.active_count()
+        with contextlib.redirect_stdout(io.StringIO()):
+            antes = await medir(lambda u: asyncio.to_thread(buscar_antigo, u), portais, urls)
+            threads_pico = threading.active_count() - threads_antes
+            depois = await medir(sefaz_client.buscar, portais, urls)
+        await sefaz_client.fechar()
+
+    n = len(urls)
+    print(f"\n{n} importações simultâneas em {len(HOSTS)} portais, {RODADAS} rodadas; "
+          f"SEFAZ com {latencia * 1000:.0f} ms e {falhas:.0%} de 503")
+    print(f"(executor padrão: {threads_pico} threads presas na rede na implementação anterior)\n")
+    print(f"{'':<14} {'rodada 1':>9} {'rodada 2':>9} {'páginas':>9} {'requisições':>12} {'conexões':>9} {'pico/host':>10}")
+    print("-" * 78)
+    for nome, (tempos, oks, reqs, conexoes, pico) in (("anterior", antes), ("sefaz_client", depois)):
+        paginas = f"{sum(oks)}/{n * RODADAS}"
+        print(f"{nome:<14} {tempos[0]:>7.2f} s {tempos[1]:>7.2f} s {paginas:>9} {reqs:>12} {conexoes:>9} {pico:>10}")
+    print(f"\nsefaz_client: {sefaz_client.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+Benchmark: leituras idênticas concorrentes com e sem single-flight.
+
+Uso:
+    python benchmarks/bench_single_flight.py [chamadas_concorrentes] [latencia_ms]
+
+Simula trocas rápidas de aba: várias chamadas simultâneas a
+get_historico_compras e get_itens_lista com os mesmos argumentos. Sem
+single-flight (e com o cache desligado) cada chamada é uma requisição;
+com ele, uma só por chave.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SNAPSHOT", "0")   # não grava snapshots das telas em disco
+
+import database  # noqa: E402
+from backends import supabase_backend  # noqa: E402
+from fake_supabase import FakeSupabase, USUARIO  # noqa: E402
+
+
+async def rajada(client, n):
+    client.chamadas = 0
+    t0 = time.perf_counter()
+    await asyncio.gather(
+        *(database.get_historico_compras(user_id=USUARIO) for _ in range(n)),
+        *(database.get_itens_lista(1, user_id=USUARIO) for _ in range(n)),
+    )
+    return client.chamadas, time.perf_counter() - t0
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latencia = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    client = FakeSupabase(latencia=latencia)
+    client.popular(50)
+    supabase_backend.supabase = client
+    database.usar_backend(supabase_backend)
+    database.CACHE_TTL = 0  # isola o efeito do single-flight
+
+    print(f"{n} chamadas concorrentes de cada leitura, {latencia * 1000:.0f} ms/requisição\n")
+    # Sem single-flight: cada chamada vira uma tarefa própria
+    original = database._single_flight
+    database._single_flight = lambda chave, buscar: buscar()
+    req, t = await rajada(client, n)
+    print(f"{'sem single-flight':<20} {req:>4} requisições {t * 1000:>8.1f} ms")
+    database._single_flight = original
+
+    req, t = await rajada(client, n)
+    print(f"{'com single-flight':<20} {req:>4} requisições {t * 1000:>8.1f} ms")
+    print(f"\ncache_stats(): {database.cache_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Benchmark: tempo até o primeiro conteúdo das telas, sem e com o snapshot em disco.
+
+Uso:
+    python benchmarks/bench_snapshot.py [latencia_ms] [repeticoes]
+
+Simula o servidor recém-iniciado (cache em memória vazio) com o SQLite atrás
+de uma latência fixa por ida ao servidor, como o Supabase. "Antes" é a
+primeira leitura que cada tela espera para desenhar; "depois" é a leitura
+do snapshot da última visita, desenhado na hora — a leitura real vira
+revalidação em segundo plano. Mede também o tamanho dos snapshots e
+quantas linhas a revalidação troca após uma alteração.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_TMP = tempfile.TemporaryDirectory()
+os.environ["SNAPSHOT_DIR"] = _TMP.name
+
+import database  # noqa: E402
+import snapshot  # noqa: E402
+from backends import sqlite_backend  # noqa: E402
+
+
+class ComLatencia:
+    """Backend com uma espera fixa antes de cada chamada (ida e volta pela rede)."""
+
+    def __init__(self, backend, latencia: float):
+        self.__name__ = f"{backend.__name__}+latencia"
+        self.backend = backend
+        self.latencia = latencia
+
+    def __getattr__(self, nome):
+        fn = getattr(self.backend, nome)
+
+        async def chamar(*args, **kwargs):
+            await asyncio.sleep(self.latencia)
+            return await fn(*args, **kwargs)
+        return chamar
+
+
+def reiniciar_servidor():
+    """Processo novo: nada em memória, só o que está em disco."""
+    database.invalidar_cache()
+    snapshot._gravado.clear()
+
+
+async def cronometrar(fn, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        reiniciar_servidor()
+        t0 = time.perf_counter()
+        resultado = fn()
+        if asyncio.iscoroutine(resultado):
+            resultado = await resultado
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tempos)
+
+
+async def main():
+    latencia = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.08
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    sqlite_backend.conectar(os.path.join(_TMP.name, "bench.db"))
+    backend = ComLatencia(sqlite_backend, 0)
+    database.usar_backend(backend)
+    user_id = str(uuid.uuid4())
+
+    listas = [await database.create_lista(f"Lista {i}", "bench", user_id=user_id) for i in range(30)]
+    for lista in listas:
+        itens = [{"nome": f"Item {k}", "preco": k + 0.5, "categoria": "Mercado"} for k in range(50)]
+        await database.insert_items_bulk(lista.id, itens, user_id=user_id)
+        await database.finalizar_compra(lista.id, user_id=user_id)
+    lista_id = listas[0].id
+
+    # Última visita: cada tela leu uma vez e deixou o snapshot em disco
+    await database.get_listas_pagina(user_id=user_id)
+    await database.get_itens_lista_pagina(lista_id, user_id=user_id)
+    await database.get_historico_compras(user_id=user_id)
+    await asyncio.sleep(0.2)   # gravações no executor
+
+    backend.latencia = latencia
+    telas = {
+        "listas": (lambda: database.get_listas_pagina(user_id=user_id),
+                   lambda: database.snapshot_listas(user_id=user_id)),
+        "lista (itens)": (lambda: database.get_itens_lista_pagina(lista_id, user_id=user_id),
+                          lambda: database.snapshot_itens(lista_id, user_id=user_id)),
+        "histórico": (lambda: database.get_historico_compras(user_id=user_id),
+                      lambda: database.snapshot_historico(user_id=user_id)),
+    }
+
+    print(f"Latência simulada: {latencia * 1000:.0f} ms/requisição, servidor recém-iniciado\n")
+    print(f"{'tela':<16} {'antes':>10} {'depois':>10}")
+    print("-" * 38)
+    for tela, (servidor, disco) in telas.items():
+        antes = await cronometrar(servidor, repeticoes)
+        depois = await cronometrar(disco, repeticoes)
+        print(f"{tela:<16} {antes:>7.1f} ms {depois:>7.2f} ms")
+
+    arquivos = [os.path.join(_TMP.name, f) for f in os.listdir(_TMP.name) if f.endswith(".snap")]
+    print(f"\nSnapshots: {len(arquivos)} arquivos, {sum(os.path.getsize(a) for a in arquivos)} bytes no total")
+
+    # Revalidação: uma alteração feita em outra sessão troca uma única linha
+    antigos, _ = database.snapshot_itens(lista_id, user_id=user_id)
+    await database.set_comprado([antigos[0].id], True, user_id=user_id)
+    novos, _ = await database.get_itens_lista_pagina(lista_id, user_id=user_id)
+    trocados = set(novos) - set(antigos)
+    print(f"Revalidação após 1 alteração: {len(trocados)} de {len(novos)} cards redesenhados")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    finally:
+        _TMP.cleanup()
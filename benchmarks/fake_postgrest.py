@@ -0,0 +1,83 @@
+"""
+Servidor PostgREST falso (HTTP/1.1 keep-alive) para testes de carga locais.
+
+Uso:
+    python benchmarks/fake_postgrest.py [porta] [latencia_ms]
+
+Responde GET /rest/v1/<tabela>?lista_id=eq.N com linhas JSON geradas em
+memória depois de `latencia` segundos — o suficiente para o backend
+Supabase apontar para cá (SUPABASE_URL=http://127.0.0.1:<porta>).
+Conta requisições e conexões TCP abertas, para conferir o reuso do pool.
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ITENS_POR_LISTA = 30
+
+
+def gerar_itens(lista_id: int) -> list[dict]:
+    base = lista_id * 1000
+    return [
+        {"id": base + i, "lista_id": lista_id, "nome": f"Item {i}", "categoria": "Mercado",
+         "preco": 1.5, "comprado": i % 4 == 0}
+        for i in range(ITENS_POR_LISTA)
+    ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # mantém a conexão aberta entre requisições
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.trava:
+            self.server.conexoes += 1
+
+    def do_GET(self):
+        with self.server.trava:
+            self.server.requisicoes += 1
+        time.sleep(self.server.latencia)
+        url = urlparse(self.path)
+        filtro = parse_qs(url.query).get("lista_id", ["eq.1"])[0]
+        lista_id = int(filtro.split(".", 1)[1]) if filtro.startswith("eq.") else 1
+        corpo = json.dumps(gerar_itens(lista_id)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # o padrão (5) derruba SYNs sob carga e distorce o p95
+
+
+def iniciar(porta: int = 0, latencia: float = 0.02) -> ThreadingHTTPServer:
+    """Sobe o servidor numa thread daemon; porta 0 escolhe uma livre."""
+    servidor = _Servidor(("127.0.0.1", porta), _Handler)
+    servidor.latencia = latencia
+    servidor.trava = threading.Lock()
+    servidor.requisicoes = 0
+    servidor.conexoes = 0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 54321
+    latencia = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.02
+    srv = iniciar(porta, latencia)
+    print(f"PostgREST falso em http://127.0.0.1:{srv.server_port} ({latencia * 1000:.0f} ms/req)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
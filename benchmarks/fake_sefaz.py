@@ -0,0 +1,117 @@
+"""
+SEFAZ falsa local, para benchmarks e testes manuais da importação de NF-e.
+
+Serve uma página de consulta de NFC-e (layout do portal, N itens) em
+HTTP/1.1 com keep-alive, com latência fixa por resposta e uma fração de
+respostas de erro sorteada (503 por padrão, com Retry-After opcional).
+Conta requisições, conexões abertas e o pico de requisições simultâneas.
+
+Uso direto (aponte o QR/URL para ela):
+    python benchmarks/fake_sefaz.py [porta] [latencia_ms] [falhas_pct]
+    → http://127.0.0.1:<porta>/nfce/qrcode?p=<chave>|2|1|1|ABC
+"""
+import sys
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CHAVE = "41240612345678000190650010000123451123456781"
+
+
+def pagina_nfce(n_itens: int = 150) -> str:
+    linhas = "".join(
+        f'<tr id="Item + {i}"><td><span class="txtTit">PRODUTO {i} 1KG</span>'
+        f'<span class="RCod">(Código: {1000 + i})</span><span class="Rqtd">Qtde.:1</span>'
+        f'<span class="RUN">UN: UN</span><span class="RvlUnit">Vl. Unit.: {i},99</span></td>'
+        f'<td class="txtTit noWrap">Vl. Total<span class="valor">{i},99</span></td></tr>'
+        for i in range(n_itens)
+    )
+    return f"<html><head><script>var x = 1;</script></head><body><table id='tabResult'>{linhas}</table></body></html>"
+
+
+class SefazFalsa:
+    """Servidor numa thread; use com `with SefazFalsa(...) as sefaz:` e `sefaz.url()`."""
+
+    def __init__(self, latencia: float = 0.0, falhas: float = 0.0, status_falha: int = 503,
+                 retry_after: float | None = None, host: str = "127.0.0.1", porta: int = 0,
+                 n_itens: int = 150, semente: int = 42):
+        self.latencia, self.falhas = latencia, falhas
+        self.status_falha, self.retry_after = status_falha, retry_after
+        self.html = pagina_nfce(n_itens).encode()
+        self.contagem = {"requisicoes": 0, "erros": 0, "conexoes": 0, "simultaneas_max": 0}
+        self._simultaneas = 0
+        self._lock = threading.Lock()
+        self._rnd = random.Random(semente)
+        self.servidor = ThreadingHTTPServer((host, porta), self._handler())
+        self.servidor.daemon_threads = True
+
+    def _handler(self):
+        sefaz = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive
+
+            def setup(self):
+                super().setup()
+                with sefaz._lock:
+                    sefaz.contagem["conexoes"] += 1
+
+            def do_GET(self):
+                with sefaz._lock:
+                    sefaz.contagem["requisicoes"] += 1
+                    sefaz._simultaneas += 1
+                    sefaz.contagem["simultaneas_max"] = max(sefaz.contagem["simultaneas_max"], sefaz._simultaneas)
+                    falhou = sefaz._rnd.random() < sefaz.falhas
+                try:
+                    time.sleep(sefaz.latencia)
+                    if falhou:
+                        with sefaz._lock:
+                            sefaz.contagem["erros"] += 1
+                        self.send_response(sefaz.status_falha)
+                        if sefaz.retry_after is not None:
+                            self.send_header("Retry-After", str(sefaz.retry_after))
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(sefaz.html)))
+                    self.end_headers()
+                    self.wfile.write(sefaz.html)
+                finally:
+                    with sefaz._lock:
+                        sefaz._simultaneas -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def url(self, chave: str = CHAVE) -> str:
+        host, porta = self.servidor.server_address[:2]
+        return f"http://{host}:{porta}/nfce/qrcode?p={chave}|2|1|1|ABCDEF"
+
+    def zerar(self):
+        with self._lock:
+            self.contagem.update(requisicoes=0, erros=0, conexoes=0, simultaneas_max=0)
+
+    def __enter__(self):
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+if __name__ == "__main__":
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    latencia = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    falhas = float(sys.argv[3]) / 100 if len(sys.argv) > 3 else 0.0
+    with SefazFalsa(latencia, falhas, porta=porta) as sefaz:
+        print(f"SEFAZ falsa em {sefaz.url()}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
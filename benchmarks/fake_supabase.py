@@ -0,0 +1,90 @@
+"""
+Cliente Supabase falso, em memória, para benchmarks.
+
+Implementa apenas o subconjunto do query builder assíncrono usado pelo
+backend Supabase e simula a latência de rede com um sleep por requisição
+(`await execute()`),
+contando quantas idas ao servidor cada operação custou.
+"""
+import asyncio
+from types import SimpleNamespace
+
+# Dono de todas as linhas geradas por popular()
+USUARIO = "00000000-0000-4000-8000-000000000001"
+
+
+class _Query:
+    def __init__(self, client, tabela):
+        self.client = client
+        self.tabela = tabela
+        self.filtros = []
+        self.ordem = None
+        self.unico = False
+
+    def select(self, colunas="*"):
+        self.colunas = [c.strip() for c in colunas.split(",")] if colunas != "*" else None
+        return self
+
+    def eq(self, coluna, valor):
+        self.filtros.append(lambda r: r.get(coluna) == valor)
+        return self
+
+    def is_(self, coluna, valor):
+        self.filtros.append(lambda r: r.get(coluna) is None if valor == "null" else r.get(coluna) is valor)
+        return self
+
+    def order(self, coluna, desc=False):
+        self.ordem = (coluna, desc)
+        return self
+
+    def single(self):
+        self.unico = True
+        return self
+
+    async def execute(self):
+        self.client.chamadas += 1
+        await asyncio.sleep(self.client.latencia)
+        rows = [r for r in self.client.linhas(self.tabela) if all(f(r) for f in self.filtros)]
+        if self.ordem:
+            col, desc = self.ordem
+            rows.sort(key=lambda r: r.get(col) or 0, reverse=desc)
+        if self.colunas:
+            rows = [{c: r.get(c) for c in self.colunas} for r in rows]
+        if self.unico:
+            return SimpleNamespace(data=rows[0] if rows else None)
+        return SimpleNamespace(data=rows)
+
+
+class FakeSupabase:
+    def __init__(self, latencia: float = 0.02):
+        self.latencia = latencia
+        self.chamadas = 0
+        self.tabelas = {"listas": [], "itens_lista": [], "historico_compras": []}
+
+    def linhas(self, tabela):
+        return self.tabelas[tabela]
+
+    def table(self, nome):
+        return _Query(self, nome)
+
+    def popular(self, n_listas: int, itens_por_lista: int = 20):
+        """Gera `n_listas` listas com `itens_por_lista` itens cada."""
+        self.tabelas = {"listas": [], "itens_lista": [], "historico_compras": []}
+        item_id = 1
+        for lid in range(1, n_listas + 1):
+            self.tabelas["listas"].append({
+                "id": lid, "nome": f"Lista {lid}", "descricao": "",
+                "data": f"2024-01-{(lid % 28) + 1:02d}", "user_id": USUARIO,
+            })
+            for _ in range(itens_por_lista):
+                self.tabelas["itens_lista"].append({
+                    "id": item_id, "lista_id": lid, "nome": f"Item {item_id}",
+                    "categoria": "Mercado", "comprado": False, "preco": 1.5, "user_id": USUARIO,
+                })
+                item_id += 1
+            # rollup gravado ao finalizar a compra (historico_compras)
+            self.tabelas["historico_compras"].append({
+                "id": lid, "lista_id": lid, "mercado": f"Lista {lid}", "descricao": "",
+                "data": f"2024-01-{(lid % 28) + 1:02d}", "total": 1.5 * itens_por_lista,
+                "qtd_itens": itens_por_lista, "user_id": USUARIO,
+            })
@@ -0,0 +1,216 @@
+"""
+Feed de alterações de itens_lista (INSERT/UPDATE/DELETE por linha).
+
+A tela de uma lista assina o feed (`assinar(lista_id, user_id, callback)`) e
+recebe cada alteração como um `Evento`, aplicado só no card afetado — sem
+recarregar a lista nem esperar a próxima rodada de sincronização por delta.
+Todo evento leva o user_id da linha e só é entregue a assinaturas do mesmo
+usuário; evento sem dono conhecido é descartado.
+
+Fontes de eventos:
+  - local: database.py publica depois de cada escrita confirmada. Cobre todas
+    as sessões servidas por este processo (o app web roda num processo só) e
+    faz o papel do LISTEN/NOTIFY no modo SQLite, sem servidor extra.
+  - Supabase Realtime (postgres_changes em itens_lista), ligado por
+    `iniciar_realtime()` quando o backend é o Supabase e o pacote `realtime`
+    está instalado: alterações feitas por outros processos/clientes também
+    chegam. Requer a migração 0004 (tabela na publicação supabase_realtime).
+    O Realtime só entrega linhas que a chave enxerga: com a chave anon sob
+    RLS, nenhuma. Por isso a publicação local só é desligada depois que o
+    primeiro evento remoto chega (o servidor então já devolve as escritas
+    deste processo); até lá, e se a conexão cair, o feed local continua.
+
+A sincronização por delta da lista_view continua como rede de segurança
+para eventos perdidos (reconexão, processo reiniciado).
+"""
+import os
+import asyncio
+import threading
+from dataclasses import dataclass, field
+
+from metrics import registrar_gauges
+from models import Item
+
+INSERT, UPDATE, DELETE = "INSERT", "UPDATE", "DELETE"
+
+
+@dataclass(frozen=True, slots=True)
+class Evento:
+    tipo: str                         # INSERT | UPDATE | DELETE
+    lista_id: int | None              # None: lista desconhecida (entregue a todos)
+    itens: tuple = ()                 # Item completos (INSERT; UPDATE do Realtime)
+    ids: tuple = ()                   # UPDATE parcial e DELETE
+    patch: dict = field(default_factory=dict)   # campos do UPDATE parcial
+    user_id: str | None = None        # dono das linhas; só assinantes dele recebem
+
+
+# lista_id -> [(loop, callback, user_id)]; o callback roda no loop de quem assinou
+_assinantes: dict[int, list[tuple]] = {}
+_lock = threading.Lock()
+_stats = {"publicados": 0, "entregues": 0, "descartados": 0, "remotos": 0, "assinantes": 0}
+_remoto_conectado = False   # canal do Realtime assinado
+_remoto_ativo = False       # ... e já entregou um evento: as linhas são visíveis
+
+registrar_gauges("feed", lambda: {
+    **_stats, "realtime": int(_remoto_ativo), "realtime_conectado": int(_remoto_conectado),
+})
+
+
+# ─────────────────────────────────────────────────
+# ASSINATURA
+# ─────────────────────────────────────────────────
+
+def assinar(lista_id: int, user_id: str, callback):
+    """
+    Registra `callback(evento)` para as alterações da lista do usuário. Deve
+    ser chamado de dentro do event loop da sessão, só depois de confirmar que
+    a lista é do usuário. Retorna a função que cancela a assinatura.
+    """
+    entrada = (asyncio.get_running_loop(), callback, user_id)
+    with _lock:
+        _assinantes.setdefault(lista_id, []).append(entrada)
+        _stats["assinantes"] += 1
+
+    def cancelar():
+        with _lock:
+            lista = _assinantes.get(lista_id, [])
+            if entrada in lista:
+                lista.remove(entrada)
+                _stats["assinantes"] -= 1
+            if not lista:
+                _assinantes.pop(lista_id, None)
+
+    return cancelar
+
+
+def publicar(evento: Evento):
+    """
+    Entrega o evento aos assinantes da lista (ou a todas as listas, se lista_id
+    for None) que são do mesmo usuário das linhas.
+    """
+    if not evento.user_id:
+        _stats["descartados"] += 1
+        return
+    with _lock:
+        if evento.lista_id is None:
+            entradas = [e for lista in _assinantes.values() for e in lista]
+        else:
+            entradas = _assinantes.get(evento.lista_id, ())
+        destinos = [(loop, callback) for loop, callback, dono in entradas if dono == evento.user_id]
+        _stats["publicados"] += 1
+    for loop, callback in destinos:
+        # Sempre agendado: quem escreveu não executa código de tela dos outros
+        try:
+            loop.call_soon_threadsafe(callback, evento)
+            _stats["entregues"] += 1
+        except RuntimeError:
+            pass   # loop da sessão já encerrado
+
+
+# ─── Publicação local (chamada pela fachada database.py) ─────────────────────
+
+def _publicar_local(evento: Evento):
+    if not _remoto_ativo:
+        publicar(evento)
+
+
+def publicar_inseridos(itens: list[Item], user_id: str):
+    por_lista: dict = {}
+    for item in itens:
+        por_lista.setdefault(item.lista_id, []).append(item)
+    for lista_id, novos in por_lista.items():
+        _publicar_local(Evento(INSERT, lista_id, itens=tuple(novos), user_id=user_id))
+
+
+def publicar_alterados(lista_id: int | None, ids, patch: dict, user_id: str):
+    _publicar_local(Evento(UPDATE, lista_id, ids=tuple(ids), patch=dict(patch), user_id=user_id))
+
+
+def publicar_removidos(lista_id: int | None, ids, user_id: str):
+    _publicar_local(Evento(DELETE, lista_id, ids=tuple(ids), user_id=user_id))
+
+
+# ─────────────────────────────────────────────────
+# SUPABASE REALTIME
+# ─────────────────────────────────────────────────
+
+def _evento_realtime(payload: dict) -> Evento | None:
+    """
+    Converte um postgres_changes em Evento (tombstone vira DELETE). O dono
+    vem do user_id da linha; DELETE físico sem a linha completa (sem REPLICA
+    IDENTITY FULL) chega sem dono e é descartado por publicar().
+    """
+    dados = payload.get("data", payload)
+    tipo = dados.get("type")
+    novo = dados.get("record") or {}
+    antigo = dados.get("old_record") or {}
+    if tipo == DELETE or novo.get("deleted_at"):
+        linha = novo or antigo
+        if "id" not in linha:
+            return None
+        return Evento(DELETE, linha.get("lista_id"), ids=(linha["id"],), user_id=linha.get("user_id"))
+    if tipo in (INSERT, UPDATE) and "id" in novo:
+        return Evento(tipo, novo.get("lista_id"), itens=(Item.from_row(novo),), user_id=novo.get("user_id"))
+    return None
+
+
+def _on_postgres_change(payload):
+    global _remoto_ativo
+    evento = _evento_realtime(payload)
+    if evento is not None:
+        _stats["remotos"] += 1
+        if not _remoto_ativo and _remoto_conectado:
+            _remoto_ativo = True
+            print("[Feed] Realtime entregando linhas; publicação local desligada.")
+        publicar(evento)
+
+
+async def _escutar(url: str, chave: str):
+    global _remoto_ativo, _remoto_conectado
+    from realtime import AsyncRealtimeClient
+
+    cliente = AsyncRealtimeClient(f"{url.rstrip('/')}/realtime/v1", chave)
+    await cliente.connect()
+    canal = cliente.channel("itens_lista")
+    await canal.on_postgres_changes(
+        "*", schema="public", table="itens_lista", callback=_on_postgres_change
+    ).subscribe()
+    _remoto_conectado = True
+    print("[Feed] Supabase Realtime conectado (itens_lista); feed local ativo até o primeiro evento.")
+    try:
+        await asyncio.Event().wait()   # o cliente escuta e reconecta sozinho
+    finally:
+        _remoto_ativo = _remoto_conectado = False
+
+
+def _rodar(url: str, chave: str):
+    global _remoto_ativo, _remoto_conectado
+    try:
+        asyncio.run(_escutar(url, chave))
+    except Exception as e:
+        _remoto_ativo = _remoto_conectado = False
+        print(f"[Feed] Realtime indisponível, usando só o feed local: {e}")
+
+
+def realtime_ativo() -> bool:
+    """True quando alterações de outros processos também chegam por push."""
+    return _remoto_ativo
+
+
+def iniciar_realtime(url: str | None = None, chave: str | None = None) -> bool:
+    """
+    Liga o Supabase Realtime numa thread daemon com loop próprio (os eventos
+    são repassados ao loop de cada sessão). REALTIME=0 desativa.
+    Retorna False quando não há credenciais ou o pacote `realtime`.
+    """
+    url = url or os.environ.get("SUPABASE_URL", "")
+    chave = chave or os.environ.get("SUPABASE_KEY", "")
+    if os.environ.get("REALTIME", "1") != "1" or not url or not chave:
+        return False
+    try:
+        import realtime  # noqa: F401
+    except ImportError:
+        print("[Feed] Pacote 'realtime' não instalado; usando só o feed local.")
+        return False
+    threading.Thread(target=_rodar, args=(url, chave), daemon=True, name="realtime").start()
+    return True
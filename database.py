@@ -1,150 +1,534 @@
 import os
+import math
+import time
 import asyncio
-from datetime import date
-from supabase import create_client, Client
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 
 load_dotenv()
 
-SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
-SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "")
+from backends import carregar_backend
+from models import Lista, Item, ResumoCompra, TotalCategoria
+from metrics import instrumentar, registrar_erro, registrar_gauges
+import change_feed
+import snapshot
 
-if SUPABASE_URL and SUPABASE_KEY:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-else:
-    supabase = None
+# ─────────────────────────────────────────────────
+# BACKEND DE ARMAZENAMENTO
+# ─────────────────────────────────────────────────
+# DB_BACKEND=supabase|sqlite. Sem variável definida, usa o Supabase se houver
+# credenciais e cai para o SQLite local (modo offline) caso contrário.
+
+DB_BACKEND = os.environ.get("DB_BACKEND") or (
+    "supabase" if os.environ.get("SUPABASE_URL") and os.environ.get("SUPABASE_KEY") else "sqlite"
+)
+
+_backend = carregar_backend(DB_BACKEND)
+print(f"[DB] Backend: {DB_BACKEND}")
+
+def _falha(msg: str, e: Exception):
+    """Erros continuam não derrubando a tela, mas ficam contados em /metrics."""
+    print(f"{msg}: {e}")
+    registrar_erro(e)
+
+def usar_backend(nome_ou_modulo):
+    """Troca o backend em tempo de execução (benchmarks/testes). Limpa o cache."""
+    global _backend, DB_BACKEND
+    if isinstance(nome_ou_modulo, str):
+        _backend, DB_BACKEND = carregar_backend(nome_ou_modulo), nome_ou_modulo
+    else:
+        _backend, DB_BACKEND = nome_ou_modulo, nome_ou_modulo.__name__
+    invalidar_cache()
+    _item_lista.clear()
+
+# ─────────────────────────────────────────────────
+# CACHE DE LEITURA (TTL + LRU, compartilhado pelo processo)
+# ─────────────────────────────────────────────────
+# Chaves são tuplas (tabela, *filtro) e sempre incluem o usuário:
+# ("listas", user_id), ("listas", user_id, id), ("itens_lista", lista_id, user_id).
+# Toda escrita invalida as entradas afetadas; escritas em itens também
+# invalidam as listas do usuário, que carregam o resumo
+# (total/qtd_itens/qtd_pendentes) mantido pelos triggers.
+# Cada invalidação avança a geração do prefixo: uma leitura que começou
+# antes da escrita termina com a geração mudada e não grava o resultado
+# (já obsoleto) no cache nem no snapshot.
+
+CACHE_TTL = float(os.environ.get("DB_CACHE_TTL", "30"))
+CACHE_MAX_ENTRADAS = int(os.environ.get("DB_CACHE_MAX", "256"))
+
+_cache: OrderedDict = OrderedDict()   # chave -> (expira_em, valor)
+_item_lista: dict[int, int] = {}      # item_id -> lista_id (para invalidar por item)
+_geracoes: dict[tuple, int] = {}      # prefixo invalidado -> nº de invalidações
+_cache_stats = {"hits": 0, "misses": 0, "invalidacoes": 0, "expirados": 0, "despejados": 0, "obsoletos": 0}
+
+def _cache_get(chave: tuple):
+    entrada = _cache.get(chave)
+    if entrada is None:
+        _cache_stats["misses"] += 1
+        return None
+    expira_em, valor = entrada
+    if expira_em < time.monotonic():
+        del _cache[chave]
+        _cache_stats["expirados"] += 1
+        _cache_stats["misses"] += 1
+        return None
+    _cache.move_to_end(chave)
+    _cache_stats["hits"] += 1
+    return valor
+
+def _cache_set(chave: tuple, valor):
+    if CACHE_TTL <= 0:
+        return
+    _cache[chave] = (time.monotonic() + CACHE_TTL, valor)
+    _cache.move_to_end(chave)
+    while len(_cache) > CACHE_MAX_ENTRADAS:
+        _cache.popitem(last=False)
+        _cache_stats["despejados"] += 1
+
+def _geracao(chave: tuple) -> int:
+    """Invalidações que já atingiram `chave` (pelos seus prefixos); só cresce."""
+    return sum(_geracoes.get(chave[:n], 0) for n in range(len(chave) + 1))
+
+def _atual(chave: tuple, geracao: int) -> bool:
+    """False se houve escrita em `chave` desde que a leitura começou."""
+    if _geracao(chave) == geracao:
+        return True
+    _cache_stats["obsoletos"] += 1
+    return False
+
+def invalidar_cache(*prefixo):
+    """Remove as entradas cuja chave começa com `prefixo` (ex.: "itens_lista", 3)."""
+    n = len(prefixo)
+    for chave in [c for c in _cache if c[:n] == prefixo]:
+        del _cache[chave]
+        _cache_stats["invalidacoes"] += 1
+    _geracoes[prefixo] = _geracoes.get(prefixo, 0) + 1
+    _esquecer_voos(prefixo)
+    _invalidar_agregados()
+
+def _invalidar_itens(item_ids, user_id: str):
+    """Invalida os itens das listas afetadas e o resumo das listas do usuário."""
+    listas = {_item_lista.get(i) for i in item_ids}
+    if None in listas:
+        invalidar_cache("itens_lista")
+    else:
+        for lista_id in listas:
+            invalidar_cache("itens_lista", lista_id)
+    invalidar_cache("listas", user_id)
+
+def _por_lista(item_ids) -> dict:
+    """Agrupa ids de itens pela lista (None quando a lista não é conhecida)."""
+    grupos: dict = {}
+    for item_id in item_ids:
+        grupos.setdefault(_item_lista.get(item_id), []).append(item_id)
+    return grupos
+
+def cache_stats() -> dict:
+    """Contadores do cache (hits = idas ao servidor economizadas)."""
+    return {**_cache_stats, "entradas": len(_cache), **_voo_stats, "em_voo": len(_em_voo)}
+
+registrar_gauges("cache", cache_stats)
+
+# ─────────────────────────────────────────────────
+# SNAPSHOT EM DISCO (stale-while-revalidate)
+# ─────────────────────────────────────────────────
+# Cada leitura bem-sucedida de listas, itens (primeira página ou completa) e
+# histórico completo fica gravada em disco (snapshot.py). As telas desenham
+# o snapshot antes da ida ao servidor e revalidam logo em seguida; por isso
+# ele pode estar desatualizado e nunca substitui a leitura.
+# Leitura completa e primeira página têm chaves próprias: uma não sobrescreve
+# a outra (a completa não tem cursor de próxima página).
+
+def snapshot_listas(completa: bool = False, *, user_id: str):
+    """(list[Lista], proximo_cursor) da última primeira página (ou leitura completa) das listas, ou None."""
+    salvo = snapshot.ler(("listas", user_id) if completa else ("listas", user_id, "pagina"), Lista)
+    if salvo is None:
+        return None
+    listas, proximo = salvo
+    return listas, tuple(proximo) if proximo else None
+
+def snapshot_itens(lista_id: int, completa: bool = False, *, user_id: str):
+    """(list[Item], proximo_cursor) da última primeira página (ou leitura completa) dos itens, ou None."""
+    chave = ("itens_lista", lista_id, user_id)
+    return snapshot.ler(chave if completa else (*chave, "pagina"), Item)
+
+def snapshot_historico(*, user_id: str):
+    """list[ResumoCompra] da última leitura do histórico completo, ou None."""
+    salvo = snapshot.ler(("historico", user_id), ResumoCompra)
+    return salvo[0] if salvo else None
+
+# ─────────────────────────────────────────────────
+# SINGLE-FLIGHT (leituras idênticas concorrentes)
+# ─────────────────────────────────────────────────
+# Troca rápida de abas e run_task repetidos disparam a mesma consulta várias
+# vezes ao mesmo tempo. Enquanto uma leitura está em voo, chamadas com a
+# mesma chave aguardam o mesmo resultado em vez de abrir outra requisição.
+
+# Leituras agregadas dependem de listas e itens: qualquer escrita as descarta
+_AGREGADOS = ("historico", "totais_categoria")
+
+_em_voo: dict[tuple, asyncio.Task] = {}
+_voo_stats = {"requisicoes": 0, "deduplicados": 0}
+
+async def _single_flight(chave: tuple, buscar):
+    """Executa `buscar()` uma vez por chave; chamadores concorrentes compartilham a tarefa."""
+    tarefa = _em_voo.get(chave)
+    if tarefa is None:
+        _voo_stats["requisicoes"] += 1
+        tarefa = asyncio.ensure_future(buscar())
+        _em_voo[chave] = tarefa
+        tarefa.add_done_callback(lambda t: _em_voo.pop(chave, None) if _em_voo.get(chave) is t else None)
+    else:
+        _voo_stats["deduplicados"] += 1
+    # shield: cancelar um chamador (ex.: troca de tela) não cancela os demais
+    return await asyncio.shield(tarefa)
+
+def _esquecer_voos(prefixo: tuple):
+    """Após uma escrita, novas leituras não podem pegar carona numa consulta anterior a ela."""
+    n = len(prefixo)
+    for chave in [c for c in _em_voo if c[:n] == prefixo]:
+        del _em_voo[chave]
+
+def _invalidar_agregados():
+    """
+    Histórico e totais não passam pelo cache; após qualquer escrita só é
+    preciso descartar as leituras em voo e o snapshot que elas gravariam.
+    """
+    for agregado in _AGREGADOS:
+        _geracoes[(agregado,)] = _geracoes.get((agregado,), 0) + 1
+    for chave in [c for c in _em_voo if c[0] in _AGREGADOS]:
+        del _em_voo[chave]
 
 # ─────────────────────────────────────────────────
 # LISTAS
 # ─────────────────────────────────────────────────
 
-async def get_listas():
-    """Retorna todas as listas ordenadas pela data mais recente."""
-    if not supabase: return []
+# Tamanho padrão das páginas (get_listas_pagina / get_itens_lista_pagina)
+PAGINA_LISTAS = int(os.environ.get("PAGINA_LISTAS", "20"))
+PAGINA_ITENS = int(os.environ.get("PAGINA_ITENS", "50"))
+
+@instrumentar
+async def get_listas(*, user_id: str):
+    """Retorna as listas do usuário (list[Lista]) ordenadas pela data mais recente."""
+    chave = ("listas", user_id)
+    cached = _cache_get(chave)
+    if cached is not None:
+        return list(cached)
+    async def buscar():
+        geracao = _geracao(chave)
+        listas = [Lista.from_row(r) for r in await _backend.get_listas(user_id)]
+        if _atual(chave, geracao):
+            _cache_set(chave, listas)
+            snapshot.gravar(("listas", user_id), listas)
+        return listas
     try:
-        res = await asyncio.to_thread(
-            lambda: supabase.table("listas").select("*").order("data", desc=True).execute()
-        )
-        return res.data or []
+        return list(await _single_flight(chave, buscar))
     except Exception as e:
-        print(f"Erro ao buscar listas: {e}")
+        _falha("Erro ao buscar listas", e)
         return []
 
-async def create_lista(nome: str, descricao: str = "", data_lista: str = None):
-    """Cria uma nova lista de compras."""
-    if not supabase: return None
+@instrumentar
+async def get_listas_pagina(limite: int = PAGINA_LISTAS, cursor: tuple | None = None, *, user_id: str):
+    """
+    Paginação por keyset (data desc, id desc) das listas do usuário.
+    Retorna (list[Lista], proximo_cursor); proximo_cursor é None na última página.
+    """
+    chave = ("listas", user_id, "pagina", limite, cursor)
+    cached = _cache_get(chave)
+    if cached is not None:
+        return cached
+    async def buscar():
+        geracao = _geracao(chave)
+        listas = [Lista.from_row(r) for r in await _backend.get_listas_pagina(user_id, limite + 1, cursor)]
+        proximo = None
+        if len(listas) > limite:
+            listas = listas[:limite]
+            proximo = (listas[-1].data, listas[-1].id)
+        resultado = (listas, proximo)
+        if _atual(chave, geracao):
+            _cache_set(chave, resultado)
+            if cursor is None:
+                snapshot.gravar(("listas", user_id, "pagina"), listas, proximo)
+        return resultado
+    try:
+        return await _single_flight(chave, buscar)
+    except Exception as e:
+        _falha("Erro ao buscar página de listas", e)
+        return [], None
+
+@instrumentar
+async def create_lista(nome: str, descricao: str = "", data_lista: str = None, *, user_id: str):
+    """Cria uma nova lista de compras do usuário. Retorna a Lista criada ou None."""
     try:
         payload = {
             "nome": nome,
             "descricao": descricao,
             "data": data_lista or str(date.today()),
+            "user_id": user_id,
         }
-        res = await asyncio.to_thread(
-            lambda: supabase.table("listas").insert(payload).execute()
-        )
-        return res.data[0] if res.data else None
+        row = await _backend.create_lista(user_id, payload)
+        invalidar_cache("listas", user_id)
+        return Lista.from_row(row) if row else None
     except Exception as e:
-        print(f"Erro ao criar lista: {e}")
+        _falha("Erro ao criar lista", e)
         return None
 
-async def update_lista(lista_id: int, dados: dict):
+@instrumentar
+async def update_lista(lista_id: int, dados: dict, *, user_id: str):
     """Atualiza nome/descrição/data de uma lista."""
-    if not supabase: return False
     try:
-        await asyncio.to_thread(
-            lambda: supabase.table("listas").update(dados).eq("id", lista_id).execute()
-        )
+        await _backend.update_lista(user_id, lista_id, dados)
+        invalidar_cache("listas", user_id)
         return True
     except Exception as e:
-        print(f"Erro ao atualizar lista: {e}")
+        _falha("Erro ao atualizar lista", e)
         return False
 
-async def delete_lista(lista_id: int):
-    """Remove a lista e todos os seus itens (CASCADE)."""
-    if not supabase: return False
+@instrumentar
+async def delete_lista(lista_id: int, *, user_id: str):
+    """
+    Exclui a lista (tombstone). O trigger de 0008 marca os itens com o mesmo
+    tombstone e remove a linha de historico_compras; o CASCADE só age no expurgo.
+    """
     try:
-        await asyncio.to_thread(
-            lambda: supabase.table("listas").delete().eq("id", lista_id).execute()
-        )
+        await _backend.delete_lista(user_id, lista_id)
+        invalidar_cache("listas", user_id)
+        invalidar_cache("itens_lista", lista_id)
+        snapshot.apagar(("itens_lista", lista_id, user_id))
+        snapshot.apagar(("itens_lista", lista_id, user_id, "pagina"))
         return True
     except Exception as e:
-        print(f"Erro ao excluir lista: {e}")
+        _falha("Erro ao excluir lista", e)
         return False
 
-async def get_lista_by_id(lista_id: int):
-    """Retorna os dados de uma lista específica."""
-    if not supabase: return None
+@instrumentar
+async def get_lista_by_id(lista_id: int, *, user_id: str):
+    """Retorna os dados de uma lista do usuário (Lista ou None)."""
+    chave = ("listas", user_id, lista_id)
+    cached = _cache_get(chave)
+    if cached is not None:
+        return cached
+    async def buscar():
+        geracao = _geracao(chave)
+        row = await _backend.get_lista_by_id(user_id, lista_id)
+        lista = Lista.from_row(row) if row else None
+        if lista and _atual(chave, geracao):
+            _cache_set(chave, lista)
+        return lista
     try:
-        res = await asyncio.to_thread(
-            lambda: supabase.table("listas").select("*").eq("id", lista_id).single().execute()
-        )
-        return res.data
+        return await _single_flight(chave, buscar)
     except Exception as e:
-        print(f"Erro ao buscar lista {lista_id}: {e}")
+        _falha(f"Erro ao buscar lista {lista_id}", e)
         return None
 
 # ─────────────────────────────────────────────────
 # ITENS
 # ─────────────────────────────────────────────────
 
-async def get_itens_lista(lista_id: int):
-    """Retorna itens de uma lista específica."""
-    if not supabase: return []
+@instrumentar
+async def get_itens_lista(lista_id: int, *, user_id: str):
+    """Retorna itens (list[Item]) de uma lista do usuário."""
+    chave = ("itens_lista", lista_id, user_id)
+    cached = _cache_get(chave)
+    if cached is not None:
+        return list(cached)
+    async def buscar():
+        geracao = _geracao(chave)
+        itens = [Item.from_row(r) for r in await _backend.get_itens_lista(user_id, lista_id)]
+        for item in itens:
+            _item_lista[item.id] = lista_id
+        if _atual(chave, geracao):
+            _cache_set(chave, itens)
+            snapshot.gravar(("itens_lista", lista_id, user_id), itens)
+        return itens
     try:
-        res = await asyncio.to_thread(
-            lambda: supabase.table("itens_lista")
-                .select("*")
-                .eq("lista_id", lista_id)
-                .order("id", desc=True)
-                .execute()
-        )
-        return res.data or []
+        return list(await _single_flight(chave, buscar))
     except Exception as e:
-        print(f"Erro ao buscar itens: {e}")
+        _falha("Erro ao buscar itens", e)
         return []
 
-async def toggle_item_comprado(item_id: int, status: bool):
-    if not supabase: return False
+@instrumentar
+async def get_itens_lista_pagina(lista_id: int, limite: int = PAGINA_ITENS, cursor: int | None = None,
+                                 *, user_id: str):
+    """
+    Paginação por keyset (id desc) dos itens de uma lista do usuário.
+    Retorna (list[Item], proximo_cursor); proximo_cursor é None na última página.
+    """
+    chave = ("itens_lista", lista_id, user_id, "pagina", limite, cursor)
+    cached = _cache_get(chave)
+    if cached is not None:
+        return cached
+    async def buscar():
+        geracao = _geracao(chave)
+        itens = [Item.from_row(r) for r in await _backend.get_itens_pagina(user_id, lista_id, limite + 1, cursor)]
+        proximo = None
+        if len(itens) > limite:
+            itens = itens[:limite]
+            proximo = itens[-1].id
+        for item in itens:
+            _item_lista[item.id] = lista_id
+        resultado = (itens, proximo)
+        if _atual(chave, geracao):
+            _cache_set(chave, resultado)
+            if cursor is None:
+                snapshot.gravar(("itens_lista", lista_id, user_id, "pagina"), itens, proximo)
+        return resultado
     try:
-        res = await asyncio.to_thread(
-            lambda: supabase.table("itens_lista").update({"comprado": not status}).eq("id", item_id).execute()
-        )
-        return len(res.data) > 0
+        return await _single_flight(chave, buscar)
     except Exception as e:
-        print(f"Erro ao atualizar item: {e}")
+        _falha("Erro ao buscar página de itens", e)
+        return [], None
+
+# Folga aplicada à marca d'água: transações que gravaram antes mas
+# confirmaram depois da última leitura ainda aparecem no próximo delta.
+# Reaplicar uma linha já vista é inofensivo (o delta é idempotente).
+SYNC_MARGEM = timedelta(seconds=float(os.environ.get("SYNC_MARGEM", "2")))
+
+def marca_dagua(itens) -> str | None:
+    """Maior updated_at entre os itens (ponto de partida de get_changes_since)."""
+    return max((i.updated_at for i in itens if i.updated_at), default=None)
+
+@instrumentar
+async def get_changes_since(lista_id: int, watermark: str | None, *, user_id: str):
+    """
+    Itens da lista alterados desde `watermark` (updated_at da última sincronização).
+    Retorna (alterados: list[Item], removidos: list[int], nova_watermark);
+    removidos são os tombstones (deleted_at preenchido). Sem watermark (lista
+    vazia na carga inicial), busca desde o início.
+    """
+    try:
+        if watermark:
+            desde = (datetime.fromisoformat(watermark.replace("Z", "+00:00")) - SYNC_MARGEM).isoformat()
+        else:
+            desde = "1970-01-01T00:00:00+00:00"
+        rows = await _backend.get_changes_since(user_id, lista_id, desde)
+        alterados, removidos = [], []
+        for r in rows:
+            (removidos if r.get("deleted_at") else alterados).append(r)
+        itens = [Item.from_row(r) for r in alterados]
+        for item in itens:
+            _item_lista[item.id] = lista_id
+        nova = max([watermark or "", *(str(r["updated_at"]) for r in rows if r.get("updated_at"))]) or None
+        if nova != watermark:
+            invalidar_cache("itens_lista", lista_id)
+            invalidar_cache("listas", user_id)
+        return itens, [r["id"] for r in removidos], nova
+    except Exception as e:
+        _falha("Erro ao buscar alterações", e)
+        return [], [], watermark
+
+@instrumentar
+async def insert_item(dados: dict, *, user_id: str):
+    try:
+        inseridos = await _backend.insert_itens(user_id, [{**dados, "user_id": user_id}])
+        if dados.get("lista_id") is not None:
+            invalidar_cache("itens_lista", dados["lista_id"])
+        else:
+            invalidar_cache("itens_lista")
+        invalidar_cache("listas", user_id)
+        change_feed.publicar_inseridos([Item.from_row(r) for r in inseridos], user_id=user_id)
+        return len(inseridos) > 0
+    except Exception as e:
+        _falha("Erro ao inserir item", e)
         return False
 
-async def insert_item(dados: dict):
-    if not supabase: return False
+def _preco(valor) -> float:
+    """Preço vindo do usuário ou da IA: número, '7.5', '7,5', 'R$ 1.234,56'; inválido vira 0."""
+    texto = str(valor if valor is not None else "").replace("R$", "").strip()
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
     try:
-        res = await asyncio.to_thread(
-            lambda: supabase.table("itens_lista").insert(dados).execute()
-        )
-        return len(res.data) > 0
+        preco = float(texto)
+    except ValueError:
+        return 0.0
+    return preco if math.isfinite(preco) else 0.0
+
+def _linha_item(item: dict, lista_id: int, user_id: str) -> dict:
+    """Normaliza um item para as colunas de itens_lista (insert em lote exige chaves iguais)."""
+    return {
+        "lista_id": lista_id,
+        "user_id": user_id,
+        "nome": str(item.get("nome", "")).strip(),
+        "categoria": item.get("categoria"),
+        "preco": _preco(item.get("preco")),
+        "comprado": bool(item.get("comprado", False)),
+    }
+
+@instrumentar
+async def insert_items_bulk(lista_id: int, itens: list, *, user_id: str):
+    """Insere vários itens em uma lista com uma única requisição."""
+    if not itens: return True
+    try:
+        linhas = [_linha_item(item, lista_id, user_id) for item in itens]
+        inseridos = await _backend.insert_itens(user_id, linhas)
+        invalidar_cache("itens_lista", lista_id)
+        invalidar_cache("listas", user_id)
+        change_feed.publicar_inseridos([Item.from_row(r) for r in inseridos], user_id=user_id)
+        return len(inseridos) == len(linhas)
     except Exception as e:
-        print(f"Erro ao inserir item: {e}")
+        _falha("Erro ao inserir itens em lote", e)
         return False
 
-async def delete_item(item_id: int):
-    if not supabase: return False
+@instrumentar
+async def delete_item(item_id: int, *, user_id: str):
     try:
-        await asyncio.to_thread(
-            lambda: supabase.table("itens_lista").delete().eq("id", item_id).execute()
-        )
+        await _backend.delete_item(user_id, item_id)
+        _invalidar_itens([item_id], user_id)
+        change_feed.publicar_removidos(_item_lista.pop(item_id, None), [item_id], user_id=user_id)
         return True
     except Exception as e:
-        print(f"Erro ao excluir item: {e}")
+        _falha("Erro ao excluir item", e)
         return False
 
-async def update_item(item_id: int, dados: dict):
-    if not supabase: return False
+@instrumentar
+async def update_item(item_id: int, dados: dict, *, user_id: str):
     try:
-        res = await asyncio.to_thread(
-            lambda: supabase.table("itens_lista").update(dados).eq("id", item_id).execute()
-        )
-        return len(res.data) > 0
+        ok = await _backend.update_item(user_id, item_id, dados)
+        _invalidar_itens([item_id], user_id)
+        change_feed.publicar_alterados(_item_lista.get(item_id), [item_id], dados, user_id=user_id)
+        return ok
     except Exception as e:
-        print(f"Erro ao atualizar item: {e}")
+        _falha("Erro ao atualizar item", e)
+        return False
+
+@instrumentar
+async def update_items(ids: list, dados: dict, *, user_id: str):
+    """
+    Aplica o mesmo patch a vários itens com uma única requisição (filtro `in`).
+    Nenhuma linha alterada (itens excluídos ou de outro usuário) conta como falha.
+    """
+    if not ids: return True
+    try:
+        if not await _backend.update_itens(user_id, list(ids), dados):
+            print(f"[DB] Nenhum dos {len(ids)} item(ns) foi atualizado: excluídos ou de outro usuário.")
+            return False
+        _invalidar_itens(ids, user_id)
+        for lista_id, grupo in _por_lista(ids).items():
+            change_feed.publicar_alterados(lista_id, grupo, dados, user_id=user_id)
+        return True
+    except Exception as e:
+        _falha("Erro ao atualizar itens em lote", e)
+        return False
+
+async def set_comprado(ids: list, comprado: bool, *, user_id: str):
+    """Marca/desmarca vários itens como comprados numa única requisição (medido como update_items)."""
+    return await update_items(ids, {"comprado": bool(comprado)}, user_id=user_id)
+
+@instrumentar
+async def delete_items(ids: list, *, user_id: str):
+    """Exclui vários itens com uma única requisição (filtro `in`)."""
+    if not ids: return True
+    try:
+        await _backend.delete_itens(user_id, list(ids))
+        _invalidar_itens(ids, user_id)
+        for lista_id, grupo in _por_lista(ids).items():
+            change_feed.publicar_removidos(lista_id, grupo, user_id=user_id)
+        for item_id in ids:
+            _item_lista.pop(item_id, None)
+        return True
+    except Exception as e:
+        _falha("Erro ao excluir itens em lote", e)
         return False
 
 
@@ -152,125 +536,140 @@ async def update_item(item_id: int, dados: dict):
 # NF-e — REGISTRAR COMPRA FINALIZADA
 # ─────────────────────────────────────────────────
 
-async def registrar_compra_nfe(itens: list, mercado: str = "Compra NF-e", data_compra: str = None):
+@instrumentar
+async def get_lista_por_chave_nfe(chave_nfe: str, *, user_id: str):
     """
-    Cria uma lista automática com os itens da NF-e, todos marcados como comprado=True.
-    Retorna a lista criada ou None em caso de erro.
+    Lista já importada da NF-e com essa chave de acesso (Lista ou None).
+    Consultada logo após ler o QR, antes de qualquer acesso à SEFAZ ou ao Groq.
+    Sem cache: a resposta precisa refletir uma importação feita há instantes.
     """
-    if not supabase:
+    try:
+        row = await _backend.get_lista_por_chave_nfe(user_id, chave_nfe)
+        return Lista.from_row(row) if row else None
+    except Exception as e:
+        _falha("Erro ao buscar NF-e já importada", e)
         return None
-    from datetime import date as _date
-    data_str = data_compra or str(_date.today())
-    nome_lista = f"{mercado} — {data_str}"
-    lista = await create_lista(nome_lista, "Importado via QR NF-e", data_str)
-    if not lista:
+
+@instrumentar
+async def registrar_compra_nfe(itens: list, mercado: str = "Compra NF-e", data_compra: str = None,
+                               chave_nfe: str = None, *, user_id: str):
+    """
+    Cria uma lista automática com os itens da NF-e, todos marcados como comprado=True.
+    Lista, itens e a linha de historico_compras são gravados atomicamente
+    (RPC `registrar_compra_nfe` no Supabase; uma transação no SQLite) — nada
+    fica gravado pela metade. Com `chave_nfe` a importação é idempotente: se
+    a nota já virou lista, essa lista é devolvida e nada é gravado.
+    Retorna a Lista criada (ou a existente) ou None em caso de erro.
+    """
+    data_str = data_compra or str(date.today())
+    try:
+        # já comprado — vai direto ao histórico
+        linhas = [{**_linha_item(item, None, user_id), "comprado": True} for item in itens]
+        for linha in linhas:
+            del linha["lista_id"]
+        row = await _backend.registrar_compra(
+            user_id, f"{mercado} — {data_str}", "Importado via QR NF-e", data_str, linhas, chave_nfe
+        )
+        invalidar_cache("listas", user_id)
+        return Lista.from_row(row) if row else None
+    except Exception as e:
+        _falha("Erro ao registrar compra NF-e", e)
         return None
-    lista_id = lista["id"]
-    for item in itens:
-        item["lista_id"] = lista_id
-        item["comprado"] = True  # já comprado — vai direto ao histórico
-        await insert_item(item)
-    return lista
 
 
 # ─────────────────────────────────────────────────
 # HISTÓRICO
 # ─────────────────────────────────────────────────
 
-async def get_historico_compras():
-    """Retorna o histórico de compras (listas) com o total gasto em cada uma."""
-    if not supabase:
+@instrumentar
+async def get_historico_compras(inicio: str = None, fim: str = None, *, user_id: str):
+    """
+    Retorna o histórico de compras do usuário (list[ResumoCompra]) lendo o rollup
+    `historico_compras`: uma linha pequena por compra finalizada, com total e
+    quantidade já somados — o custo não cresce com o número de itens.
+    `inicio`/`fim` (ISO, inclusivos) restringem pela data da compra.
+    """
+    chave = ("historico", user_id, inicio, fim)
+    async def buscar():
+        geracao = _geracao(chave)
+        historico = [ResumoCompra.from_row(r) for r in await _backend.get_historico_compras(user_id, inicio, fim)]
+        if inicio is None and fim is None and _atual(chave, geracao):
+            snapshot.gravar(("historico", user_id), historico)
+        return historico
+    try:
+        return list(await _single_flight(chave, buscar))
+    except Exception as e:
+        _falha("Erro ao buscar histórico de compras", e)
         return []
+
+
+@instrumentar
+async def finalizar_compra(lista_id: int, *, user_id: str):
+    """
+    Registra a lista como compra finalizada: grava (ou atualiza, se já
+    finalizada) uma linha em historico_compras com o total dos itens comprados.
+    Depois disso, os triggers de 0009 mantêm a linha em dia com as edições.
+    Retorna o ResumoCompra gravado ou None.
+    """
     try:
-        res_listas = await asyncio.to_thread(
-            lambda: supabase.table("listas").select("*").order("data", desc=True).execute()
-        )
-        listas = res_listas.data or []
-
-        historico = []
-        for lista in listas:
-            lista_id = lista.get("id")
-            res_itens = await asyncio.to_thread(
-                lambda lid=lista_id: supabase.table("itens_lista")
-                    .select("preco, nome")
-                    .eq("lista_id", lid)
-                    .execute()
-            )
-            itens = res_itens.data or []
-
-            total = sum(float(item.get("preco") or 0) for item in itens)
-
-            historico.append({
-                "id": lista_id,
-                "mercado": lista.get("nome", "Mercado"),
-                "descricao": lista.get("descricao", ""),
-                "data": lista.get("data", ""),
-                "total": total,
-                "qtd_itens": len(itens),
-            })
+        row = await _backend.finalizar_compra(user_id, lista_id)
+        _invalidar_agregados()
+        return ResumoCompra.from_row(row) if row else None
+    except Exception as e:
+        _falha(f"Erro ao finalizar compra da lista {lista_id}", e)
+        return None
 
-        return historico
+
+@instrumentar
+async def backfill_historico_compras(*, user_id: str):
+    """Cria o rollup das listas antigas do usuário com itens comprados. Retorna quantas linhas criou."""
+    try:
+        criadas = await _backend.backfill_historico(user_id)
+        _invalidar_agregados()
+        if criadas:
+            print(f"[DB] Histórico: {criadas} compra(s) antigas adicionadas.")
+        return criadas
     except Exception as e:
-        print(f"Erro ao buscar histórico de compras: {e}")
-        return []
+        _falha("Erro ao preencher histórico de compras", e)
+        return 0
 
 
-async def get_totais_por_categoria():
+@instrumentar
+async def get_totais_por_categoria(inicio: str = None, fim: str = None, *, user_id: str):
     """
-    Retorna o total gasto agrupado por categoria, considerando todos os itens
+    Retorna o total gasto pelo usuário agrupado por categoria, considerando os itens
     marcados como comprado=True (já comprados via NF-e ou marcados na lista).
-    Retorna: list[dict] com {categoria, total, qtd_itens}
+    Agregado no servidor; `inicio`/`fim` (ISO, inclusivos) filtram por listas.data.
+    Retorna: list[TotalCategoria]
     """
-    if not supabase:
-        return []
+    async def buscar():
+        return [TotalCategoria.from_row(r) for r in await _backend.get_totais_por_categoria(user_id, inicio, fim)]
     try:
-        res = await asyncio.to_thread(
-            lambda: supabase.table("itens_lista")
-                .select("preco, categoria, comprado")
-                .eq("comprado", True)
-                .execute()
-        )
-        itens = res.data or []
-
-        totais: dict[str, dict] = {}
-        for item in itens:
-            cat = item.get("categoria") or "Outros"
-            preco = float(item.get("preco") or 0)
-            if cat not in totais:
-                totais[cat] = {"total": 0.0, "qtd_itens": 0}
-            totais[cat]["total"] += preco
-            totais[cat]["qtd_itens"] += 1
-
-        return [
-            {"categoria": cat, "total": v["total"], "qtd_itens": v["qtd_itens"]}
-            for cat, v in sorted(totais.items(), key=lambda x: -x[1]["total"])
-        ]
+        return list(await _single_flight(("totais_categoria", user_id, inicio, fim), buscar))
     except Exception as e:
-        print(f"Erro ao buscar totais por categoria: {e}")
+        _falha("Erro ao buscar totais por categoria", e)
         return []
 
 
-async def delete_itens_invalidos():
+@instrumentar
+async def delete_itens_invalidos(*, user_id: str):
 
-    """Remove itens com nomes inválidos gerados por parser quebrado."""
-    if not supabase: return 0
+    """Remove os itens do usuário com nomes inválidos gerados por parser quebrado."""
     try:
-        res = await asyncio.to_thread(
-            lambda: supabase.table("itens_lista").select("id, nome").execute()
-        )
-        itens = res.data or []
+        itens = await _backend.get_nomes_itens(user_id)
         PREFIXOS_INVALIDOS = ("vl. total", "vl.total", "total", "subtotal")
         ids_invalidos = [
             item["id"] for item in itens
             if item.get("nome", "").lower().strip().startswith(PREFIXOS_INVALIDOS)
         ]
         if ids_invalidos:
-            for item_id in ids_invalidos:
-                await asyncio.to_thread(
-                    lambda iid=item_id: supabase.table("itens_lista").delete().eq("id", iid).execute()
-                )
+            await _backend.delete_itens(user_id, ids_invalidos)
+            invalidar_cache("itens_lista")
+            invalidar_cache("listas", user_id)
+            for lista_id, grupo in _por_lista(ids_invalidos).items():
+                change_feed.publicar_removidos(lista_id, grupo, user_id=user_id)
             print(f"[DB] {len(ids_invalidos)} itens inválidos removidos.")
         return len(ids_invalidos)
     except Exception as e:
-        print(f"Erro ao limpar itens inválidos: {e}")
+        _falha("Erro ao limpar itens inválidos", e)
         return 0
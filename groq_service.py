@@ -1,6 +1,7 @@
 import os
 import base64
 import json
+import asyncio
 from groq import Groq
 
 def parse_groq_json(raw_text):
@@ -21,16 +22,31 @@ def parse_groq_json(raw_text):
         print(f"Failed to parse JSON: {e}")
         return []
 
+def encode_image(image_path):
+    """Conteúdo da imagem em base64."""
+    with open(image_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode("utf-8")
+
 def analyze_receipt_or_list_with_groq(image_path):
+    return analyze_encoded_image_with_groq(encode_image(image_path))
+
+async def analyze_receipt_or_list_with_groq_async(image_path):
+    """
+    Para as views: leitura, base64 e chamada ao Groq numa thread. Não usa o
+    pool de processos — o base64 é rápido e, lá, a string de vários MB
+    voltaria serializada pelo IPC só para seguir para a rede.
+    """
+    if not os.environ.get("GROQ_API_KEY"):
+        raise ValueError("GROQ_API_KEY não configurada no .env")
+    return await asyncio.to_thread(analyze_receipt_or_list_with_groq, image_path)
+
+def analyze_encoded_image_with_groq(encoded_string):
     api_key = os.environ.get("GROQ_API_KEY", "")
     if not api_key:
         raise ValueError("GROQ_API_KEY não configurada no .env")
 
     client = Groq(api_key=api_key)
-    
-    with open(image_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
-        
+
     chat_completion = client.chat.completions.create(
         messages=[
             {
@@ -44,6 +44,13 @@ def main(page: ft.Page):
             else:
                 page.views.append(get_listas_view(page))
 
+        elif r.startswith("/casa/"):
+            # Link de compartilhamento: este aparelho passa a usar os dados do outro
+            from sessao import entrar_na_casa
+            entrar_na_casa(page, r.split("/casa/")[1])
+            page.go("/listas")
+            return
+
         elif r == "/historico":
             page.views.append(get_historico_view(page))
 
@@ -69,6 +76,29 @@ if __name__ == "__main__":
 
     os.environ["FLET_SECRET_KEY"] = secret_key
 
+    # Pool de processos da leitura de QR/recibos: sobe antes das threads do
+    # servidor (workers criados por fork não herdam threads em andamento)
+    import scan_pool
+    scan_pool.iniciar()
+
+    # Métricas da camada de dados (Prometheus) em outra porta; 0 desativa
+    metrics_port = int(os.environ.get("METRICS_PORT", "9100"))
+    if metrics_port:
+        import metrics
+        metrics.iniciar_servidor(host, metrics_port)
+
+    # Feed de alterações: com o Supabase, escritas de outros clientes chegam
+    # por push (Realtime); sem ele, só o feed local do processo
+    import database
+    import change_feed
+    import migrar
+
+    # Migrações pendentes (Postgres via DATABASE_URL; o SQLite migra ao conectar)
+    migrar.na_inicializacao(database.DB_BACKEND)
+
+    if database.DB_BACKEND == "supabase":
+        change_feed.iniciar_realtime()
+
     ft.app(
         target=main,
         view=ft.AppView.WEB_BROWSER,
@@ -0,0 +1,163 @@
+"""
+Métricas da camada de dados (formato texto do Prometheus).
+
+`instrumentar` decora as corrotinas públicas de database.py e registra, por
+operação: histograma de latência, linhas devolvidas, bytes recebidos do
+servidor e erros por tipo de exceção. `iniciar_servidor` expõe tudo em
+GET /metrics numa thread à parte, ao lado do app Flet (ver main.py).
+
+Como a fachada trata as exceções e devolve um valor padrão, o erro chega
+aqui via `registrar_erro` (chamado nos blocos except) e não pela exceção.
+"""
+import time
+import threading
+import functools
+import contextvars
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIXO = "listacompras_db"
+
+# Limites dos buckets de latência (segundos)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_latencias: dict[str, list] = {}         # operacao -> [contagem por bucket..., +Inf, soma]
+_contadores: dict[tuple, float] = {}     # (metrica, operacao, tipo) -> valor
+_gauges: dict[str, callable] = {}        # nome -> fn() -> dict[rotulo, valor]
+
+# Estado da chamada em andamento (bytes recebidos e erro), por contexto asyncio
+_chamada: contextvars.ContextVar[dict | None] = contextvars.ContextVar("metrics_chamada", default=None)
+
+
+def _somar(metrica: str, operacao: str, valor: float, tipo: str = ""):
+    with _lock:
+        chave = (metrica, operacao, tipo)
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+def _observar(operacao: str, segundos: float):
+    with _lock:
+        h = _latencias.setdefault(operacao, [0] * (len(BUCKETS) + 2))
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                h[i] += 1
+        h[len(BUCKETS)] += 1        # +Inf (= _count)
+        h[len(BUCKETS) + 1] += segundos
+
+
+def _contar_linhas(resultado) -> int:
+    """Linhas devolvidas: listas, páginas (linhas, cursor) ou um registro."""
+    if isinstance(resultado, tuple) and resultado and isinstance(resultado[0], list):
+        return len(resultado[0])
+    if isinstance(resultado, list):
+        return len(resultado)
+    if resultado is None or isinstance(resultado, (bool, int)):
+        return 0
+    return 1
+
+
+def registrar_bytes(n: int):
+    """Bytes de resposta recebidos pela chamada em andamento (hook do backend HTTP)."""
+    estado = _chamada.get()
+    if estado is not None:
+        estado["bytes"] += n
+
+
+def registrar_erro(e: BaseException):
+    """Marca a chamada em andamento como falha (a fachada engole a exceção)."""
+    estado = _chamada.get()
+    if estado is not None:
+        estado["erro"] = type(e).__name__
+
+
+def registrar_gauges(nome: str, fn):
+    """`fn()` devolve {rótulo: valor}; lido a cada coleta (ex.: cache_stats)."""
+    _gauges[nome] = fn
+
+
+def instrumentar(fn):
+    """Decorador para as corrotinas públicas da camada de dados."""
+    operacao = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        estado = {"bytes": 0, "erro": None}
+        token = _chamada.set(estado)
+        t0 = time.perf_counter()
+        try:
+            resultado = await fn(*args, **kwargs)
+        except BaseException as e:
+            estado["erro"] = type(e).__name__
+            raise
+        finally:
+            _chamada.reset(token)
+            _observar(operacao, time.perf_counter() - t0)
+            _somar("chamadas_total", operacao, 1)
+            if estado["bytes"]:
+                _somar("payload_bytes_total", operacao, estado["bytes"])
+            if estado["erro"]:
+                _somar("erros_total", operacao, 1, estado["erro"])
+        _somar("linhas_total", operacao, _contar_linhas(resultado))
+        return resultado
+
+    return wrapper
+
+
+def formatar_prometheus() -> str:
+    """Todas as métricas no formato de exposição texto do Prometheus."""
+    linhas = []
+    with _lock:
+        nome = f"{PREFIXO}_latencia_segundos"
+        linhas += [f"# HELP {nome} Latência das operações da camada de dados.", f"# TYPE {nome} histogram"]
+        for op, h in sorted(_latencias.items()):
+            for i, limite in enumerate(BUCKETS):
+                linhas.append(f'{nome}_bucket{{operacao="{op}",le="{limite}"}} {h[i]}')
+            linhas.append(f'{nome}_bucket{{operacao="{op}",le="+Inf"}} {h[len(BUCKETS)]}')
+            linhas.append(f'{nome}_sum{{operacao="{op}"}} {h[len(BUCKETS) + 1]:.6f}')
+            linhas.append(f'{nome}_count{{operacao="{op}"}} {h[len(BUCKETS)]}')
+
+        for metrica, ajuda in (
+            ("chamadas_total", "Chamadas por operação."),
+            ("linhas_total", "Linhas devolvidas por operação."),
+            ("payload_bytes_total", "Bytes de resposta recebidos do servidor."),
+            ("erros_total", "Erros por operação e tipo de exceção."),
+        ):
+            nome = f"{PREFIXO}_{metrica}"
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} counter"]
+            for (m, op, tipo), valor in sorted(_contadores.items()):
+                if m != metrica:
+                    continue
+                rotulos = f'operacao="{op}"' + (f',tipo="{tipo}"' if tipo else "")
+                linhas.append(f"{nome}{{{rotulos}}} {valor:g}")
+
+    for gauge, fn in _gauges.items():
+        nome = f"{PREFIXO}_{gauge}"
+        linhas.append(f"# TYPE {nome} gauge")
+        for rotulo, valor in fn().items():
+            linhas.append(f'{nome}{{tipo="{rotulo}"}} {valor}')
+    return "\n".join(linhas) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = formatar_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_servidor(host: str, porta: int) -> ThreadingHTTPServer:
+    """Serve GET /metrics numa thread daemon (não bloqueia o app Flet)."""
+    servidor = ThreadingHTTPServer((host, porta), _Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True, name="metrics").start()
+    print(f"[Métricas] http://{host}:{servidor.server_port}/metrics")
+    return servidor
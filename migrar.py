@@ -0,0 +1,227 @@
+"""
+Migrações versionadas do banco (migrations/NNNN_nome.sql).
+
+Cada arquivo é aplicado uma única vez, em ordem, numa transação própria, e
+registrado na tabela schema_migrations. Roda na inicialização do app
+(main.py) ou pela linha de comando:
+
+    python migrar.py                   # aplica as pendentes
+    python migrar.py --status          # lista aplicadas/pendentes
+    python migrar.py --baseline 0005   # marca até 0005 como aplicadas, sem executar
+    python migrar.py --sqlite caminho.db
+    python migrar.py --adotar <uuid>   # linhas antigas sem dono passam a esse usuário
+
+Postgres/Supabase: precisa de DATABASE_URL (string de conexão direta do
+Postgres — a API REST não executa DDL) e do pacote psycopg. Num banco novo,
+schema.sql entra como a versão 0000_schema. Um banco que já tem as tabelas
+mas não tem schema_migrations (migrações rodadas à mão no SQL Editor) não é
+migrado às cegas: marque o que já foi aplicado com --baseline.
+
+SQLite: as mesmas versões são implementadas em backends/sqlite_backend.py
+(MIGRACOES) e aplicadas a cada conexão; aqui só se consulta o estado.
+"""
+import os
+import glob
+import argparse
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+VERSAO_SCHEMA = "0000_schema"
+
+# Chave do pg_advisory_lock: várias instâncias subindo juntas migram uma vez
+_TRAVA = 7_340_201
+
+_SQL_CONTROLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    versao TEXT PRIMARY KEY,
+    aplicada_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+
+def versoes() -> list[tuple[str, str]]:
+    """(versao, caminho) de cada migrations/*.sql, em ordem."""
+    arquivos = sorted(glob.glob(os.path.join(PASTA, "[0-9][0-9][0-9][0-9]_*.sql")))
+    return [(os.path.splitext(os.path.basename(a))[0], a) for a in arquivos]
+
+
+def _ler(caminho: str) -> str:
+    with open(caminho, encoding="utf-8") as f:
+        return f.read()
+
+
+# ─────────────────────────────────────────────────
+# POSTGRES
+# ─────────────────────────────────────────────────
+
+def _conectar_postgres(dsn: str):
+    try:
+        import psycopg
+    except ImportError:
+        raise RuntimeError("pacote 'psycopg' não instalado (pip install 'psycopg[binary]')")
+    return psycopg.connect(dsn, autocommit=True)
+
+
+def _aplicadas_postgres(conn) -> set[str] | None:
+    """Versões registradas; None se o banco ainda não tem schema_migrations."""
+    if conn.execute("SELECT to_regclass('schema_migrations')").fetchone()[0] is None:
+        return None
+    return {r[0] for r in conn.execute("SELECT versao FROM schema_migrations")}
+
+
+def aplicar_postgres(dsn: str, baseline: str | None = None) -> list[str]:
+    """Aplica as migrações pendentes no Postgres. Retorna as versões aplicadas agora."""
+    novas = []
+    with _conectar_postgres(dsn) as conn:
+        conn.execute("SELECT pg_advisory_lock(%s)", (_TRAVA,))
+        try:
+            aplicadas = _aplicadas_postgres(conn)
+            if aplicadas is None:
+                banco_novo = conn.execute("SELECT to_regclass('listas')").fetchone()[0] is None
+                if not banco_novo and baseline is None:
+                    raise RuntimeError(
+                        "banco já tem as tabelas mas não tem schema_migrations — "
+                        "marque as migrações já aplicadas com: python migrar.py --baseline NNNN"
+                    )
+                conn.execute(_SQL_CONTROLE)
+                aplicadas = set()
+                if banco_novo:
+                    with conn.transaction():
+                        conn.execute(_ler(SCHEMA_PATH))
+                        conn.execute("INSERT INTO schema_migrations (versao) VALUES (%s)", (VERSAO_SCHEMA,))
+                    novas.append(VERSAO_SCHEMA)
+
+            if baseline:
+                for versao, _ in versoes():
+                    if versao[:4] <= baseline[:4] and versao not in aplicadas:
+                        conn.execute(
+                            "INSERT INTO schema_migrations (versao) VALUES (%s) ON CONFLICT DO NOTHING", (versao,)
+                        )
+                        aplicadas.add(versao)
+                        print(f"[Migrações] {versao} marcada como aplicada (baseline).")
+
+            for versao, caminho in versoes():
+                if versao in aplicadas:
+                    continue
+                with conn.transaction():
+                    conn.execute(_ler(caminho))
+                    conn.execute("INSERT INTO schema_migrations (versao) VALUES (%s)", (versao,))
+                novas.append(versao)
+                print(f"[Migrações] {versao} aplicada.")
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (_TRAVA,))
+    return novas
+
+
+# Linhas anteriores a 0005 têm user_id NULL e não aparecem para ninguém até
+# ganharem um dono: o APP_USER_ID da instalação ou o --adotar da linha de comando.
+_TABELAS_COM_DONO = ("listas", "itens_lista", "historico_compras")
+
+
+def adotar_sem_dono_postgres(dsn: str, dono: str) -> int:
+    """Atribui as linhas sem dono a `dono`, numa transação. Retorna quantas foram adotadas."""
+    with _conectar_postgres(dsn) as conn, conn.transaction():
+        return sum(
+            conn.execute(f"UPDATE {tabela} SET user_id = %s WHERE user_id IS NULL", (dono,)).rowcount
+            for tabela in _TABELAS_COM_DONO
+        )
+
+
+def sem_dono_postgres(dsn: str) -> int:
+    with _conectar_postgres(dsn) as conn:
+        return conn.execute("SELECT COUNT(*) FROM listas WHERE user_id IS NULL").fetchone()[0]
+
+
+def status_postgres(dsn: str) -> list[tuple[str, bool]]:
+    with _conectar_postgres(dsn) as conn:
+        aplicadas = _aplicadas_postgres(conn) or set()
+    return [(v, v in aplicadas) for v, _ in versoes()]
+
+
+# ─────────────────────────────────────────────────
+# SQLITE
+# ─────────────────────────────────────────────────
+
+def status_sqlite(caminho: str | None = None) -> list[tuple[str, bool]]:
+    """Abre o banco (o que já aplica as pendentes) e lista o estado de cada versão."""
+    from backends import sqlite_backend
+
+    conn = sqlite_backend.conectar(caminho)
+    aplicadas = {r[0] for r in conn.execute("SELECT versao FROM schema_migrations")}
+    implementadas = {v for v, _ in sqlite_backend.MIGRACOES}
+    for versao, _ in versoes():
+        if versao not in implementadas:
+            print(f"[Migrações] Aviso: {versao} não tem equivalente no SQLite (sqlite_backend.MIGRACOES).")
+    return [(v, v in aplicadas) for v, _ in versoes()]
+
+
+# ─────────────────────────────────────────────────
+# INICIALIZAÇÃO
+# ─────────────────────────────────────────────────
+
+def na_inicializacao(backend: str):
+    """
+    Chamado por main.py. No Supabase, aplica as pendentes se DATABASE_URL
+    estiver definida (MIGRAR_NA_INICIALIZACAO=0 desliga); o SQLite migra
+    sozinho ao conectar. Falhas não impedem o app de subir.
+    """
+    dsn = os.environ.get("DATABASE_URL")
+    if backend != "supabase" or not dsn or os.environ.get("MIGRAR_NA_INICIALIZACAO", "1") != "1":
+        return
+    try:
+        novas = aplicar_postgres(dsn)
+        print(f"[Migrações] {len(novas)} aplicada(s)." if novas else "[Migrações] Banco em dia.")
+    except Exception as e:
+        print(f"[Migrações] Não aplicadas: {e}")
+        return
+    try:
+        dono = os.environ.get("APP_USER_ID")
+        if dono:
+            adotadas = adotar_sem_dono_postgres(dsn, dono)
+            if adotadas:
+                print(f"[Migrações] {adotadas} linha(s) sem dono adotadas por APP_USER_ID.")
+        elif orfas := sem_dono_postgres(dsn):
+            print(f"[Migrações] {orfas} lista(s) sem dono estão invisíveis: defina APP_USER_ID "
+                  "ou rode python migrar.py --adotar <uuid>.")
+    except Exception as e:
+        print(f"[Migrações] Não foi possível verificar linhas sem dono: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrações versionadas (migrations/*.sql).")
+    parser.add_argument("--status", action="store_true", help="lista versões aplicadas e pendentes")
+    parser.add_argument("--baseline", metavar="NNNN", help="marca as versões até NNNN como aplicadas")
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"), help="Postgres (padrão: DATABASE_URL)")
+    parser.add_argument("--sqlite", metavar="ARQUIVO", help="usa o banco SQLite em vez do Postgres")
+    parser.add_argument("--adotar", metavar="UUID", help="atribui as linhas sem dono (anteriores a 0005) a esse usuário")
+    args = parser.parse_args()
+
+    if args.adotar:
+        import uuid
+        dono = str(uuid.UUID(args.adotar))
+        if args.sqlite or not args.dsn:
+            from backends import sqlite_backend
+            conn = sqlite_backend.conectar(args.sqlite)
+            with conn:
+                adotadas = sqlite_backend.adotar_sem_dono(conn, dono)
+        else:
+            adotadas = adotar_sem_dono_postgres(args.dsn, dono)
+        print(f"[Migrações] {adotadas} linha(s) sem dono atribuídas a {dono}.")
+        return
+
+    if args.sqlite or not args.dsn:
+        estado = status_sqlite(args.sqlite)
+    elif args.status:
+        estado = status_postgres(args.dsn)
+    else:
+        aplicar_postgres(args.dsn, args.baseline)
+        estado = status_postgres(args.dsn)
+
+    for versao, aplicada in estado:
+        print(f"  {'✔' if aplicada else '·'} {versao}")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -0,0 +1,131 @@
+-- ─────────────────────────────────────────────────
+-- Migração 0001: resumo desnormalizado por lista
+-- total, qtd_itens e qtd_pendentes em `listas`, mantidos por triggers
+-- em itens_lista — a tela de listas e o histórico leem o resumo sem
+-- buscar (nem agregar) os itens. Idempotente: pode rodar mais de uma vez.
+-- ─────────────────────────────────────────────────
+ALTER TABLE listas
+    ADD COLUMN IF NOT EXISTS total NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS qtd_itens INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS qtd_pendentes INTEGER NOT NULL DEFAULT 0;
+
+-- Triggers por statement com tabelas de transição: um insert em lote de
+-- 100 itens (NF-e) vira um único UPDATE em listas, não 100.
+CREATE OR REPLACE FUNCTION atualizar_resumo_listas()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE listas l
+        SET total = l.total + d.total,
+            qtd_itens = l.qtd_itens + d.qtd,
+            qtd_pendentes = l.qtd_pendentes + d.pendentes
+        FROM (
+            SELECT lista_id,
+                   SUM(COALESCE(preco, 0)) AS total,
+                   COUNT(*) AS qtd,
+                   COUNT(*) FILTER (WHERE NOT COALESCE(comprado, FALSE)) AS pendentes
+            FROM novos
+            WHERE lista_id IS NOT NULL
+            GROUP BY lista_id
+        ) d
+        WHERE l.id = d.lista_id;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE listas l
+        SET total = l.total - d.total,
+            qtd_itens = l.qtd_itens - d.qtd,
+            qtd_pendentes = l.qtd_pendentes - d.pendentes
+        FROM (
+            SELECT lista_id,
+                   SUM(COALESCE(preco, 0)) AS total,
+                   COUNT(*) AS qtd,
+                   COUNT(*) FILTER (WHERE NOT COALESCE(comprado, FALSE)) AS pendentes
+            FROM antigos
+            WHERE lista_id IS NOT NULL
+            GROUP BY lista_id
+        ) d
+        WHERE l.id = d.lista_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS itens_resumo_insert ON itens_lista;
+CREATE TRIGGER itens_resumo_insert
+    AFTER INSERT ON itens_lista
+    REFERENCING NEW TABLE AS novos
+    FOR EACH STATEMENT EXECUTE FUNCTION atualizar_resumo_listas();
+
+DROP TRIGGER IF EXISTS itens_resumo_update ON itens_lista;
+CREATE TRIGGER itens_resumo_update
+    AFTER UPDATE ON itens_lista
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos
+    FOR EACH STATEMENT EXECUTE FUNCTION atualizar_resumo_listas();
+
+DROP TRIGGER IF EXISTS itens_resumo_delete ON itens_lista;
+CREATE TRIGGER itens_resumo_delete
+    AFTER DELETE ON itens_lista
+    REFERENCING OLD TABLE AS antigos
+    FOR EACH STATEMENT EXECUTE FUNCTION atualizar_resumo_listas();
+
+-- Preenche o resumo das listas já existentes
+UPDATE listas l
+SET total = s.total,
+    qtd_itens = s.qtd,
+    qtd_pendentes = s.pendentes
+FROM (
+    SELECT l2.id,
+           COALESCE(SUM(i.preco), 0) AS total,
+           COUNT(i.id) AS qtd,
+           COUNT(i.id) FILTER (WHERE NOT COALESCE(i.comprado, FALSE)) AS pendentes
+    FROM listas l2
+    LEFT JOIN itens_lista i ON i.lista_id = l2.id
+    GROUP BY l2.id
+) s
+WHERE l.id = s.id;
+
+-- O histórico passa a ler o resumo: sem JOIN/GROUP BY em itens_lista
+CREATE OR REPLACE VIEW historico_listas AS
+SELECT
+    id,
+    nome,
+    descricao,
+    data,
+    total::FLOAT8 AS total,
+    qtd_itens
+FROM listas;
+
+-- A RPC devolve a lista já com o resumo calculado pelos triggers
+CREATE OR REPLACE FUNCTION registrar_compra_nfe(
+    p_nome TEXT,
+    p_descricao TEXT,
+    p_data DATE,
+    p_itens JSONB
+)
+RETURNS listas
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    nova listas;
+BEGIN
+    INSERT INTO listas (nome, descricao, data)
+    VALUES (p_nome, p_descricao, COALESCE(p_data, CURRENT_DATE))
+    RETURNING * INTO nova;
+
+    INSERT INTO itens_lista (lista_id, nome, categoria, comprado, preco)
+    SELECT
+        nova.id,
+        i ->> 'nome',
+        i ->> 'categoria',
+        COALESCE((i ->> 'comprado')::BOOLEAN, TRUE),
+        COALESCE((i ->> 'preco')::NUMERIC, 0)
+    FROM jsonb_array_elements(p_itens) AS i;
+
+    SELECT * INTO nova FROM listas WHERE id = nova.id;
+    RETURN nova;
+END;
+$$;
@@ -0,0 +1,103 @@
+-- ─────────────────────────────────────────────────
+-- Migração 0002: historico_compras como rollup de compras finalizadas
+-- Uma linha por compra (lista finalizada ou NF-e importada) com total e
+-- quantidade de itens já somados — a tela de histórico lê só esta tabela,
+-- e o custo não cresce com o número de itens. Idempotente.
+-- ─────────────────────────────────────────────────
+ALTER TABLE historico_compras
+    ADD COLUMN IF NOT EXISTS lista_id INTEGER REFERENCES listas(id) ON DELETE SET NULL,
+    ADD COLUMN IF NOT EXISTS descricao TEXT,
+    ADD COLUMN IF NOT EXISTS qtd_itens INTEGER NOT NULL DEFAULT 0;
+
+-- Uma linha por lista: finalizar de novo atualiza o rollup existente
+CREATE UNIQUE INDEX IF NOT EXISTS historico_compras_lista_id_key ON historico_compras (lista_id);
+CREATE INDEX IF NOT EXISTS historico_compras_data_idx ON historico_compras (data DESC);
+
+-- ─────────────────────────────────────────────────
+-- RPC: finalizar compra de uma lista (soma os itens comprados)
+-- ─────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION finalizar_compra(p_lista_id INTEGER)
+RETURNS historico_compras
+LANGUAGE sql
+AS $$
+    INSERT INTO historico_compras (lista_id, data, mercado, descricao, total, qtd_itens)
+    SELECT
+        l.id,
+        l.data,
+        l.nome,
+        l.descricao,
+        COALESCE(SUM(i.preco), 0),
+        COUNT(i.id)::INTEGER
+    FROM listas l
+    LEFT JOIN itens_lista i ON i.lista_id = l.id AND i.comprado
+    WHERE l.id = p_lista_id
+    GROUP BY l.id
+    ON CONFLICT (lista_id) DO UPDATE SET
+        data = EXCLUDED.data,
+        mercado = EXCLUDED.mercado,
+        descricao = EXCLUDED.descricao,
+        total = EXCLUDED.total,
+        qtd_itens = EXCLUDED.qtd_itens
+    RETURNING *;
+$$;
+
+-- ─────────────────────────────────────────────────
+-- RPC: backfill — cria o rollup das listas antigas com itens comprados
+-- Retorna quantas linhas foram criadas (listas já presentes são ignoradas).
+-- ─────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION backfill_historico_compras()
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH novos AS (
+        INSERT INTO historico_compras (lista_id, data, mercado, descricao, total, qtd_itens)
+        SELECT
+            l.id,
+            l.data,
+            l.nome,
+            l.descricao,
+            COALESCE(SUM(i.preco), 0),
+            COUNT(i.id)::INTEGER
+        FROM listas l
+        JOIN itens_lista i ON i.lista_id = l.id AND i.comprado
+        GROUP BY l.id
+        ON CONFLICT (lista_id) DO NOTHING
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM novos;
+$$;
+
+SELECT backfill_historico_compras();
+
+-- A importação de NF-e já é uma compra finalizada: grava o rollup junto
+CREATE OR REPLACE FUNCTION registrar_compra_nfe(
+    p_nome TEXT,
+    p_descricao TEXT,
+    p_data DATE,
+    p_itens JSONB
+)
+RETURNS listas
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    nova listas;
+BEGIN
+    INSERT INTO listas (nome, descricao, data)
+    VALUES (p_nome, p_descricao, COALESCE(p_data, CURRENT_DATE))
+    RETURNING * INTO nova;
+
+    INSERT INTO itens_lista (lista_id, nome, categoria, comprado, preco)
+    SELECT
+        nova.id,
+        i ->> 'nome',
+        i ->> 'categoria',
+        COALESCE((i ->> 'comprado')::BOOLEAN, TRUE),
+        COALESCE((i ->> 'preco')::NUMERIC, 0)
+    FROM jsonb_array_elements(p_itens) AS i;
+
+    PERFORM finalizar_compra(nova.id);
+
+    SELECT * INTO nova FROM listas WHERE id = nova.id;
+    RETURN nova;
+END;
+$$;
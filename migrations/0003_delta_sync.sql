@@ -0,0 +1,183 @@
+-- ─────────────────────────────────────────────────
+-- Migração 0003: sincronização por delta (updated_at + tombstones)
+-- Toda alteração em listas/itens_lista carimba updated_at no servidor e
+-- exclusões viram tombstones (deleted_at), para que o app busque só o que
+-- mudou desde a última marca d'água. Idempotente.
+-- ─────────────────────────────────────────────────
+ALTER TABLE listas
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+
+ALTER TABLE itens_lista
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS itens_lista_lista_updated_idx ON itens_lista (lista_id, updated_at);
+CREATE INDEX IF NOT EXISTS listas_updated_idx ON listas (updated_at);
+
+-- clock_timestamp(): horário real da alteração, não o início da transação
+CREATE OR REPLACE FUNCTION tocar_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS listas_updated_at ON listas;
+CREATE TRIGGER listas_updated_at
+    BEFORE UPDATE ON listas
+    FOR EACH ROW EXECUTE FUNCTION tocar_updated_at();
+
+DROP TRIGGER IF EXISTS itens_lista_updated_at ON itens_lista;
+CREATE TRIGGER itens_lista_updated_at
+    BEFORE UPDATE ON itens_lista
+    FOR EACH ROW EXECUTE FUNCTION tocar_updated_at();
+
+-- Resumo (0001): tombstones deixam de contar — marcar deleted_at subtrai
+CREATE OR REPLACE FUNCTION atualizar_resumo_listas()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE listas l
+        SET total = l.total + d.total,
+            qtd_itens = l.qtd_itens + d.qtd,
+            qtd_pendentes = l.qtd_pendentes + d.pendentes
+        FROM (
+            SELECT lista_id,
+                   SUM(COALESCE(preco, 0)) AS total,
+                   COUNT(*) AS qtd,
+                   COUNT(*) FILTER (WHERE NOT COALESCE(comprado, FALSE)) AS pendentes
+            FROM novos
+            WHERE lista_id IS NOT NULL AND deleted_at IS NULL
+            GROUP BY lista_id
+        ) d
+        WHERE l.id = d.lista_id;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE listas l
+        SET total = l.total - d.total,
+            qtd_itens = l.qtd_itens - d.qtd,
+            qtd_pendentes = l.qtd_pendentes - d.pendentes
+        FROM (
+            SELECT lista_id,
+                   SUM(COALESCE(preco, 0)) AS total,
+                   COUNT(*) AS qtd,
+                   COUNT(*) FILTER (WHERE NOT COALESCE(comprado, FALSE)) AS pendentes
+            FROM antigos
+            WHERE lista_id IS NOT NULL AND deleted_at IS NULL
+            GROUP BY lista_id
+        ) d
+        WHERE l.id = d.lista_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE VIEW historico_listas AS
+SELECT
+    id,
+    nome,
+    descricao,
+    data,
+    total::FLOAT8 AS total,
+    qtd_itens
+FROM listas
+WHERE deleted_at IS NULL;
+
+CREATE OR REPLACE FUNCTION totais_por_categoria(
+    p_inicio DATE DEFAULT NULL,
+    p_fim DATE DEFAULT NULL
+)
+RETURNS TABLE (categoria TEXT, total FLOAT8, qtd_itens INTEGER)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        COALESCE(i.categoria, 'Outros'),
+        COALESCE(SUM(i.preco), 0)::FLOAT8,
+        COUNT(*)::INTEGER
+    FROM itens_lista i
+    JOIN listas l ON l.id = i.lista_id
+    WHERE i.comprado
+      AND i.deleted_at IS NULL
+      AND l.deleted_at IS NULL
+      AND (p_inicio IS NULL OR l.data >= p_inicio)
+      AND (p_fim IS NULL OR l.data <= p_fim)
+    GROUP BY 1
+    ORDER BY 2 DESC;
+$$;
+
+CREATE OR REPLACE FUNCTION finalizar_compra(p_lista_id INTEGER)
+RETURNS historico_compras
+LANGUAGE sql
+AS $$
+    INSERT INTO historico_compras (lista_id, data, mercado, descricao, total, qtd_itens)
+    SELECT
+        l.id,
+        l.data,
+        l.nome,
+        l.descricao,
+        COALESCE(SUM(i.preco), 0),
+        COUNT(i.id)::INTEGER
+    FROM listas l
+    LEFT JOIN itens_lista i ON i.lista_id = l.id AND i.comprado AND i.deleted_at IS NULL
+    WHERE l.id = p_lista_id
+    GROUP BY l.id
+    ON CONFLICT (lista_id) DO UPDATE SET
+        data = EXCLUDED.data,
+        mercado = EXCLUDED.mercado,
+        descricao = EXCLUDED.descricao,
+        total = EXCLUDED.total,
+        qtd_itens = EXCLUDED.qtd_itens
+    RETURNING *;
+$$;
+
+CREATE OR REPLACE FUNCTION backfill_historico_compras()
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH novos AS (
+        INSERT INTO historico_compras (lista_id, data, mercado, descricao, total, qtd_itens)
+        SELECT
+            l.id,
+            l.data,
+            l.nome,
+            l.descricao,
+            COALESCE(SUM(i.preco), 0),
+            COUNT(i.id)::INTEGER
+        FROM listas l
+        JOIN itens_lista i ON i.lista_id = l.id AND i.comprado AND i.deleted_at IS NULL
+        WHERE l.deleted_at IS NULL
+        GROUP BY l.id
+        ON CONFLICT (lista_id) DO NOTHING
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM novos;
+$$;
+
+-- ─────────────────────────────────────────────────
+-- Limpeza: remove de fato tombstones com mais de p_dias dias
+-- (clientes parados há mais tempo que isso devem recarregar tudo)
+-- ─────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION limpar_tombstones(p_dias INTEGER DEFAULT 30)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    n_itens INTEGER;
+    n_listas INTEGER;
+BEGIN
+    DELETE FROM itens_lista WHERE deleted_at < NOW() - make_interval(days => p_dias);
+    GET DIAGNOSTICS n_itens = ROW_COUNT;
+    DELETE FROM listas WHERE deleted_at < NOW() - make_interval(days => p_dias);
+    GET DIAGNOSTICS n_listas = ROW_COUNT;
+    RETURN n_itens + n_listas;
+END;
+$$;
@@ -0,0 +1,22 @@
+-- ─────────────────────────────────────────────────
+-- Migração 0004: feed de alterações via Supabase Realtime
+-- Publica as alterações de itens_lista (postgres_changes) para que a tela
+-- de uma lista receba INSERT/UPDATE/DELETE por push (ver change_feed.py).
+-- Exclusões do app são tombstones (UPDATE com deleted_at), que já chegam
+-- com a linha completa; por isso não é preciso REPLICA IDENTITY FULL.
+-- Idempotente.
+-- ─────────────────────────────────────────────────
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime')
+       AND NOT EXISTS (
+           SELECT 1 FROM pg_publication_tables
+           WHERE pubname = 'supabase_realtime'
+             AND schemaname = 'public'
+             AND tablename = 'itens_lista'
+       )
+    THEN
+        ALTER PUBLICATION supabase_realtime ADD TABLE itens_lista;
+    END IF;
+END;
+$$;
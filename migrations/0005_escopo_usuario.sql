@@ -0,0 +1,174 @@
+-- ─────────────────────────────────────────────────
+-- Migração 0005: dados por usuário (user_id + RLS)
+-- Cada navegador tem um UUID próprio (sessao.py), enviado pelo app no
+-- cabeçalho x-user-id de toda requisição. Listas, itens e histórico levam
+-- user_id; as consultas filtram por ele e os índices começam por ele, então
+-- o custo de cada tela acompanha os dados de um usuário, não da instalação.
+-- Idempotente.
+--
+-- O escopo é garantido pelo APP, não pela RLS:
+--   * Sem Supabase Auth, app_user_id() lê o x-user-id, que é escolhido por
+--     quem faz a requisição. Quem tiver a chave anon pode mandar qualquer
+--     UUID — as políticas abaixo só pegam consultas do próprio app que
+--     esqueçam o filtro, não impedem acesso deliberado.
+--   * A chave fica só no servidor (o Flet roda o Python no servidor; o
+--     navegador nunca a vê), e o servidor filtra por user_id em toda
+--     consulta. Use a chave service_role: a RLS é ignorada e o Realtime
+--     (change_feed.py) enxerga as linhas; o feed repassa cada evento só às
+--     sessões do dono da linha.
+--   * Com login (Supabase Auth), auth.uid() tem precedência e aí sim a RLS
+--     é a garantia — desde que o cliente use o JWT do usuário.
+--   * Linhas antigas ficam com user_id NULL (invisíveis) até ganharem dono:
+--     com APP_USER_ID definido, migrar.py as adota na inicialização; sem
+--     ele, rode `python migrar.py --adotar <uuid>` (o uuid de um navegador
+--     aparece no link "usar em outro aparelho" da tela de listas).
+-- ─────────────────────────────────────────────────
+
+-- Usuário da requisição: login do Supabase Auth, se houver; senão o x-user-id
+CREATE OR REPLACE FUNCTION app_user_id()
+RETURNS UUID
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(
+        auth.uid(),
+        NULLIF(current_setting('request.headers', true)::json ->> 'x-user-id', '')::UUID
+    );
+$$;
+
+ALTER TABLE listas ADD COLUMN IF NOT EXISTS user_id UUID;
+
+ALTER TABLE listas ALTER COLUMN user_id SET DEFAULT app_user_id();
+ALTER TABLE itens_lista ALTER COLUMN user_id SET DEFAULT app_user_id();
+ALTER TABLE historico_compras ALTER COLUMN user_id SET DEFAULT app_user_id();
+
+-- Itens e histórico antigos herdam o dono da lista (quando ela já tem um)
+UPDATE itens_lista i SET user_id = l.user_id
+FROM listas l
+WHERE i.lista_id = l.id AND i.user_id IS NULL AND l.user_id IS NOT NULL;
+
+UPDATE historico_compras h SET user_id = l.user_id
+FROM listas l
+WHERE h.lista_id = l.id AND h.user_id IS NULL AND l.user_id IS NOT NULL;
+
+-- ─────────────────────────────────────────────────
+-- Índices compostos começando por user_id
+-- ─────────────────────────────────────────────────
+-- get_listas / get_listas_pagina (data desc, id desc)
+CREATE INDEX IF NOT EXISTS listas_user_data_idx
+    ON listas (user_id, data DESC, id DESC) WHERE deleted_at IS NULL;
+-- get_itens_lista / get_itens_pagina (id desc), get_nomes_itens, totais
+CREATE INDEX IF NOT EXISTS itens_lista_user_lista_idx
+    ON itens_lista (user_id, lista_id, id DESC) WHERE deleted_at IS NULL;
+-- get_historico_compras (data desc, id desc)
+CREATE INDEX IF NOT EXISTS historico_compras_user_data_idx
+    ON historico_compras (user_id, data DESC, id DESC);
+
+-- ─────────────────────────────────────────────────
+-- Row Level Security
+-- ─────────────────────────────────────────────────
+ALTER TABLE listas ENABLE ROW LEVEL SECURITY;
+ALTER TABLE itens_lista ENABLE ROW LEVEL SECURITY;
+ALTER TABLE historico_compras ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS listas_do_usuario ON listas;
+CREATE POLICY listas_do_usuario ON listas
+    FOR ALL
+    USING (user_id = app_user_id())
+    WITH CHECK (user_id = app_user_id());
+
+DROP POLICY IF EXISTS itens_do_usuario ON itens_lista;
+CREATE POLICY itens_do_usuario ON itens_lista
+    FOR ALL
+    USING (user_id = app_user_id())
+    WITH CHECK (user_id = app_user_id());
+
+DROP POLICY IF EXISTS historico_do_usuario ON historico_compras;
+CREATE POLICY historico_do_usuario ON historico_compras
+    FOR ALL
+    USING (user_id = app_user_id())
+    WITH CHECK (user_id = app_user_id());
+
+-- Views rodam com as permissões de quem consulta (Postgres 15+), senão
+-- ignorariam a RLS das tabelas
+ALTER VIEW historico_listas SET (security_invoker = true);
+
+-- ─────────────────────────────────────────────────
+-- RPCs: filtro explícito por usuário (vale também com service_role)
+-- ─────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION totais_por_categoria(
+    p_inicio DATE DEFAULT NULL,
+    p_fim DATE DEFAULT NULL
+)
+RETURNS TABLE (categoria TEXT, total FLOAT8, qtd_itens INTEGER)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        COALESCE(i.categoria, 'Outros'),
+        COALESCE(SUM(i.preco), 0)::FLOAT8,
+        COUNT(*)::INTEGER
+    FROM itens_lista i
+    JOIN listas l ON l.id = i.lista_id
+    WHERE i.user_id = app_user_id()
+      AND l.user_id = app_user_id()
+      AND i.comprado
+      AND i.deleted_at IS NULL
+      AND l.deleted_at IS NULL
+      AND (p_inicio IS NULL OR l.data >= p_inicio)
+      AND (p_fim IS NULL OR l.data <= p_fim)
+    GROUP BY 1
+    ORDER BY 2 DESC;
+$$;
+
+CREATE OR REPLACE FUNCTION finalizar_compra(p_lista_id INTEGER)
+RETURNS historico_compras
+LANGUAGE sql
+AS $$
+    INSERT INTO historico_compras (lista_id, user_id, data, mercado, descricao, total, qtd_itens)
+    SELECT
+        l.id,
+        l.user_id,
+        l.data,
+        l.nome,
+        l.descricao,
+        COALESCE(SUM(i.preco), 0),
+        COUNT(i.id)::INTEGER
+    FROM listas l
+    LEFT JOIN itens_lista i ON i.lista_id = l.id AND i.comprado AND i.deleted_at IS NULL
+    WHERE l.id = p_lista_id
+      AND l.user_id = app_user_id()
+    GROUP BY l.id
+    ON CONFLICT (lista_id) DO UPDATE SET
+        data = EXCLUDED.data,
+        mercado = EXCLUDED.mercado,
+        descricao = EXCLUDED.descricao,
+        total = EXCLUDED.total,
+        qtd_itens = EXCLUDED.qtd_itens
+    RETURNING *;
+$$;
+
+CREATE OR REPLACE FUNCTION backfill_historico_compras()
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH novos AS (
+        INSERT INTO historico_compras (lista_id, user_id, data, mercado, descricao, total, qtd_itens)
+        SELECT
+            l.id,
+            l.user_id,
+            l.data,
+            l.nome,
+            l.descricao,
+            COALESCE(SUM(i.preco), 0),
+            COUNT(i.id)::INTEGER
+        FROM listas l
+        JOIN itens_lista i ON i.lista_id = l.id AND i.comprado AND i.deleted_at IS NULL
+        WHERE l.deleted_at IS NULL
+          AND l.user_id = app_user_id()
+        GROUP BY l.id
+        ON CONFLICT (lista_id) DO NOTHING
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM novos;
+$$;
@@ -0,0 +1,25 @@
+-- ─────────────────────────────────────────────────
+-- Migração 0006: índices das consultas quentes
+-- Complementa os índices por usuário de 0005 e o (lista_id, updated_at)
+-- de 0003 — que também cobre a FK itens_lista.lista_id (ON DELETE CASCADE
+-- e o trigger de resumo). Conferir com benchmarks/bench_indices.py.
+-- Idempotente. CREATE INDEX simples (sem CONCURRENTLY): o runner aplica
+-- cada migração numa transação; em bases grandes, rodar fora do horário.
+-- ─────────────────────────────────────────────────
+
+-- totais_por_categoria: itens comprados do usuário agrupados por categoria,
+-- lidos só do índice (preço e lista para a junção com a janela de datas)
+CREATE INDEX IF NOT EXISTS itens_lista_user_comprados_categoria_idx
+    ON itens_lista (user_id, categoria)
+    INCLUDE (preco, lista_id)
+    WHERE comprado AND deleted_at IS NULL;
+
+-- finalizar_compra / backfill_historico_compras: itens comprados de uma lista
+CREATE INDEX IF NOT EXISTS itens_lista_lista_comprados_idx
+    ON itens_lista (lista_id)
+    INCLUDE (preco)
+    WHERE comprado AND deleted_at IS NULL;
+
+ANALYZE listas;
+ANALYZE itens_lista;
+ANALYZE historico_compras;
@@ -0,0 +1,64 @@
+-- ─────────────────────────────────────────────────
+-- Migração 0007: importação de NF-e idempotente
+-- A lista importada guarda a chave de acesso da NFC-e (44 dígitos, lida do
+-- parâmetro p= da URL do QR). Um índice único por usuário impede que a
+-- mesma nota vire duas listas — o app consulta a chave antes de buscar a
+-- SEFAZ, e a RPC devolve a lista já existente se duas leituras correrem
+-- juntas. Listas excluídas (deleted_at) liberam a chave para reimportar.
+-- Idempotente.
+-- ─────────────────────────────────────────────────
+
+ALTER TABLE listas ADD COLUMN IF NOT EXISTS chave_nfe TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS listas_user_chave_nfe_key
+    ON listas (user_id, chave_nfe)
+    WHERE chave_nfe IS NOT NULL AND deleted_at IS NULL;
+
+-- ─────────────────────────────────────────────────
+-- RPC: registrar compra da NF-e, agora com a chave de acesso
+-- O parâmetro novo muda a assinatura: a versão antiga sai para o PostgREST
+-- não ficar com duas sobrecargas ambíguas.
+-- ─────────────────────────────────────────────────
+DROP FUNCTION IF EXISTS registrar_compra_nfe(TEXT, TEXT, DATE, JSONB);
+
+CREATE OR REPLACE FUNCTION registrar_compra_nfe(
+    p_nome TEXT,
+    p_descricao TEXT,
+    p_data DATE,
+    p_itens JSONB,
+    p_chave_nfe TEXT DEFAULT NULL
+)
+RETURNS listas
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    nova listas;
+BEGIN
+    INSERT INTO listas (nome, descricao, data, chave_nfe)
+    VALUES (p_nome, p_descricao, COALESCE(p_data, CURRENT_DATE), p_chave_nfe)
+    ON CONFLICT (user_id, chave_nfe) WHERE chave_nfe IS NOT NULL AND deleted_at IS NULL
+    DO NOTHING
+    RETURNING * INTO nova;
+
+    -- Nota já importada (leitura concorrente): devolve a lista existente
+    IF NOT FOUND THEN
+        SELECT * INTO nova FROM listas
+        WHERE user_id = app_user_id() AND chave_nfe = p_chave_nfe AND deleted_at IS NULL;
+        RETURN nova;
+    END IF;
+
+    INSERT INTO itens_lista (lista_id, nome, categoria, comprado, preco)
+    SELECT
+        nova.id,
+        i ->> 'nome',
+        i ->> 'categoria',
+        COALESCE((i ->> 'comprado')::BOOLEAN, TRUE),
+        COALESCE((i ->> 'preco')::NUMERIC, 0)
+    FROM jsonb_array_elements(p_itens) AS i;
+
+    PERFORM finalizar_compra(nova.id);
+
+    SELECT * INTO nova FROM listas WHERE id = nova.id;
+    RETURN nova;
+END;
+$$;
@@ -0,0 +1,66 @@
+-- ─────────────────────────────────────────────────
+-- Migração 0008: excluir uma lista leva junto os itens e o histórico
+-- Desde 0003 a exclusão é um tombstone em listas, e o ON DELETE CASCADE
+-- só age no expurgo. Os itens continuavam vivos (sugestões de nomes,
+-- delta sync) e a linha de historico_compras seguia na tela de histórico.
+-- Agora, quando deleted_at é preenchido, um trigger marca os itens com o
+-- mesmo tombstone e remove o rollup — na mesma transação do UPDATE, seja
+-- pelo app ou pelo PostgREST. Idempotente.
+-- ─────────────────────────────────────────────────
+
+CREATE OR REPLACE FUNCTION excluir_filhos_da_lista()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE itens_lista SET deleted_at = NEW.deleted_at
+    WHERE lista_id = NEW.id AND deleted_at IS NULL;
+    DELETE FROM historico_compras WHERE lista_id = NEW.id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS listas_excluir_filhos ON listas;
+CREATE TRIGGER listas_excluir_filhos
+    AFTER UPDATE OF deleted_at ON listas
+    FOR EACH ROW
+    WHEN (OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL)
+    EXECUTE FUNCTION excluir_filhos_da_lista();
+
+-- Listas já excluídas antes deste trigger
+UPDATE itens_lista i SET deleted_at = l.deleted_at
+FROM listas l
+WHERE l.id = i.lista_id AND l.deleted_at IS NOT NULL AND i.deleted_at IS NULL;
+
+DELETE FROM historico_compras h
+USING listas l
+WHERE l.id = h.lista_id AND l.deleted_at IS NOT NULL;
+
+-- Finalizar uma lista excluída não recria o rollup
+CREATE OR REPLACE FUNCTION finalizar_compra(p_lista_id INTEGER)
+RETURNS historico_compras
+LANGUAGE sql
+AS $$
+    INSERT INTO historico_compras (lista_id, user_id, data, mercado, descricao, total, qtd_itens)
+    SELECT
+        l.id,
+        l.user_id,
+        l.data,
+        l.nome,
+        l.descricao,
+        COALESCE(SUM(i.preco), 0),
+        COUNT(i.id)::INTEGER
+    FROM listas l
+    LEFT JOIN itens_lista i ON i.lista_id = l.id AND i.comprado AND i.deleted_at IS NULL
+    WHERE l.id = p_lista_id
+      AND l.user_id = app_user_id()
+      AND l.deleted_at IS NULL
+    GROUP BY l.id
+    ON CONFLICT (lista_id) DO UPDATE SET
+        data = EXCLUDED.data,
+        mercado = EXCLUDED.mercado,
+        descricao = EXCLUDED.descricao,
+        total = EXCLUDED.total,
+        qtd_itens = EXCLUDED.qtd_itens
+    RETURNING *;
+$$;
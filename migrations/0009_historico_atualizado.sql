@@ -0,0 +1,88 @@
+-- ─────────────────────────────────────────────────
+-- Migração 0009: historico_compras acompanha as edições
+-- O rollup era gravado só ao finalizar a compra ou importar a NF-e; itens
+-- editados, marcados ou excluídos depois disso deixavam o histórico com
+-- total e quantidade antigos. Agora, toda alteração de item de uma lista
+-- que já tem linha no histórico recalcula essa linha (só ela — listas não
+-- finalizadas não ganham rollup), e renomear ou mudar a data da lista
+-- atualiza mercado/data/descrição. Também preenche de uma vez o rollup das
+-- listas antigas com itens comprados, de todos os usuários. Idempotente.
+-- ─────────────────────────────────────────────────
+
+CREATE OR REPLACE FUNCTION recalcular_historico(p_lista_id INTEGER)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE historico_compras h SET
+        total = s.total,
+        qtd_itens = s.qtd_itens
+    FROM (
+        SELECT COALESCE(SUM(preco), 0) AS total, COUNT(*)::INTEGER AS qtd_itens
+        FROM itens_lista
+        WHERE lista_id = p_lista_id AND comprado AND deleted_at IS NULL
+    ) s
+    WHERE h.lista_id = p_lista_id;
+$$;
+
+CREATE OR REPLACE FUNCTION itens_atualizar_historico()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.lista_id IS NOT NULL THEN
+        PERFORM recalcular_historico(NEW.lista_id);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.lista_id IS NOT NULL
+       AND (TG_OP = 'DELETE' OR OLD.lista_id IS DISTINCT FROM NEW.lista_id) THEN
+        PERFORM recalcular_historico(OLD.lista_id);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS itens_historico_insert_delete ON itens_lista;
+CREATE TRIGGER itens_historico_insert_delete
+    AFTER INSERT OR DELETE ON itens_lista
+    FOR EACH ROW EXECUTE FUNCTION itens_atualizar_historico();
+
+DROP TRIGGER IF EXISTS itens_historico_update ON itens_lista;
+CREATE TRIGGER itens_historico_update
+    AFTER UPDATE OF preco, comprado, deleted_at, lista_id ON itens_lista
+    FOR EACH ROW EXECUTE FUNCTION itens_atualizar_historico();
+
+CREATE OR REPLACE FUNCTION listas_atualizar_historico()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE historico_compras
+    SET mercado = NEW.nome, data = NEW.data, descricao = NEW.descricao
+    WHERE lista_id = NEW.id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS listas_historico_update ON listas;
+CREATE TRIGGER listas_historico_update
+    AFTER UPDATE OF nome, data, descricao ON listas
+    FOR EACH ROW EXECUTE FUNCTION listas_atualizar_historico();
+
+-- Rollups que já estavam defasados
+SELECT recalcular_historico(lista_id) FROM historico_compras WHERE lista_id IS NOT NULL;
+
+-- Backfill de todos os usuários (a RPC backfill_historico_compras só vê o
+-- usuário da requisição, e o app não a chama sozinho)
+INSERT INTO historico_compras (lista_id, user_id, data, mercado, descricao, total, qtd_itens)
+SELECT
+    l.id,
+    l.user_id,
+    l.data,
+    l.nome,
+    l.descricao,
+    COALESCE(SUM(i.preco), 0),
+    COUNT(i.id)::INTEGER
+FROM listas l
+JOIN itens_lista i ON i.lista_id = l.id AND i.comprado AND i.deleted_at IS NULL
+WHERE l.deleted_at IS NULL
+GROUP BY l.id
+ON CONFLICT (lista_id) DO NOTHING;
@@ -0,0 +1,8 @@
+-- ─────────────────────────────────────────────────
+-- Migração 0010: remove a view historico_listas
+-- Desde 0002 o histórico e o orçamento leem só o rollup historico_compras;
+-- a view (criada no schema.sql e redefinida por 0001/0003/0005) não tinha
+-- mais leitores. Idempotente.
+-- ─────────────────────────────────────────────────
+
+DROP VIEW IF EXISTS historico_listas;
@@ -0,0 +1,100 @@
+"""
+Modelos de linha do banco (dataclasses com __slots__, imutáveis).
+
+As linhas são decodificadas uma única vez na fronteira da camada de dados
+(database.py); as views recebem atributos já tipados. Por serem imutáveis,
+podem ser compartilhadas pelo cache entre sessões — para alterar, use
+dataclasses.replace().
+"""
+from dataclasses import dataclass
+
+# Colunas projetadas em cada consulta — só o que as telas usam trafega.
+COLUNAS_LISTA = "id, nome, descricao, data, total, qtd_itens, qtd_pendentes"
+COLUNAS_ITEM = "id, lista_id, nome, categoria, preco, comprado, updated_at"
+COLUNAS_HISTORICO = "id, lista_id, mercado, descricao, data, total, qtd_itens"
+
+
+@dataclass(frozen=True, slots=True)
+class Lista:
+    id: int
+    nome: str
+    descricao: str
+    data: str
+    # Resumo mantido por triggers em itens_lista (migrations/0001_resumo_listas.sql)
+    total: float = 0.0
+    qtd_itens: int = 0
+    qtd_pendentes: int = 0
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Lista":
+        return cls(
+            id=row["id"],
+            nome=row.get("nome") or "Sem nome",
+            descricao=row.get("descricao") or "",
+            data=str(row.get("data") or ""),
+            total=round(float(row.get("total") or 0), 2),
+            qtd_itens=int(row.get("qtd_itens") or 0),
+            qtd_pendentes=int(row.get("qtd_pendentes") or 0),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Item:
+    id: int
+    lista_id: int
+    nome: str
+    categoria: str | None
+    preco: float
+    comprado: bool
+    updated_at: str = ""   # marca d'água para get_changes_since
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Item":
+        return cls(
+            id=row["id"],
+            lista_id=row.get("lista_id"),
+            nome=row.get("nome") or "Sem nome",
+            categoria=row.get("categoria") or None,
+            preco=float(row.get("preco") or 0),
+            comprado=bool(row.get("comprado")),
+            updated_at=str(row.get("updated_at") or ""),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ResumoCompra:
+    """Uma linha de historico_compras: compra finalizada com total gasto."""
+    id: int
+    mercado: str
+    descricao: str
+    data: str
+    total: float
+    qtd_itens: int
+    lista_id: int | None = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> "ResumoCompra":
+        return cls(
+            id=row["id"],
+            lista_id=row.get("lista_id"),
+            mercado=row.get("mercado") or "Mercado",
+            descricao=row.get("descricao") or "",
+            data=str(row.get("data") or ""),
+            total=float(row.get("total") or 0),
+            qtd_itens=int(row.get("qtd_itens") or 0),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class TotalCategoria:
+    categoria: str
+    total: float
+    qtd_itens: int
+
+    @classmethod
+    def from_row(cls, row: dict) -> "TotalCategoria":
+        return cls(
+            categoria=row.get("categoria") or "Outros",
+            total=float(row.get("total") or 0),
+            qtd_itens=int(row.get("qtd_itens") or 0),
+        )
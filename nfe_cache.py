@@ -0,0 +1,146 @@
+"""
+Cache em disco das consultas de NF-e à SEFAZ.
+
+A página de consulta de uma nota emitida não muda: a chave de acesso (ou o
+hash da URL, sem chave válida) endereça o conteúdo. Guardamos o HTML da
+SEFAZ e os itens extraídos pelo Groq, cada um num arquivo JSON comprimido
+com zlib. Uma nova tentativa (SEFAZ instável, falha ao gravar no banco,
+lista excluída e importada de novo) sai daqui sem rede e sem LLM; o parser
+HTML de fallback roda de novo sobre o HTML guardado.
+
+Entradas vencem após NFE_CACHE_TTL segundos (padrão: 7 dias). A pasta é
+limitada a NFE_CACHE_MAX_MB (padrão: 200); ao passar do limite, saem as
+entradas usadas há mais tempo (cada leitura renova o mtime). Gravação
+atômica (arquivo temporário + os.replace); arquivo ilegível é descartado.
+
+NFE_CACHE_DIR muda a pasta; NFE_CACHE=0 desliga.
+"""
+import os
+import json
+import time
+import zlib
+import threading
+
+from metrics import registrar_gauges
+
+NFE_CACHE_DIR = os.environ.get("NFE_CACHE_DIR", "nfe_cache")
+NFE_CACHE_TTL = float(os.environ.get("NFE_CACHE_TTL", str(7 * 24 * 3600)))
+NFE_CACHE_MAX_BYTES = int(float(os.environ.get("NFE_CACHE_MAX_MB", "200")) * 2**20)
+ATIVO = os.environ.get("NFE_CACHE", "1") == "1"
+
+_lock = threading.Lock()
+_tamanho: int | None = None   # bytes na pasta (estimativa; recalculada ao podar)
+_stats = {"acertos": 0, "ausentes": 0, "vencidos": 0, "gravados": 0, "removidos": 0, "erros": 0}
+
+
+def _arquivo(chave: str, tipo: str) -> str:
+    return os.path.join(NFE_CACHE_DIR, f"{chave}.{tipo}.z")
+
+
+def ler(chave: str, tipo: str):
+    """Valor guardado para (chave, tipo) — "html" ou "itens" — ou None se ausente/vencido."""
+    if not ATIVO:
+        return None
+    caminho = _arquivo(chave, tipo)
+    try:
+        with open(caminho, "rb") as f:
+            doc = json.loads(zlib.decompress(f.read()))
+    except FileNotFoundError:
+        _stats["ausentes"] += 1
+        return None
+    except (OSError, ValueError, zlib.error) as e:
+        _stats["erros"] += 1
+        print(f"[NF-e cache] Descartando {caminho}: {e}")
+        apagar(chave, tipo)
+        return None
+    if time.time() - doc.get("em", 0) > NFE_CACHE_TTL:
+        _stats["vencidos"] += 1
+        apagar(chave, tipo)
+        return None
+    try:
+        os.utime(caminho)   # usado agora: último a sair na poda
+    except OSError:
+        pass
+    _stats["acertos"] += 1
+    return doc.get("valor")
+
+
+def gravar(chave: str, tipo: str, valor):
+    """Guarda um valor JSON (HTML ou lista de itens) para (chave, tipo)."""
+    global _tamanho
+    if not ATIVO:
+        return
+    dados = zlib.compress(json.dumps({"em": time.time(), "valor": valor}, ensure_ascii=False).encode())
+    caminho = _arquivo(chave, tipo)
+    tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(NFE_CACHE_DIR, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(dados)
+        os.replace(tmp, caminho)
+    except OSError as e:
+        _stats["erros"] += 1
+        print(f"[NF-e cache] Não foi possível gravar {caminho}: {e}")
+        return
+    _stats["gravados"] += 1
+    with _lock:
+        _tamanho = (_tamanho if _tamanho is not None else _tamanho_da_pasta()) + len(dados)
+        if _tamanho > NFE_CACHE_MAX_BYTES:
+            _podar()
+
+
+def apagar(chave: str, tipo: str):
+    try:
+        os.remove(_arquivo(chave, tipo))
+        _stats["removidos"] += 1
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"[NF-e cache] Não foi possível apagar {chave}.{tipo}: {e}")
+
+
+def _entradas() -> list[os.DirEntry]:
+    try:
+        return [e for e in os.scandir(NFE_CACHE_DIR) if e.name.endswith(".z") and e.is_file()]
+    except FileNotFoundError:
+        return []
+
+
+def _tamanho_da_pasta() -> int:
+    return sum(e.stat().st_size for e in _entradas())
+
+
+def _podar():
+    """Remove vencidos e, se ainda preciso, os menos usados até 90% do limite (com _lock)."""
+    global _tamanho
+    agora = time.time()
+    vivas, total = [], 0
+    for e in _entradas():
+        st = e.stat()
+        if agora - st.st_mtime > NFE_CACHE_TTL:
+            _remover(e.path)
+            continue
+        vivas.append((st.st_mtime, st.st_size, e.path))
+        total += st.st_size
+    vivas.sort()
+    for _, tamanho, caminho in vivas:
+        if total <= NFE_CACHE_MAX_BYTES * 0.9:
+            break
+        _remover(caminho)
+        total -= tamanho
+    _tamanho = total
+
+
+def _remover(caminho: str):
+    try:
+        os.remove(caminho)
+        _stats["removidos"] += 1
+    except OSError:
+        pass
+
+
+def stats() -> dict:
+    return {**_stats, "bytes": _tamanho or 0}
+
+
+registrar_gauges("nfe_cache", stats)
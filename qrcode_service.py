@@ -1,17 +1,17 @@
+import os
 import re
-import requests
+import time
+import asyncio
+import hashlib
+import threading
+from urllib.parse import urlsplit, parse_qs
 import cv2
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageOps
 from bs4 import BeautifulSoup
 
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/120.0.0.0 Safari/537.36"
-    )
-}
+import nfe_cache
+import sefaz_client
 
 CATEGORIAS = {
     "frango": "Açougue", "carne": "Açougue", "picanha": "Açougue",
@@ -43,42 +43,155 @@ def guess_categoria(nome: str) -> str:
     return "Mercado"
 
 
-def _decode_with_opencv(image_path: str) -> str | None:
-    """Decodifica QR Code usando OpenCV (sem DLL externas)."""
-    try:
-        img = cv2.imread(image_path)
-        if img is None:
-            # Tenta via PIL → numpy (para imagens com paths especiais)
-            pil_img = Image.open(image_path).convert("RGB")
-            img = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-
-        detector = cv2.QRCodeDetector()
-        data, _, _ = detector.detectAndDecode(img)
-        if data and data.startswith("http"):
-            print(f"[QR/cv2] URL: {data}")
-            return data
-
-        # Tenta com preprocessing (melhora leitura de QRs difíceis)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        data, _, _ = detector.detectAndDecode(thresh)
-        if data and data.startswith("http"):
-            print(f"[QR/cv2+thresh] URL: {data}")
-            return data
+# ─────────────────────────────────────────────────
+# DECODIFICAÇÃO DO QR CODE
+# ─────────────────────────────────────────────────
+# Fotos de celular têm 12MP ou mais e o QR da NFC-e ocupa uma fração delas.
+# Em vez de decodificar a resolução cheia (centenas de ms e ~36MB por cópia
+# BGR), a imagem é carregada já reduzida pelo próprio decodificador JPEG
+# (draft mode, em tons de cinza), com a orientação EXIF corrigida. Numa
+# pirâmide do menor para o maior tamanho, um localizador barato procura o
+# QR e só o recorte daquela região é decodificado, na maior resolução já
+# carregada. A imagem inteira e a resolução cheia são o último recurso.
 
-        return None
+# Lado maior (px) de cada degrau da pirâmide, do menor para o maior
+QR_ESCALAS = tuple(int(x) for x in os.environ.get("QR_ESCALAS", "800,1600").split(","))
+
+# Recortes menores que isso são ampliados antes de decodificar (QR pequeno)
+_RECORTE_MINIMO = 400
+
+_local = threading.local()
+
+
+def _detectores() -> tuple:
+    """
+    (localizador, decodificador), criados uma vez e reutilizados entre
+    leituras — um par por thread, pois as instâncias não são thread-safe.
+    O detector baseado em ArUco (OpenCV >= 4.7) localiza QRs pequenos numa
+    fração do tempo do detector clássico, que decodifica melhor o recorte.
+    """
+    par = getattr(_local, "detectores", None)
+    if par is None:
+        decodificador = cv2.QRCodeDetector()
+        aruco = getattr(cv2, "QRCodeDetectorAruco", None)
+        par = _local.detectores = (aruco() if aruco else decodificador, decodificador)
+    return par
+
+
+def _load_gray(image_path: str, max_side: int | None = None) -> tuple[np.ndarray, tuple[int, int]]:
+    """
+    Carrega a imagem em tons de cinza, orientada pelo EXIF.
+    Com `max_side`, JPEGs são decodificados já reduzidos (draft: escala
+    1/2, 1/4 ou 1/8, mantendo o lado maior >= max_side).
+    Retorna (pixels, tamanho_original).
+    """
+    try:
+        with Image.open(image_path) as img:
+            original = img.size
+            if max_side and img.format == "JPEG" and max(original) > max_side:
+                fator = max_side / max(original)
+                img.draft("L", (int(original[0] * fator), int(original[1] * fator)))
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "L":
+                img = img.convert("L")
+            return np.asarray(img), original
     except Exception as e:
-        print(f"[QR/cv2] Erro: {e}")
+        # Formatos que o PIL não abre (ex.: caminhos especiais): OpenCV, já orientado pelo EXIF
+        print(f"[QR] PIL não abriu a imagem ({e}), usando OpenCV...")
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError(f"Não foi possível abrir a imagem: {image_path}")
+        return gray, (gray.shape[1], gray.shape[0])
+
+
+def _resize(gray: np.ndarray, side: int) -> np.ndarray:
+    escala = side / max(gray.shape)
+    if escala >= 1:
+        return gray
+    return cv2.resize(gray, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+
+
+def _crop(gray: np.ndarray, points: np.ndarray, scale: float) -> np.ndarray:
+    """Recorta a região do QR (pontos em outra escala) com folga para a zona de silêncio."""
+    pts = points.reshape(-1, 2) * scale
+    x0, y0 = pts.min(axis=0)
+    x1, y1 = pts.max(axis=0)
+    folga = 0.25 * max(x1 - x0, y1 - y0)
+    h, w = gray.shape
+    recorte = gray[max(int(y0 - folga), 0):min(int(y1 + folga), h), max(int(x0 - folga), 0):min(int(x1 + folga), w)]
+    if recorte.size and max(recorte.shape) < _RECORTE_MINIMO:
+        f = _RECORTE_MINIMO / max(recorte.shape)
+        recorte = cv2.resize(recorte, None, fx=f, fy=f, interpolation=cv2.INTER_CUBIC)
+    return recorte
+
+
+def _read_url(detector, gray: np.ndarray) -> str | None:
+    data, _, _ = detector.detectAndDecode(gray)
+    return data if data and data.startswith("http") else None
+
+
+def _read_with_threshold(detector, gray: np.ndarray) -> str | None:
+    """Leitura direta e, se falhar, com binarização de Otsu (QRs com pouco contraste)."""
+    url = _read_url(detector, gray)
+    if url:
+        return url
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return _read_url(detector, thresh)
+
+
+def _locate_and_read(localizador, detector, busca: np.ndarray, fonte: np.ndarray) -> str | None:
+    """Localiza o QR em `busca` e decodifica o recorte correspondente de `fonte` (maior)."""
+    achou, pontos = localizador.detect(busca)
+    if not achou or pontos is None:
         return None
+    return _read_with_threshold(detector, _crop(fonte, pontos, max(fonte.shape) / max(busca.shape)))
+
+
+def _decode_with_opencv(image_path: str, tempos: dict) -> str | None:
+    """Pirâmide de escalas com OpenCV; anota o tempo (ms) de cada etapa em `tempos`."""
+    inicio = [time.perf_counter()]
+
+    def etapa(nome):
+        agora = time.perf_counter()
+        tempos[nome] = (agora - inicio[0]) * 1000
+        inicio[0] = agora
+
+    localizador, detector = _detectores()
+    base, original = _load_gray(image_path, max(QR_ESCALAS))
+    etapa("carga")
+
+    lado_base = max(base.shape)
+    for lado in [lado for lado in QR_ESCALAS if lado < lado_base] + [lado_base]:
+        url = _locate_and_read(localizador, detector, _resize(base, lado), base)
+        etapa(f"{lado}px")
+        if url:
+            print(f"[QR/cv2] URL ({lado}px): {url}")
+            return url
+
+    # Nada localizado: imagem inteira no maior tamanho já carregado
+    url = _read_with_threshold(detector, base)
+    etapa("imagem_inteira")
+    if url or max(original) <= lado_base:
+        if url:
+            print(f"[QR/cv2] URL (imagem inteira): {url}")
+        return url
+
+    # Último recurso: resolução cheia
+    cheia, _ = _load_gray(image_path)
+    url = _locate_and_read(localizador, detector, cheia, cheia) or _read_with_threshold(detector, cheia)
+    etapa("resolucao_cheia")
+    if url:
+        print(f"[QR/cv2] URL (resolução cheia): {url}")
+    return url
 
 
-def _decode_with_pyzbar(image_path: str) -> str | None:
-    """Fallback: decodifica via pyzbar (requer libzbar DLL no Windows)."""
+def _decode_with_pyzbar(image_path: str, tempos: dict) -> str | None:
+    """Fallback: decodifica via pyzbar (requer libzbar DLL no Windows), na imagem reduzida."""
+    inicio = time.perf_counter()
     try:
         from pyzbar.pyzbar import decode as qr_decode
-        img = Image.open(image_path)
-        decoded = qr_decode(img)
-        for obj in decoded:
+        gray, _ = _load_gray(image_path, max(QR_ESCALAS))
+        for obj in qr_decode(gray):
             data = obj.data.decode("utf-8").strip()
             if data.startswith("http"):
                 print(f"[QR/pyzbar] URL: {data}")
@@ -87,33 +200,91 @@ def _decode_with_pyzbar(image_path: str) -> str | None:
     except Exception as e:
         print(f"[QR/pyzbar] Erro (ignorado): {e}")
         return None
+    finally:
+        tempos["pyzbar"] = (time.perf_counter() - inicio) * 1000
+
+
+def decode_qrcode_timed(image_path: str) -> tuple[str | None, dict]:
+    """Como decode_qrcode, devolvendo também o tempo (ms) de cada etapa."""
+    tempos = {}
+    try:
+        url = _decode_with_opencv(image_path, tempos)
+    except Exception as e:
+        print(f"[QR/cv2] Erro: {e}")
+        url = None
+    if not url:
+        url = _decode_with_pyzbar(image_path, tempos)
+    print("[QR] Etapas (ms): " + ", ".join(f"{k}={v:.0f}" for k, v in tempos.items()))
+    return url, tempos
 
 
 def decode_qrcode(image_path: str) -> str | None:
     """Tenta OpenCV primeiro; fallback para pyzbar se disponível."""
-    url = _decode_with_opencv(image_path)
-    if url:
-        return url
-    url = _decode_with_pyzbar(image_path)
-    if url:
-        return url
-    print("[QR] Nenhum QR Code válido de NF-e encontrado.")
-    return None
+    url, _ = decode_qrcode_timed(image_path)
+    if not url:
+        print("[QR] Nenhum QR Code válido de NF-e encontrado.")
+    return url
 
 
+def _dv_chave(digitos: str) -> int:
+    """Dígito verificador (módulo 11, pesos 2 a 9 da direita) dos 43 primeiros dígitos."""
+    soma = sum(int(d) * (2 + i % 8) for i, d in enumerate(reversed(digitos)))
+    dv = 11 - soma % 11
+    return 0 if dv >= 10 else dv
 
-def fetch_nfe_page(url: str) -> str | None:
-    """Busca o HTML da página de consulta de NF-e no SEFAZ."""
+
+def nfe_access_key(url: str) -> str | None:
+    """
+    Chave de acesso (44 dígitos) da NFC-e a partir da URL do QR: parâmetro
+    p= (QR versão 2+, "chave|versão|ambiente|...") ou chNFe= (versão 1).
+    Retorna None se não houver chave ou se o dígito verificador não bater —
+    sem chave confiável a importação só não é deduplicada.
+    """
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15, verify=False)
-        resp.encoding = "utf-8"
-        if resp.status_code == 200:
-            return resp.text
-        print(f"[QR] SEFAZ retornou status {resp.status_code}")
-        return None
-    except Exception as e:
-        print(f"[QR] Erro ao buscar página SEFAZ: {e}")
+        params = parse_qs(urlsplit(url).query)
+    except ValueError:
         return None
+    for nome in ("p", "chNFe"):
+        for valor in params.get(nome, []):
+            m = re.match(r"\s*(\d{44})(?!\d)", valor)
+            if m and _dv_chave(m.group(1)[:43]) == int(m.group(1)[43]):
+                return m.group(1)
+    return None
+
+
+
+def fetch_nfe_page(url: str) -> str | None:
+    """Busca o HTML da página de consulta de NF-e no SEFAZ (bloqueante; ver sefaz_client)."""
+    return sefaz_client.buscar_sync(url)
+
+
+def _cache_key(url: str) -> str:
+    """Endereço da nota no nfe_cache: a chave de acesso ou, sem ela, o hash da URL."""
+    return nfe_access_key(url) or hashlib.sha256(url.encode()).hexdigest()
+
+
+def fetch_nfe_page_cached(url: str, chave: str) -> str | None:
+    """HTML da nota: do nfe_cache se houver, senão da SEFAZ (e então guardado)."""
+    html = nfe_cache.ler(chave, "html")
+    if html is not None:
+        print("[QR] Página da SEFAZ servida do cache.")
+        return html
+    html = fetch_nfe_page(url)
+    if html:
+        nfe_cache.gravar(chave, "html", html)
+    return html
+
+
+async def fetch_nfe_page_cached_async(url: str, chave: str) -> str | None:
+    """O mesmo, no loop de eventos: disco numa thread, SEFAZ pelo cliente assíncrono."""
+    html = await asyncio.to_thread(nfe_cache.ler, chave, "html")
+    if html is not None:
+        print("[QR] Página da SEFAZ servida do cache.")
+        return html
+    html = await sefaz_client.buscar(url)
+    if html:
+        await asyncio.to_thread(nfe_cache.gravar, chave, "html", html)
+    return html
 
 
 def _to_float(txt: str) -> float:
@@ -271,12 +442,27 @@ def parse_nfe_items(html: str) -> list[dict]:
 
 
 
+def visible_text(html: str) -> str:
+    """Texto visível da página da NF-e (sem scripts/styles), limitado ao contexto do Groq."""
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup(["script", "style", "head", "nav", "footer", "noscript"]):
+        tag.decompose()
+    texto_puro = soup.get_text(separator="\n", strip=True)
+
+    # Limita o texto a ~8000 chars para não estourar o contexto
+    return texto_puro[:8000]
+
+
 def parse_nfe_items_with_groq(html: str) -> list[dict]:
     """
     Usa o Groq (modelo openai/gpt-oss-20b) para extrair itens do HTML da NF-e.
     Retorna lista de dicts com nome, categoria, preco e comprado.
     """
-    import os
+    return extract_items_with_groq(visible_text(html))
+
+
+def extract_items_with_groq(texto_puro: str) -> list[dict]:
+    """Envia o texto visível da NF-e ao Groq e normaliza os itens devolvidos."""
     import json
     from groq import Groq
 
@@ -284,15 +470,6 @@ def parse_nfe_items_with_groq(html: str) -> list[dict]:
     if not api_key:
         raise ValueError("GROQ_API_KEY não configurada no .env")
 
-    # Extrai somente o texto visível da página, ignorando scripts/styles
-    soup = BeautifulSoup(html, "lxml")
-    for tag in soup(["script", "style", "head", "nav", "footer", "noscript"]):
-        tag.decompose()
-    texto_puro = soup.get_text(separator="\n", strip=True)
-
-    # Limita o texto a ~8000 chars para não estourar o contexto
-    texto_puro = texto_puro[:8000]
-
     print(f"[QR/Groq] Texto extraído do SEFAZ ({len(texto_puro)} chars). Enviando ao Groq...")
 
     prompt = (
@@ -358,6 +535,14 @@ def parse_nfe_items_with_groq(html: str) -> list[dict]:
     return itens
 
 
+def _sem_itens(url: str) -> ValueError:
+    return ValueError(
+        "QR Code lido com sucesso, mas não foi possível extrair itens.\n"
+        f"URL: {url}\n"
+        "Verifique se a chave GROQ_API_KEY está configurada corretamente."
+    )
+
+
 def get_items_from_nfe_qrcode(image_path: str) -> list[dict]:
     """
     Pipeline completo:
@@ -366,20 +551,32 @@ def get_items_from_nfe_qrcode(image_path: str) -> list[dict]:
     3. Envia HTML ao Groq (openai/gpt-oss-20b) para extrair nome, categoria e preço
     4. Retorna lista de itens para inserção no banco
     """
-    import urllib3
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
     url = decode_qrcode(image_path)
     if not url:
         raise ValueError("Nenhum QR Code válido de NF-e encontrado na imagem.")
+    return get_items_from_nfe_url(url)
 
-    html = fetch_nfe_page(url)
+
+def get_items_from_nfe_url(url: str) -> list[dict]:
+    """
+    Etapas 2 a 4 do pipeline, a partir da URL já lida do QR. Itens já
+    extraídos pelo Groq e o HTML da SEFAZ vêm do nfe_cache quando houver.
+    """
+    chave = _cache_key(url)
+    itens = nfe_cache.ler(chave, "itens")
+    if itens:
+        print(f"[QR] {len(itens)} itens servidos do cache.")
+        return itens
+
+    html = fetch_nfe_page_cached(url, chave)
     if not html:
         raise ValueError(f"Não foi possível acessar o portal SEFAZ.\nURL: {url}")
 
     # Tenta parser via Groq primeiro
     try:
         itens = parse_nfe_items_with_groq(html)
+        if itens:
+            nfe_cache.gravar(chave, "itens", itens)
     except Exception as e:
         print(f"[QR] Groq falhou ({e}), tentando parser HTML clássico...")
         itens = []
@@ -390,11 +587,66 @@ def get_items_from_nfe_qrcode(image_path: str) -> list[dict]:
         itens = parse_nfe_items(html)
 
     if not itens:
-        raise ValueError(
-            "QR Code lido com sucesso, mas não foi possível extrair itens.\n"
-            f"URL: {url}\n"
-            "Verifique se a chave GROQ_API_KEY está configurada corretamente."
-        )
+        # Página sem itens (erro ou manutenção da SEFAZ): não fica no cache
+        nfe_cache.apagar(chave, "html")
+        raise _sem_itens(url)
+
+    print(f"[QR] {len(itens)} itens prontos para inserção no banco.")
+    return itens
+
+
+async def get_items_from_nfe_qrcode_async(image_path: str) -> list[dict]:
+    """
+    O mesmo pipeline, para as views: as etapas de CPU (QR, parse do HTML)
+    rodam no pool de processos (scan_pool), a SEFAZ pelo cliente assíncrono
+    (sefaz_client) e o Groq numa thread — nada bloqueia o loop do Flet.
+    """
+    return await get_items_from_nfe_url_async(await read_nfe_qrcode_async(image_path))
+
+
+async def read_nfe_qrcode_async(image_path: str) -> str:
+    """
+    Etapa 1, no pool de processos: a URL da NF-e lida do QR. As views param
+    aqui para conferir a chave de acesso (nfe_access_key) antes da rede.
+    """
+    import scan_pool
+
+    url = await scan_pool.executar(decode_qrcode, image_path)
+    if not url:
+        raise ValueError("Nenhum QR Code válido de NF-e encontrado na imagem.")
+    return url
+
+
+async def get_items_from_nfe_url_async(url: str) -> list[dict]:
+    """Etapas 2 a 4 (SEFAZ, Groq, parser de fallback) a partir da URL do QR, com o nfe_cache."""
+    import scan_pool
+
+    chave = _cache_key(url)
+    itens = await asyncio.to_thread(nfe_cache.ler, chave, "itens")
+    if itens:
+        print(f"[QR] {len(itens)} itens servidos do cache.")
+        return itens
+
+    html = await fetch_nfe_page_cached_async(url, chave)
+    if not html:
+        raise ValueError(f"Não foi possível acessar o portal SEFAZ.\nURL: {url}")
+
+    try:
+        texto = await scan_pool.executar(visible_text, html)
+        itens = await asyncio.to_thread(extract_items_with_groq, texto)
+        if itens:
+            await asyncio.to_thread(nfe_cache.gravar, chave, "itens", itens)
+    except Exception as e:
+        print(f"[QR] Groq falhou ({e}), tentando parser HTML clássico...")
+        itens = []
+
+    if not itens:
+        print("[QR] Usando parser HTML como fallback...")
+        itens = await scan_pool.executar(parse_nfe_items, html)
+
+    if not itens:
+        nfe_cache.apagar(chave, "html")
+        raise _sem_itens(url)
 
     print(f"[QR] {len(itens)} itens prontos para inserção no banco.")
     return itens
@@ -0,0 +1,110 @@
+"""
+Pool de processos para as etapas de CPU da leitura de notas e recibos.
+
+Decodificar a foto, localizar o QR e fazer o parse do HTML da SEFAZ seguram
+o GIL por centenas de ms; numa thread do processo do Flet isso trava o loop
+que atende todas as sessões. Aqui essas etapas rodam em processos à parte,
+mantidos quentes: cada worker sobe uma vez, já com OpenCV, detectores de QR
+e lxml/BeautifulSoup carregados. As views aguardam o resultado com
+`await executar(fn, *args)`; as etapas de rede (SEFAZ, Groq, com o base64
+da imagem) continuam em threads, sem ocupar um worker — argumentos e
+resultados grandes custariam mais no IPC do que economizam.
+
+SCAN_WORKERS define o tamanho do pool (padrão: min(2, CPUs)); 0 desliga e
+tudo volta para threads. SCAN_POOL_START escolhe o método de início dos
+processos (padrão: fork no Linux, spawn nos demais). Com fork, o pool deve
+ser iniciado (`iniciar`) antes das threads do servidor.
+"""
+import os
+import sys
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import registrar_gauges
+
+SCAN_WORKERS = int(os.environ.get("SCAN_WORKERS", str(min(2, os.cpu_count() or 1))))
+SCAN_POOL_START = os.environ.get("SCAN_POOL_START", "fork" if sys.platform.startswith("linux") else "spawn")
+
+_executor: ProcessPoolExecutor | None = None
+_stats = {"tarefas": 0, "em_andamento": 0, "falhas": 0, "reinicios": 0}
+
+
+def _iniciar_worker():
+    """Roda uma vez em cada processo: carrega e aquece o que as tarefas usam."""
+    import cv2
+    from bs4 import BeautifulSoup
+    import qrcode_service
+
+    # Um processo por núcleo já ocupa a CPU; threads internas do OpenCV só disputariam
+    cv2.setNumThreads(1)
+    qrcode_service._detectores()
+    BeautifulSoup("<table><tr><td></td></tr></table>", "lxml")
+
+
+def _aquecer():
+    return os.getpid()
+
+
+def iniciar(aquecer: bool = True) -> ProcessPoolExecutor | None:
+    """
+    Cria o pool. Com `aquecer` (main.py, na inicialização), sobe todos os
+    workers já e espera a inicialização deles — a primeira leitura não paga
+    o custo de criar processos e importar o OpenCV.
+    """
+    global _executor
+    if _executor is None and SCAN_WORKERS > 0:
+        _executor = ProcessPoolExecutor(
+            max_workers=SCAN_WORKERS,
+            mp_context=multiprocessing.get_context(SCAN_POOL_START),
+            initializer=_iniciar_worker,
+        )
+        if aquecer:
+            # Com fork os processos nascem todos na primeira tarefa; com spawn, sob demanda
+            for f in [_executor.submit(_aquecer) for _ in range(SCAN_WORKERS)]:
+                f.result()
+        print(f"[Scan] Pool de processos: {SCAN_WORKERS} worker(s) ({SCAN_POOL_START}).")
+    return _executor
+
+
+def encerrar():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def executar(fn, *args):
+    """
+    Executa fn(*args) num worker e aguarda sem bloquear o loop de eventos.
+    `fn` precisa ser uma função de módulo (é enviada por pickle). Sem pool,
+    roda numa thread. Se um worker morrer (ex.: falha nativa do OpenCV), o
+    pool é recriado na próxima tarefa e o erro sobe para a view.
+    """
+    global _executor
+    if SCAN_WORKERS <= 0:
+        return await asyncio.to_thread(fn, *args)
+    executor = _executor or iniciar(aquecer=False)
+    _stats["tarefas"] += 1
+    _stats["em_andamento"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args))
+    except BrokenProcessPool as e:
+        _stats["falhas"] += 1
+        if _executor is executor:
+            _executor = None
+            _stats["reinicios"] += 1
+            executor.shutdown(wait=False, cancel_futures=True)
+        print(f"[Scan] Worker encerrado inesperadamente: {e}")
+        raise RuntimeError("Falha ao processar a imagem. Tente novamente.") from e
+    finally:
+        _stats["em_andamento"] -= 1
+
+
+def stats() -> dict:
+    return {**_stats, "workers": SCAN_WORKERS if _executor is not None else 0}
+
+
+registrar_gauges("scan", stats)
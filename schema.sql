@@ -34,9 +34,83 @@ CREATE TABLE IF NOT EXISTS historico_compras (
     user_id UUID
 );
 
+-- ─────────────────────────────────────────────────
+-- RPC: registrar compra da NF-e (lista + itens numa transação)
+-- p_itens: JSON array de {nome, categoria, preco, comprado}
+-- ─────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION registrar_compra_nfe(
+    p_nome TEXT,
+    p_descricao TEXT,
+    p_data DATE,
+    p_itens JSONB
+)
+RETURNS listas
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    nova listas;
+BEGIN
+    INSERT INTO listas (nome, descricao, data)
+    VALUES (p_nome, p_descricao, COALESCE(p_data, CURRENT_DATE))
+    RETURNING * INTO nova;
+
+    INSERT INTO itens_lista (lista_id, nome, categoria, comprado, preco)
+    SELECT
+        nova.id,
+        i ->> 'nome',
+        i ->> 'categoria',
+        COALESCE((i ->> 'comprado')::BOOLEAN, TRUE),
+        COALESCE((i ->> 'preco')::NUMERIC, 0)
+    FROM jsonb_array_elements(p_itens) AS i;
+
+    RETURN nova;
+END;
+$$;
+
+-- ─────────────────────────────────────────────────
+-- RPC: totais por categoria dos itens comprados
+-- Janela opcional de datas (listas.data); só as linhas-resumo trafegam.
+-- ─────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION totais_por_categoria(
+    p_inicio DATE DEFAULT NULL,
+    p_fim DATE DEFAULT NULL
+)
+RETURNS TABLE (categoria TEXT, total FLOAT8, qtd_itens INTEGER)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        COALESCE(i.categoria, 'Outros'),
+        COALESCE(SUM(i.preco), 0)::FLOAT8,
+        COUNT(*)::INTEGER
+    FROM itens_lista i
+    JOIN listas l ON l.id = i.lista_id
+    WHERE i.comprado
+      AND (p_inicio IS NULL OR l.data >= p_inicio)
+      AND (p_fim IS NULL OR l.data <= p_fim)
+    GROUP BY 1
+    ORDER BY 2 DESC;
+$$;
+
 -- ─────────────────────────────────────────────────
 -- Migração: adicionar lista_id se a coluna não existir
 -- (executar no Supabase caso a tabela já exista)
 -- ─────────────────────────────────────────────────
 -- ALTER TABLE itens_lista
 --     ADD COLUMN IF NOT EXISTS lista_id INTEGER REFERENCES listas(id) ON DELETE CASCADE;
+
+-- ─────────────────────────────────────────────────
+-- Migrações posteriores a este arquivo ficam em migrations/ e são aplicadas
+-- em ordem por migrar.py (na inicialização, com DATABASE_URL, ou
+-- `python migrar.py`); quem já rodou à mão no SQL Editor marca com --baseline:
+--   0001_resumo_listas.sql — total/qtd_itens/qtd_pendentes em listas
+--   0002_historico_compras.sql — rollup de compras finalizadas
+--   0003_delta_sync.sql — updated_at + tombstones (deleted_at)
+--   0004_realtime.sql — itens_lista no Supabase Realtime (feed de alterações)
+--   0005_escopo_usuario.sql — user_id em listas, índices por usuário e RLS
+--   0006_indices.sql — índices das consultas quentes (totais, finalizar compra)
+--   0007_chave_nfe.sql — chave de acesso da NF-e única por usuário (importação idempotente)
+--   0008_exclusao_lista.sql — excluir a lista marca os itens e remove o histórico
+--   0009_historico_atualizado.sql — histórico recalculado nas edições + backfill
+--   0010_remover_historico_listas.sql — remove a view sem leitores (histórico lê historico_compras)
+-- ─────────────────────────────────────────────────
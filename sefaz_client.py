@@ -0,0 +1,138 @@
+"""
+Cliente HTTP assíncrono das páginas de consulta de NF-e da SEFAZ.
+
+Cada estado tem o próprio portal (host). Por host mantemos um
+httpx.AsyncClient com conexões keep-alive e um limite de requisições
+simultâneas (SEFAZ_POR_HOST, padrão 4) — várias sessões importando notas ao
+mesmo tempo não abrem uma conexão TLS cada nem sobrecarregam um portal
+lento. Falhas transitórias (erro de conexão, timeout, 429 e 5xx) são
+repetidas até SEFAZ_TENTATIVAS vezes com espera exponencial e jitter,
+respeitando o Retry-After; tudo, inclusive a fila do host, cabe no prazo
+total de SEFAZ_PRAZO segundos (padrão 15). Nenhuma thread fica presa
+esperando a rede.
+
+Os certificados de alguns portais estaduais não fecham a cadeia com o
+bundle padrão: a verificação TLS segue desligada, como antes
+(SEFAZ_VERIFICAR_TLS=1 liga).
+"""
+import os
+import random
+import asyncio
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+
+from metrics import registrar_gauges
+
+SEFAZ_PRAZO = float(os.environ.get("SEFAZ_PRAZO", "15"))
+SEFAZ_TENTATIVAS = int(os.environ.get("SEFAZ_TENTATIVAS", "3"))
+SEFAZ_POR_HOST = int(os.environ.get("SEFAZ_POR_HOST", "4"))
+SEFAZ_VERIFICAR_TLS = os.environ.get("SEFAZ_VERIFICAR_TLS", "0") == "1"
+
+# Espera antes da 2ª tentativa (s); dobra a cada nova tentativa, com jitter
+_ESPERA_BASE = 0.5
+_STATUS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    )
+}
+
+# Clientes e semáforos pertencem a um loop de eventos: loop -> host -> (cliente, semáforo)
+_hosts: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+_stats = {"requisicoes": 0, "repeticoes": 0, "falhas": 0, "prazo_esgotado": 0, "em_andamento": 0}
+
+
+def _do_host(host: str) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    por_host = _hosts.setdefault(asyncio.get_running_loop(), {})
+    if host not in por_host:
+        cliente = httpx.AsyncClient(
+            headers=HEADERS,
+            verify=SEFAZ_VERIFICAR_TLS,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=SEFAZ_POR_HOST, max_keepalive_connections=SEFAZ_POR_HOST),
+        )
+        por_host[host] = (cliente, asyncio.Semaphore(SEFAZ_POR_HOST))
+    return por_host[host]
+
+
+def _espera(tentativa: int, resp: httpx.Response | None) -> float:
+    """Backoff exponencial com jitter total; Retry-After (em segundos) do portal, se houver."""
+    espera = random.uniform(0, _ESPERA_BASE * 2 ** tentativa)
+    if resp is not None:
+        try:
+            espera = max(espera, float(resp.headers.get("Retry-After", "")))
+        except ValueError:
+            pass
+    return espera
+
+
+async def _buscar(url: str, prazo_final: float) -> str | None:
+    loop = asyncio.get_running_loop()
+    cliente, limite = _do_host(urlsplit(url).hostname or "")
+    for tentativa in range(SEFAZ_TENTATIVAS):
+        resp = None
+        async with limite:
+            restante = prazo_final - loop.time()
+            if restante <= 0:
+                break
+            try:
+                _stats["requisicoes"] += 1
+                resp = await cliente.get(url, timeout=httpx.Timeout(restante, connect=min(restante, 5.0)))
+                if resp.status_code == 200:
+                    return resp.content.decode("utf-8", errors="replace")
+                print(f"[SEFAZ] Status {resp.status_code} (tentativa {tentativa + 1})")
+                if resp.status_code not in _STATUS_TRANSITORIOS:
+                    return None
+            except httpx.TransportError as e:
+                print(f"[SEFAZ] {type(e).__name__} (tentativa {tentativa + 1}): {e}")
+        espera = _espera(tentativa, resp)
+        if tentativa + 1 == SEFAZ_TENTATIVAS or loop.time() + espera >= prazo_final:
+            break
+        _stats["repeticoes"] += 1
+        await asyncio.sleep(espera)
+    return None
+
+
+async def buscar(url: str) -> str | None:
+    """HTML da página de consulta da NF-e, ou None se o portal não respondeu a tempo."""
+    _stats["em_andamento"] += 1
+    try:
+        prazo_final = asyncio.get_running_loop().time() + SEFAZ_PRAZO
+        html = await asyncio.wait_for(_buscar(url, prazo_final), SEFAZ_PRAZO)
+        if html is None:
+            _stats["falhas"] += 1
+        return html
+    except asyncio.TimeoutError:
+        _stats["prazo_esgotado"] += 1
+        print(f"[SEFAZ] Prazo de {SEFAZ_PRAZO:.0f}s esgotado: {url}")
+        return None
+    finally:
+        _stats["em_andamento"] -= 1
+
+
+async def fechar():
+    """Fecha os clientes do loop atual."""
+    for cliente, _ in _hosts.pop(asyncio.get_running_loop(), {}).values():
+        await cliente.aclose()
+
+
+def buscar_sync(url: str) -> str | None:
+    """Versão bloqueante (pipeline síncrono, scripts): um loop próprio, fechado ao final."""
+    async def _uma():
+        try:
+            return await buscar(url)
+        finally:
+            await fechar()
+    return asyncio.run(_uma())
+
+
+def stats() -> dict:
+    return {**_stats, "hosts": sum(len(h) for h in _hosts.values())}
+
+
+registrar_gauges("sefaz", stats)
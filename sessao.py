@@ -0,0 +1,73 @@
+"""
+Identidade do usuário da sessão Flet.
+
+O app não tem login: cada navegador recebe um UUID aleatório, guardado no
+client_storage (localStorage) na primeira visita. Esse id vai em user_id em
+todas as linhas gravadas e filtra todas as consultas de database.py — o
+isolamento entre usuários é esse filtro, feito no servidor. No Supabase o id
+também segue no cabeçalho x-user-id, que as RPCs usam; como o cabeçalho é
+escolhido por quem chama, a RLS sobre ele não é controle de acesso
+(migrations/0005_escopo_usuario.sql).
+
+Vários aparelhos (a casa toda) compartilham os dados de duas formas:
+  - APP_USER_ID fixa um único usuário para todas as sessões. É o padrão
+    recomendado para instalações de uma casa só — o comportamento de antes do
+    escopo por usuário — e adota as linhas antigas sem dono (migrar.py).
+  - Sem APP_USER_ID, o link de compartilhamento (`link_da_casa`, botão na
+    tela de listas) leva /casa/<uuid>; aberto em outro aparelho, ele passa a
+    usar o mesmo id. Quem tem o link vê e altera os dados: trate-o como senha.
+"""
+import os
+import uuid
+
+APP_USER_ID = os.environ.get("APP_USER_ID", "")
+_CHAVE = "listacompras.user_id"
+
+
+def usuario_da_sessao(page) -> str:
+    """UUID do usuário desta sessão (lido uma vez do navegador e guardado na sessão)."""
+    user_id = page.session.get("user_id")
+    if user_id:
+        return user_id
+    user_id = APP_USER_ID
+    if not user_id:
+        try:
+            user_id = page.client_storage.get(_CHAVE)
+        except Exception as e:
+            print(f"[Sessão] client_storage indisponível: {e}")
+        if not user_id:
+            user_id = str(uuid.uuid4())
+            try:
+                page.client_storage.set(_CHAVE, user_id)
+            except Exception as e:
+                print(f"[Sessão] Não foi possível guardar o usuário: {e}")
+    page.session.set("user_id", user_id)
+    return user_id
+
+
+def entrar_na_casa(page, user_id: str) -> bool:
+    """Adota neste navegador o id de outro aparelho (rota /casa/<uuid>)."""
+    if APP_USER_ID:
+        return False   # identidade fixa pela instalação
+    try:
+        user_id = str(uuid.UUID(user_id.strip()))
+    except ValueError:
+        return False
+    try:
+        page.client_storage.set(_CHAVE, user_id)
+    except Exception as e:
+        print(f"[Sessão] Não foi possível guardar o usuário: {e}")
+    # A fila de escrita foi criada com o id anterior: o que está pendente
+    # ainda é gravado como ele, e a próxima tela cria uma fila com o novo
+    fila = page.session.get("fila_escrita")
+    if fila is not None:
+        page.run_task(fila.flush)
+        page.session.remove("fila_escrita")
+    page.session.set("user_id", user_id)
+    return True
+
+
+def link_da_casa(page) -> str:
+    """URL que leva outro aparelho aos mesmos dados deste navegador."""
+    base = (getattr(page, "url", "") or "").rstrip("/")
+    return f"{base}/casa/{usuario_da_sessao(page)}"
@@ -0,0 +1,133 @@
+"""
+Snapshot em disco do último resultado das leituras das telas
+(stale-while-revalidate).
+
+database.py grava aqui cada leitura bem-sucedida de listas, itens e
+histórico. Ao abrir, as telas desenham o snapshot na hora — inclusive logo
+após o servidor reiniciar, com o cache em memória vazio — e revalidam em
+segundo plano, trocando só as linhas que mudaram.
+
+Formato compacto: um arquivo por chave (hash da tupla), com os nomes das
+colunas uma única vez e cada linha como lista de valores, em JSON comprimido
+com zlib. A gravação sai do loop de eventos (executor padrão), é atômica
+(arquivo temporário + os.replace) e é pulada quando o conteúdo não mudou.
+Cada arquivo tem um número de sequência: uma gravação que chega ao executor
+depois de outra mais nova (ou de um apagar) da mesma chave é descartada.
+Snapshot ilegível ou de outra versão dos modelos é ignorado.
+
+SNAPSHOT_DIR muda a pasta; SNAPSHOT=0 desliga.
+"""
+import os
+import json
+import zlib
+import asyncio
+import hashlib
+import threading
+from dataclasses import fields
+
+from metrics import registrar_gauges
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+ATIVO = os.environ.get("SNAPSHOT", "1") == "1"
+
+_lock = threading.Lock()
+_gravado: dict[str, str] = {}   # arquivo -> hash do último conteúdo gravado
+_seq: dict[str, int] = {}       # arquivo -> sequência da última gravação/remoção pedida
+_stats = {"lidos": 0, "ausentes": 0, "gravados": 0, "iguais": 0, "superados": 0, "erros": 0}
+
+
+def _arquivo(chave: tuple) -> str:
+    nome = hashlib.sha1(repr(chave).encode()).hexdigest()
+    return os.path.join(SNAPSHOT_DIR, f"{nome}.snap")
+
+
+def _proxima_seq(caminho: str) -> int:
+    with _lock:
+        _seq[caminho] = _seq.get(caminho, 0) + 1
+        return _seq[caminho]
+
+
+def _escrever(caminho: str, dados: bytes, seq: int):
+    with _lock:
+        if _seq.get(caminho) != seq:
+            _stats["superados"] += 1
+            return
+        try:
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            tmp = f"{caminho}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(dados)
+            os.replace(tmp, caminho)
+            _stats["gravados"] += 1
+        except OSError as e:
+            _gravado.pop(caminho, None)
+            _stats["erros"] += 1
+            print(f"[Snapshot] Não foi possível gravar {caminho}: {e}")
+
+
+def gravar(chave: tuple, modelos: list, extra=None):
+    """Guarda `modelos` (dataclasses de models.py) e um valor JSON opcional (ex.: cursor)."""
+    if not ATIVO:
+        return
+    campos = [f.name for f in fields(modelos[0])] if modelos else []
+    doc = {
+        "campos": campos,
+        "linhas": [[getattr(m, c) for c in campos] for m in modelos],
+        "extra": extra,
+    }
+    dados = zlib.compress(json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode())
+    caminho = _arquivo(chave)
+    digest = hashlib.sha1(dados).hexdigest()
+    if _gravado.get(caminho) == digest:
+        _stats["iguais"] += 1
+        return
+    _gravado[caminho] = digest
+    seq = _proxima_seq(caminho)
+    try:
+        asyncio.get_running_loop().run_in_executor(None, _escrever, caminho, dados, seq)
+    except RuntimeError:
+        _escrever(caminho, dados, seq)
+
+
+def ler(chave: tuple, cls):
+    """(list[cls], extra) do último snapshot da chave, ou None se não houver um utilizável."""
+    if not ATIVO:
+        return None
+    caminho = _arquivo(chave)
+    try:
+        with open(caminho, "rb") as f:
+            doc = json.loads(zlib.decompress(f.read()))
+    except FileNotFoundError:
+        _stats["ausentes"] += 1
+        return None
+    except (OSError, ValueError, zlib.error) as e:
+        _stats["erros"] += 1
+        print(f"[Snapshot] Ignorando {caminho}: {e}")
+        return None
+    campos = doc.get("campos") or []
+    if campos and campos != [f.name for f in fields(cls)]:
+        _stats["ausentes"] += 1
+        return None
+    _stats["lidos"] += 1
+    return [cls(*linha) for linha in doc.get("linhas", [])], doc.get("extra")
+
+
+def apagar(chave: tuple):
+    """Descarta o snapshot (ex.: lista excluída) e as gravações ainda pendentes dele."""
+    caminho = _arquivo(chave)
+    _gravado.pop(caminho, None)
+    with _lock:
+        _seq[caminho] = _seq.get(caminho, 0) + 1
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[Snapshot] Não foi possível apagar {caminho}: {e}")
+
+
+def stats() -> dict:
+    return dict(_stats)
+
+
+registrar_gauges("snapshot", stats)
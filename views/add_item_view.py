@@ -1,8 +1,10 @@
 import flet as ft
 from app_colors import BG_COLOR, CARD_COLOR, CYAN, TEXT_PRIMARY, TEXT_SECONDARY
 from database import insert_item
+from sessao import usuario_da_sessao
 
 def get_add_item_view(page: ft.Page, lista_id: int):
+    user_id = usuario_da_sessao(page)
     # Header
     back_btn = ft.IconButton(
         icon=ft.Icons.ARROW_BACK_IOS_NEW,
@@ -126,7 +128,7 @@ def get_add_item_view(page: ft.Page, lista_id: int):
             "lista_id": lista_id,
         }
 
-        sucesso = await insert_item(novo_item)
+        sucesso = await insert_item(novo_item, user_id=user_id)
 
         if sucesso:
             sb = ft.SnackBar(ft.Text("Item adicionado com sucesso!", color=BG_COLOR), bgcolor=CYAN, open=True)
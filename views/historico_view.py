@@ -1,13 +1,15 @@
 import flet as ft
 import asyncio
 from app_colors import BG_COLOR, CARD_COLOR, CYAN, TEXT_PRIMARY, TEXT_SECONDARY
-from database import get_historico_compras, registrar_compra_nfe
+from database import get_historico_compras, snapshot_historico, registrar_compra_nfe, get_lista_por_chave_nfe
 from components.navbar import create_navbar
+from sessao import usuario_da_sessao
 
 CARD_LIGHT = "#FFFFFF"
 TEXT_DARK = "#0F172A"
 
 def get_historico_view(page: ft.Page):
+    user_id = usuario_da_sessao(page)
 
     # ─── Banner de status do scanner QR ──────────────────────────────────────
     scan_progress = ft.ProgressBar(width=float('inf'), color=CYAN, bgcolor=CARD_COLOR, visible=False)
@@ -35,12 +37,26 @@ def get_historico_view(page: ft.Page):
         scan_progress.visible = True
         view.update()
         try:
-            from qrcode_service import get_items_from_nfe_qrcode
-            nfe_items = await asyncio.to_thread(get_items_from_nfe_qrcode, file_path)
+            from qrcode_service import read_nfe_qrcode_async, get_items_from_nfe_url_async, nfe_access_key
+            url = await read_nfe_qrcode_async(file_path)
+            # Nota já importada: já está no histórico, sem SEFAZ nem Groq
+            chave = nfe_access_key(url)
+            existente = await get_lista_por_chave_nfe(chave, user_id=user_id) if chave else None
+            if existente:
+                scan_status_text.value = f"✅ Esta nota já está no histórico ({existente.nome})."
+                scan_progress.visible = False
+                view.update()
+                await asyncio.sleep(2)
+                scan_banner.visible = False
+                view.update()
+                return
+            scan_status_text.value = "Consultando a nota na SEFAZ..."
+            view.update()
+            nfe_items = await get_items_from_nfe_url_async(url)
             if nfe_items and len(nfe_items) > 0:
                 scan_status_text.value = f"Registrando {len(nfe_items)} itens..."
                 view.update()
-                lista = await registrar_compra_nfe(nfe_items)
+                lista = await registrar_compra_nfe(nfe_items, chave_nfe=chave, user_id=user_id)
                 if lista:
                     scan_status_text.value = f"✅ {len(nfe_items)} itens adicionados ao histórico!"
                     scan_progress.visible = False
@@ -119,7 +135,7 @@ def get_historico_view(page: ft.Page):
             total_val_text,
             ft.Row([
                 ft.Icon(ft.Icons.QR_CODE_2, color=TEXT_SECONDARY, size=12),
-                ft.Text("Importado via QR Code NF-e", color=TEXT_SECONDARY, size=11)
+                ft.Text("NF-e importadas e listas finalizadas", color=TEXT_SECONDARY, size=11)
             ], spacing=6)
         ], spacing=10),
         bgcolor=CARD_COLOR,
@@ -164,11 +180,11 @@ def get_historico_view(page: ft.Page):
     )
 
     def build_history_card(h):
-        nome = h.get('mercado', 'Compra')
-        data_str = h.get('data', '')
-        total_val = h.get('total', 0)
-        qtd = h.get('qtd_itens', 0)
-        is_nfe = "nf-e" in (h.get('descricao') or '').lower() or "nf" in nome.lower()
+        nome = h.mercado
+        data_str = h.data
+        total_val = h.total
+        qtd = h.qtd_itens
+        is_nfe = "nf-e" in h.descricao.lower() or "nf" in nome.lower()
 
         return ft.Container(
             content=ft.Column([
@@ -211,7 +227,7 @@ def get_historico_view(page: ft.Page):
                         border=ft.border.all(1, CYAN if is_nfe else TEXT_SECONDARY)
                     ),
                     ft.Text(
-                        h.get('descricao', '') or '',
+                        h.descricao,
                         color=TEXT_SECONDARY, size=11
                     ),
                 ], spacing=8)
@@ -221,10 +237,13 @@ def get_historico_view(page: ft.Page):
             padding=20
         )
 
-    async def perform_load_data(*args):
-        historico = await get_historico_compras()
+    # Cards já desenhados: compra -> card. Na revalidação o Flet só envia os
+    # cards de compras que mudaram
+    desenhados = {}
 
-        total_gasto = sum([h.get('total', 0) for h in historico])
+    def mostrar_historico(historico):
+        """Monta o total e os cards (sem enviar ao cliente)."""
+        total_gasto = sum([h.total for h in historico])
         total_val_text.value = f"R$ {total_gasto:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
         list_content.controls.clear()
@@ -234,19 +253,30 @@ def get_historico_view(page: ft.Page):
                 content=ft.Column([
                     ft.Icon(ft.Icons.RECEIPT_LONG_OUTLINED, color=TEXT_SECONDARY, size=50),
                     ft.Text("Nenhuma compra registrada", color=TEXT_SECONDARY, size=14, text_align=ft.TextAlign.CENTER),
-                    ft.Text("Use o botão 'Importar NF-e' para registrar uma compra", color=TEXT_SECONDARY, size=11, text_align=ft.TextAlign.CENTER),
+                    ft.Text("Importe uma NF-e ou finalize uma lista para registrar uma compra", color=TEXT_SECONDARY, size=11, text_align=ft.TextAlign.CENTER),
                 ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=8),
                 alignment=ft.alignment.center,
                 padding=40
             ))
-            view.update()
+            desenhados.clear()
             return
 
+        anteriores = dict(desenhados)
+        desenhados.clear()
         for h in historico:
-            list_content.controls.append(build_history_card(h))
+            desenhados[h] = anteriores.get(h) or build_history_card(h)
+            list_content.controls.append(desenhados[h])
 
         list_content.controls.append(ft.Container(height=40))
+
+    async def perform_load_data(*args):
+        mostrar_historico(await get_historico_compras(user_id=user_id))
         view.update()
 
+    # Stale-while-revalidate: a view já nasce com o snapshot da última leitura
+    salvo = snapshot_historico(user_id=user_id)
+    if salvo is not None:
+        mostrar_historico(salvo)
+
     page.run_task(perform_load_data)
     return view
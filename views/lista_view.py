@@ -1,11 +1,35 @@
 import flet as ft
 import asyncio
+from dataclasses import replace, fields
 from app_colors import BG_COLOR, CARD_COLOR, CARD_ELEVATED, CYAN, TEXT_PRIMARY, TEXT_SECONDARY
-from database import get_itens_lista, toggle_item_comprado, delete_item, update_item, supabase, get_lista_by_id
+from database import (
+    get_itens_lista_pagina, delete_item, delete_items, set_comprado, update_item, get_lista_by_id,
+    finalizar_compra, get_changes_since, marca_dagua, snapshot_itens, snapshot_listas, PAGINA_ITENS,
+)
 from components.navbar import create_navbar
+from write_queue import fila_da_sessao
+from sessao import usuario_da_sessao
+import change_feed
+from models import Item
+
+# Intervalo (s) da sincronização em segundo plano por delta; com o Supabase
+# Realtime ativo o feed já traz tudo por push e o delta só cobre perdas
+SYNC_INTERVALO = 5.0
+SYNC_INTERVALO_REALTIME = 30.0
+
+_CAMPOS_ITEM = {f.name for f in fields(Item)}
 
 def get_lista_view(page: ft.Page, lista_id: int):
+    user_id = usuario_da_sessao(page)
+
     # Header area
+    btn_finalizar = ft.IconButton(
+        icon=ft.Icons.SHOPPING_CART_CHECKOUT,
+        icon_color=TEXT_SECONDARY,
+        icon_size=24,
+        tooltip="Finalizar compra",
+        on_click=lambda e: page.run_task(confirmar_finalizacao)
+    )
     settings_icon = ft.IconButton(icon=ft.Icons.SETTINGS, icon_color=TEXT_SECONDARY, icon_size=28)
     
     subtitle_text = ft.Text("Carregando itens...", size=12, color=TEXT_SECONDARY)
@@ -28,7 +52,7 @@ def get_lista_view(page: ft.Page, lista_id: int):
             btn_selecionar.icon_color = TEXT_SECONDARY
             selecao_bar.visible = False
             fab.visible = True
-        page.run_task(perform_load_data)
+        renderizar()
 
     btn_selecionar = ft.IconButton(
         icon=ft.Icons.CHECKLIST_OUTLINED,
@@ -37,7 +61,6 @@ def get_lista_view(page: ft.Page, lista_id: int):
         tooltip="Selecionar itens",
         on_click=lambda e: toggle_selecao_modo()
     )
-    settings_icon = ft.IconButton(icon=ft.Icons.SETTINGS, icon_color=TEXT_SECONDARY, icon_size=28)
 
     titulo_lista = ft.Text("Lista de Compras", size=20, weight=ft.FontWeight.BOLD, color=TEXT_PRIMARY)
     back_btn = ft.IconButton(
@@ -51,7 +74,7 @@ def get_lista_view(page: ft.Page, lista_id: int):
         ft.Row([
             back_btn,
             titulo_lista,
-            ft.Row([btn_selecionar, settings_icon], spacing=0)
+            ft.Row([btn_finalizar, btn_selecionar, settings_icon], spacing=0)
         ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
         subtitle_text
     ], spacing=0)
@@ -93,23 +116,22 @@ def get_lista_view(page: ft.Page, lista_id: int):
         view.update()
         
         try:
-            from groq_service import analyze_receipt_or_list_with_groq
-            from database import insert_item
+            from groq_service import analyze_receipt_or_list_with_groq_async
+            from database import insert_items_bulk
             
-            mock_items = await asyncio.to_thread(analyze_receipt_or_list_with_groq, file_path)
+            mock_items = await analyze_receipt_or_list_with_groq_async(file_path)
             
             if mock_items and len(mock_items) > 0:
                 total = len(mock_items)
-                for idx, item in enumerate(mock_items):
+                for item in mock_items:
                     item['comprado'] = False
-                    item.setdefault('preco', 0.0)
-                    item['lista_id'] = lista_id
-                    # Inserir um item de cada vez
-                    await insert_item(item)
-                    scan_status_text.value = f"Adicionando itens... {idx+1}/{total}"
-                    scan_progress.value = (idx + 1) / total
-                    # Atualizar lista sem reconstruir a view inteira
-                    await perform_load_data()
+                scan_status_text.value = f"Adicionando {total} itens..."
+                view.update()
+                # Todos os itens em uma única requisição
+                if not await insert_items_bulk(lista_id, mock_items, user_id=user_id):
+                    raise RuntimeError("falha ao inserir itens em lote")
+                # Só os itens novos chegam (delta), sem recarregar a lista
+                await sincronizar()
                 
                 scan_status_text.value = f"✅ {total} itens adicionados!"
                 scan_progress.visible = False
@@ -184,7 +206,10 @@ def get_lista_view(page: ft.Page, lista_id: int):
     ], spacing=12)
 
     # Categories Content
-    list_content = ft.Column(scroll=ft.ScrollMode.HIDDEN, expand=True, spacing=20)
+    list_content = ft.Column(
+        scroll=ft.ScrollMode.HIDDEN, expand=True, spacing=20,
+        on_scroll=lambda e: on_scroll_lista(e), on_scroll_interval=100
+    )
 
     main_container = ft.Container(
         content=ft.Column([
@@ -209,7 +234,7 @@ def get_lista_view(page: ft.Page, lista_id: int):
         else:
             ids_selecionados.clear()
             ids_selecionados.update(todos_os_ids)
-        await perform_load_data()
+        renderizar()
 
     async def excluir_selecionados(e):
         if not ids_selecionados:
@@ -218,11 +243,17 @@ def get_lista_view(page: ft.Page, lista_id: int):
         async def do_delete(dlg):
             dlg.open = False
             page.update()
-            import asyncio as aio
-            tasks = [delete_item(iid) for iid in list(ids_selecionados)]
-            await aio.gather(*tasks)
+            ids = list(ids_selecionados)
+            # Otimista: some da tela já; o servidor confirma em seguida
+            removidos = [it for it in estado_itens if it.id in ids_selecionados]
+            estado_itens[:] = [it for it in estado_itens if it.id not in ids_selecionados]
             ids_selecionados.clear()
             toggle_selecao_modo()  # desativa modo
+            # Uma única requisição para toda a seleção
+            if not await delete_items(ids, user_id=user_id):
+                estado_itens.extend(removidos)
+                renderizar()
+                mostrar_erro(f"Erro ao excluir {len(ids)} item(ns)")
 
         dlg = ft.AlertDialog(
             modal=True,
@@ -242,6 +273,21 @@ def get_lista_view(page: ft.Page, lista_id: int):
         dlg.open = True
         page.update()
 
+    async def comprar_selecionados(e):
+        if not ids_selecionados:
+            return
+        ids = list(ids_selecionados)
+        # Otimista: marca na tela já; uma requisição grava toda a seleção
+        anteriores = {it.id: it for it in estado_itens if it.id in ids_selecionados}
+        estado_itens[:] = [replace(it, comprado=True) if it.id in anteriores else it for it in estado_itens]
+        fila.descartar(ids, "comprado")
+        ids_selecionados.clear()
+        toggle_selecao_modo()  # desativa modo (re-renderiza)
+        if not await set_comprado(ids, True, user_id=user_id):
+            estado_itens[:] = [anteriores.get(it.id, it) for it in estado_itens]
+            renderizar()
+            mostrar_erro(f"Erro ao marcar {len(ids)} item(ns) como comprado(s)")
+
     selecao_bar = ft.Container(
         content=ft.Row([
             sel_count_text,
@@ -253,6 +299,13 @@ def get_lista_view(page: ft.Page, lista_id: int):
                     style=ft.ButtonStyle(color=CYAN),
                     on_click=lambda e: page.run_task(selecionar_todos, e)
                 ),
+                ft.TextButton(
+                    "Comprados",
+                    icon=ft.Icons.CHECK_CIRCLE_OUTLINE,
+                    icon_color=ft.Colors.GREEN_400,
+                    style=ft.ButtonStyle(color=ft.Colors.GREEN_400),
+                    on_click=lambda e: page.run_task(comprar_selecionados, e)
+                ),
                 ft.TextButton(
                     "Excluir",
                     icon=ft.Icons.DELETE_OUTLINE,
@@ -291,26 +344,139 @@ def get_lista_view(page: ft.Page, lista_id: int):
     )
     view.controls.append(file_picker)
 
-    async def on_checkbox_change(e, item_id, current_status):
-        new_status = not current_status
-        e.control.disabled = True
+    # Marcações de comprado vão para a fila de escrita da sessão: a tela
+    # atualiza na hora e os toques são gravados em lote em segundo plano.
+    fila = fila_da_sessao(page)
+
+    def on_fila_erro(pendentes, descartados=0):
+        msg = f"Sem conexão — {pendentes} alteração(ões) serão reenviadas"
+        if descartados:
+            msg = f"{descartados} alteração(ões) não puderam ser gravadas (item excluído?)"
+        sb = ft.SnackBar(ft.Text(msg, color=ft.Colors.WHITE), bgcolor=ft.Colors.ORANGE_700, open=True)
+        page.overlay.append(sb)
+        page.update()
+
+    fila.on_erro = on_fila_erro
+
+    async def on_checkbox_change(e, item_id):
+        comprado = bool(e.control.value)
+        fila.marcar_comprado(item_id, comprado)
+        for it in estado_itens:
+            if it.id == item_id:
+                atualizar_item_local(replace(it, comprado=comprado))
+                break
+
+    # ─── Finalizar compra: uma linha-resumo em historico_compras ───────────
+    async def confirmar_finalizacao():
+        comprados = [i for i in estado_itens if i.comprado]
+        total = sum(i.preco for i in comprados)
+
+        async def do_finalizar(dlg):
+            dlg.open = False
+            page.update()
+            await fila.flush()   # marcações ainda na fila entram no total
+            resumo = await finalizar_compra(lista_id, user_id=user_id)
+            if not resumo:
+                mostrar_erro("Erro ao finalizar compra")
+                return
+            sb = ft.SnackBar(
+                ft.Text(f"Compra registrada no histórico: R$ {resumo.total:.2f} ({resumo.qtd_itens} itens)",
+                        color=ft.Colors.WHITE),
+                bgcolor=ft.Colors.GREEN_700, open=True
+            )
+            page.overlay.append(sb)
+            page.update()
+
+        dlg = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Finalizar compra?", color=TEXT_PRIMARY),
+            content=ft.Text(
+                f"{len(comprados)} item(ns) comprado(s) • R$ {total:.2f}\nA compra será registrada no histórico.",
+                color=TEXT_SECONDARY
+            ),
+            actions=[
+                ft.TextButton("Cancelar", on_click=lambda e: setattr(dlg, 'open', False) or page.update()),
+                ft.TextButton(
+                    "Finalizar",
+                    style=ft.ButtonStyle(color=CYAN),
+                    on_click=lambda e: page.run_task(do_finalizar, dlg)
+                ),
+            ],
+            bgcolor=CARD_COLOR,
+        )
+        page.overlay.append(dlg)
+        dlg.open = True
+        page.update()
+
+    # ─── Atualização otimista: só o card afetado e o subtítulo ─────────────
+    cards = {}   # item_id -> card exibido
+
+    def mostrar_erro(msg):
+        sb = ft.SnackBar(ft.Text(msg, color=ft.Colors.WHITE), bgcolor=ft.Colors.RED, open=True)
+        page.overlay.append(sb)
+        page.update()
+
+    def atualizar_subtitulo():
+        pendentes = [i for i in estado_itens if not i.comprado]
+        total_est = sum(i.preco for i in pendentes)
+        mais = "+" if cursor_itens[0] is not None else ""
+        subtitle_text.value = f"{len(pendentes)}{mais} itens restantes • R$ {total_est:.2f}{mais} est."
+
+    def atualizar_item_local(item):
+        """
+        Troca o item no estado local e re-renderiza apenas o seu card. Se o
+        item muda de seção, de posição ou de chip (comprado/nome/categoria),
+        remonta a lista — renderizar() reaproveita os demais cards.
+        """
+        anterior = None
+        for idx, it in enumerate(estado_itens):
+            if it.id == item.id:
+                anterior, estado_itens[idx] = it, item
+                break
+        antigo = cards.get(item.id)
+        pos = next((i for i, c in enumerate(list_content.controls) if c is antigo), None)
+        muda_lugar = anterior is None or (anterior.comprado, anterior.nome, anterior.categoria) != (
+            item.comprado, item.nome, item.categoria
+        )
+        if pos is None or muda_lugar:
+            renderizar()
+            return
+        cards[item.id] = list_content.controls[pos] = card_de(item)
+        atualizar_subtitulo()
         view.update()
-        sucesso = await toggle_item_comprado(item_id, new_status)
-        if sucesso:
-            await perform_load_data()
-        else:
-            e.control.disabled = False
-            e.control.value = current_status
-            view.update()
+
+    def remover_item_local(item_id):
+        estado_itens[:] = [it for it in estado_itens if it.id != item_id]
+        if not estado_itens:
+            renderizar()   # mostra o estado vazio
+            return
+        card = cards.pop(item_id, None)
+        list_content.controls[:] = [c for c in list_content.controls if c is not card]
+        atualizar_subtitulo()
+        view.update()
+
+    # Cards já desenhados: item_id -> (Item, estado de seleção, card). Um card
+    # cujo item não mudou é reaproveitado por renderizar() — na revalidação
+    # do snapshot e nas sincronizações o Flet só envia os que mudaram
+    desenhados = {}
+
+    def card_de(item):
+        modo = (selecao_ativa[0], item.id in ids_selecionados)
+        anterior = desenhados.get(item.id)
+        if anterior and anterior[0] == item and anterior[1] == modo:
+            return anterior[2]
+        card = build_item_card(item)
+        desenhados[item.id] = (item, modo, card)
+        return card
 
     CARD_COLOR_COMPRADO = "#0D1A26"
 
     def build_item_card(item):
-        nome = item.get('nome', 'Sem nome')
-        preco = item.get('preco', 0)
-        categoria = item.get('categoria', '')
-        item_id = item.get('id')
-        is_comprado = item.get('comprado', False)
+        nome = item.nome
+        preco = item.preco
+        categoria = item.categoria or ''
+        item_id = item.id
+        is_comprado = item.comprado
 
         text_decor = ft.TextDecoration.LINE_THROUGH if is_comprado else ft.TextDecoration.NONE
         text_color = TEXT_SECONDARY if is_comprado else TEXT_PRIMARY
@@ -325,7 +491,7 @@ def get_lista_view(page: ft.Page, lista_id: int):
                 else:
                     ids_selecionados.add(iid)
                 sel_count_text.value = f"{len(ids_selecionados)} selecionado(s)"
-                page.run_task(perform_load_data)
+                atualizar_item_local(item)
 
             sel_cb = ft.Checkbox(
                 value=is_sel,
@@ -355,7 +521,7 @@ def get_lista_view(page: ft.Page, lista_id: int):
             value=is_comprado,
             fill_color={ft.ControlState.SELECTED: CYAN, ft.ControlState.DEFAULT: "transparent"},
             check_color=BG_COLOR,
-            on_change=lambda e: page.run_task(on_checkbox_change, e, item_id, is_comprado)
+            on_change=lambda e: page.run_task(on_checkbox_change, e, item_id)
         )
 
         async def confirmar_exclusao(e):
@@ -383,13 +549,12 @@ def get_lista_view(page: ft.Page, lista_id: int):
 
         async def fazer_exclusao(dlg):
             close_dlg(dlg)
-            sucesso = await delete_item(item_id)
-            if sucesso:
-                await perform_load_data()
-            else:
-                sb = ft.SnackBar(ft.Text("Erro ao excluir item", color=ft.Colors.WHITE), bgcolor=ft.Colors.RED, open=True)
-                page.overlay.append(sb)
-                page.update()
+            remover_item_local(item_id)
+            if not await delete_item(item_id, user_id=user_id):
+                # Rollback: devolve o item e redesenha
+                estado_itens.append(item)
+                renderizar()
+                mostrar_erro("Erro ao excluir item")
 
         async def abrir_edicao(e):
             txt_nome = ft.TextField(
@@ -449,13 +614,10 @@ def get_lista_view(page: ft.Page, lista_id: int):
                 "categoria": dd_cat.value
             }
             close_dlg(dlg)
-            sucesso = await update_item(item_id, dados)
-            if sucesso:
-                await perform_load_data()
-            else:
-                sb = ft.SnackBar(ft.Text("Erro ao atualizar item", color=ft.Colors.WHITE), bgcolor=ft.Colors.RED, open=True)
-                page.overlay.append(sb)
-                page.update()
+            atualizar_item_local(replace(item, **dados))
+            if not await update_item(item_id, dados, user_id=user_id):
+                atualizar_item_local(item)   # rollback para o valor anterior
+                mostrar_erro("Erro ao atualizar item")
 
         btn_edit = ft.IconButton(
             icon=ft.Icons.EDIT_OUTLINED,
@@ -497,12 +659,126 @@ def get_lista_view(page: ft.Page, lista_id: int):
     # Filtro de categoria ativo (None = todos)
     filtro_categoria = [None]
 
+    # Itens já carregados (paginação por id; próximas páginas ao rolar)
+    estado_itens = []
+    cursor_itens = [None]
+    carregando_mais = [False]
+
     async def perform_load_data():
-        itens = await get_itens_lista(lista_id)
+        """Recarrega do início, mantendo a quantidade de itens já exibida."""
+        limite = max(PAGINA_ITENS, len(estado_itens))
+        itens, cursor_itens[0] = await get_itens_lista_pagina(lista_id, limite, user_id=user_id)
+        estado_itens[:] = fila.aplicar(itens)
+        # Tudo o que está na tela acabou de vir do servidor: deltas partem daqui
+        watermark[0] = marca_dagua(itens)
+        renderizar()
+
+    # ─── Sincronização por delta (updated_at + tombstones) ──────────────────
+    watermark = [None]
+
+    async def sincronizar():
+        """Aplica ao estado local só as linhas que mudaram desde a última leitura."""
+        alterados, removidos, watermark[0] = await get_changes_since(lista_id, watermark[0], user_id=user_id)
+        if not alterados and not removidos:
+            return
+        posicao = {it.id: idx for idx, it in enumerate(estado_itens)}
+        mudou = False
+        for item in fila.aplicar(alterados):
+            if item.id in posicao:
+                atual = estado_itens[posicao[item.id]]
+                # Já aplicado pelo feed (só updated_at difere): não redesenha
+                if replace(atual, updated_at=item.updated_at) != item:
+                    mudou = True
+                estado_itens[posicao[item.id]] = item
+            elif cursor_itens[0] is None or item.id > cursor_itens[0]:
+                # Novo item dentro da faixa já carregada (páginas seguintes vêm frescas)
+                estado_itens.append(item)
+                mudou = True
+        if removidos:
+            fora = set(removidos) & set(posicao)
+            if fora:
+                estado_itens[:] = [it for it in estado_itens if it.id not in fora]
+                ids_selecionados.difference_update(fora)
+                mudou = True
+        if mudou:
+            renderizar()
+
+    async def loop_sincronizacao():
+        """Atualização em segundo plano enquanto a lista estiver aberta."""
+        try:
+            while view in page.views:
+                await asyncio.sleep(SYNC_INTERVALO_REALTIME if change_feed.realtime_ativo() else SYNC_INTERVALO)
+                if view in page.views and not carregando_mais[0]:
+                    await sincronizar()
+        finally:
+            parar_feed()
+
+    # ─── Feed de alterações: escritas de outras sessões chegam por push ─────
+    cancelar_feed = [None]
+
+    def parar_feed():
+        if cancelar_feed[0]:
+            cancelar_feed[0]()
+            cancelar_feed[0] = None
+
+    def on_evento(evento):
+        """Aplica um INSERT/UPDATE/DELETE só nos cards afetados."""
+        if view not in page.views:
+            parar_feed()
+            return
+        posicao = {it.id: idx for idx, it in enumerate(estado_itens)}
+
+        if evento.tipo == change_feed.DELETE:
+            fora = set(evento.ids) & set(posicao)
+            ids_selecionados.difference_update(fora)
+            if len(fora) == 1:
+                remover_item_local(fora.pop())
+            elif fora:
+                estado_itens[:] = [it for it in estado_itens if it.id not in fora]
+                renderizar()
+            return
+
+        if evento.itens:
+            recebidos = list(evento.itens)
+        else:
+            patch = {k: v for k, v in evento.patch.items() if k in _CAMPOS_ITEM}
+            recebidos = [replace(estado_itens[posicao[i]], **patch) for i in evento.ids if i in posicao]
+
+        novos = False
+        for item in fila.aplicar(recebidos):
+            if item.id in posicao:
+                if estado_itens[posicao[item.id]] != item:
+                    atualizar_item_local(item)
+            elif (evento.tipo == change_feed.INSERT and item.lista_id == lista_id
+                  and (cursor_itens[0] is None or item.id > cursor_itens[0])):
+                estado_itens.append(item)
+                novos = True
+        if novos:
+            renderizar()
+
+    async def carregar_mais_itens():
+        if cursor_itens[0] is None or carregando_mais[0]:
+            return
+        carregando_mais[0] = True
+        try:
+            itens, cursor_itens[0] = await get_itens_lista_pagina(lista_id, cursor=cursor_itens[0], user_id=user_id)
+            estado_itens.extend(fila.aplicar(itens))
+            renderizar()
+        finally:
+            carregando_mais[0] = False
+
+    def on_scroll_lista(e: ft.OnScrollEvent):
+        if cursor_itens[0] is not None and e.pixels >= e.max_scroll_extent - 300:
+            page.run_task(carregar_mais_itens)
+
+    def renderizar(enviar=True):
+        """Remonta a lista; enviar=False só monta (view ainda fora da página)."""
+        itens = estado_itens
         list_content.controls.clear()
+        cards.clear()
 
         todos_os_ids.clear()
-        todos_os_ids.extend([i['id'] for i in itens if i.get('id')])
+        todos_os_ids.extend([i.id for i in itens])
         sel_count_text.value = f"{len(ids_selecionados)} selecionado(s)"
 
         if not itens:
@@ -512,26 +788,27 @@ def get_lista_view(page: ft.Page, lista_id: int):
                 padding=40
             ))
             subtitle_text.value = "0 itens restantes - R$ 0,00 est."
-            view.update()
+            desenhados.clear()
+            if enviar:
+                view.update()
             return
 
         itens_pendentes = sorted(
-            [i for i in itens if not i.get('comprado', False)],
-            key=lambda x: x.get('nome', '').lower()
+            [i for i in itens if not i.comprado],
+            key=lambda x: x.nome.lower()
         )
         itens_comprados = sorted(
-            [i for i in itens if i.get('comprado', False)],
-            key=lambda x: x.get('nome', '').lower()
+            [i for i in itens if i.comprado],
+            key=lambda x: x.nome.lower()
         )
 
-        total_est = sum([float(i.get('preco', 0)) for i in itens_pendentes])
-        subtitle_text.value = f"{len(itens_pendentes)} itens restantes • R$ {total_est:.2f} est."
+        atualizar_subtitulo()
 
         if itens_pendentes:
             # Descobre as categorias existentes nos itens pendentes
             cats_existentes = []
             for item in itens_pendentes:
-                cat = item.get('categoria') or 'Outros'
+                cat = item.categoria or 'Outros'
                 if cat not in cats_existentes:
                     cats_existentes.append(cat)
 
@@ -544,7 +821,7 @@ def get_lista_view(page: ft.Page, lista_id: int):
                         filtro_categoria[0] = None   # desseleciona
                     else:
                         filtro_categoria[0] = lbl
-                    page.run_task(perform_load_data)
+                    renderizar()
 
                 return ft.Container(
                     content=ft.Text(
@@ -578,7 +855,7 @@ def get_lista_view(page: ft.Page, lista_id: int):
 
             # Aplica o filtro
             itens_exibidos = (
-                [i for i in itens_pendentes if (i.get('categoria') or 'Outros') == filtro_categoria[0]]
+                [i for i in itens_pendentes if (i.categoria or 'Outros') == filtro_categoria[0]]
                 if filtro_categoria[0]
                 else itens_pendentes
             )
@@ -594,7 +871,8 @@ def get_lista_view(page: ft.Page, lista_id: int):
                 ))
             else:
                 for item in itens_exibidos:
-                    list_content.controls.append(build_item_card(item))
+                    cards[item.id] = card_de(item)
+                    list_content.controls.append(cards[item.id])
 
         if itens_comprados:
             list_content.controls.append(ft.Container(height=10))
@@ -604,17 +882,50 @@ def get_lista_view(page: ft.Page, lista_id: int):
                 ft.Text("COMPRADOS", size=11, weight=ft.FontWeight.W_600, color=TEXT_SECONDARY),
             ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN))
             for item in itens_comprados:
-                list_content.controls.append(build_item_card(item))
+                cards[item.id] = card_de(item)
+                list_content.controls.append(cards[item.id])
 
+        if cursor_itens[0] is not None:
+            list_content.controls.append(ft.Container(
+                content=ft.TextButton(
+                    "Carregar mais itens",
+                    icon=ft.Icons.EXPAND_MORE,
+                    style=ft.ButtonStyle(color=CYAN),
+                    on_click=lambda e: page.run_task(carregar_mais_itens)
+                ),
+                alignment=ft.alignment.center
+            ))
         list_content.controls.append(ft.Container(height=80))
-        view.update()
+        for item_id in set(desenhados) - set(cards):
+            del desenhados[item_id]
+        if enviar:
+            view.update()
+
+    # Stale-while-revalidate: a view já nasce com o snapshot da última leitura
+    # (título e itens); perform_load_data troca só os cards que mudaram
+    salvo = snapshot_listas(user_id=user_id)
+    titulo_salvo = next((l.nome for l in salvo[0] if l.id == lista_id), None) if salvo else None
+    if titulo_salvo:
+        titulo_lista.value = titulo_salvo
+    salvo = snapshot_itens(lista_id, user_id=user_id)
+    if salvo:
+        itens, cursor_itens[0] = salvo
+        estado_itens[:] = fila.aplicar(itens)
+        renderizar(enviar=False)
 
     async def load_data(*args):
         # Carrega o nome da lista no título
-        lista_info = await get_lista_by_id(lista_id)
-        if lista_info:
-            titulo_lista.value = lista_info.get("nome", "Lista de Compras")
+        lista_info = await get_lista_by_id(lista_id, user_id=user_id)
+        if not lista_info:
+            # Lista de outro usuário (ou excluída): nada de feed nem sincronização
+            titulo_lista.value = "Lista não encontrada"
+            estado_itens.clear()
+            renderizar()
+            return
+        titulo_lista.value = lista_info.nome
         await perform_load_data()
+        cancelar_feed[0] = change_feed.assinar(lista_id, user_id, on_evento)
+        page.run_task(loop_sincronizacao)
 
     page.run_task(load_data)
     return view
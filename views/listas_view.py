@@ -2,15 +2,25 @@ import flet as ft
 import asyncio
 from datetime import date
 from app_colors import BG_COLOR, CARD_COLOR, CYAN, TEXT_PRIMARY, TEXT_SECONDARY
-from database import get_listas, create_lista, delete_lista, get_itens_lista, registrar_compra_nfe
+from database import get_listas_pagina, snapshot_listas, create_lista, delete_lista, registrar_compra_nfe, get_lista_por_chave_nfe
 from components.navbar import create_navbar
+from sessao import usuario_da_sessao, link_da_casa
 
 def get_listas_view(page: ft.Page):
+    user_id = usuario_da_sessao(page)
 
     list_content = ft.Column(spacing=12, expand=True)
 
+    # Paginação: primeira página ao abrir, próximas ao rolar até o fim
+    cursor_listas = [None]
+    carregando_mais = [False]
+
+    def on_scroll(e: ft.OnScrollEvent):
+        if cursor_listas[0] is not None and e.pixels >= e.max_scroll_extent - 200:
+            page.run_task(carregar_mais)
+
     scroll_area = ft.Container(
-        content=ft.Column([list_content], scroll=ft.ScrollMode.AUTO, expand=True),
+        content=ft.Column([list_content], scroll=ft.ScrollMode.AUTO, expand=True, on_scroll=on_scroll, on_scroll_interval=100),
         expand=True,
     )
 
@@ -40,18 +50,31 @@ def get_listas_view(page: ft.Page):
         scan_progress.visible = True
         view.update()
         try:
-            from qrcode_service import get_items_from_nfe_qrcode
-            nfe_items = await asyncio.to_thread(get_items_from_nfe_qrcode, file_path)
+            from qrcode_service import read_nfe_qrcode_async, get_items_from_nfe_url_async, nfe_access_key
+            url = await read_nfe_qrcode_async(file_path)
+            # Nota já importada: abre a lista existente, sem SEFAZ nem Groq
+            chave = nfe_access_key(url)
+            existente = await get_lista_por_chave_nfe(chave, user_id=user_id) if chave else None
+            if existente:
+                scan_status_text.value = "✅ Esta nota já foi importada."
+                scan_progress.visible = False
+                scan_banner.visible = False
+                view.update()
+                page.go(f"/lista/{existente.id}")
+                return
+            scan_status_text.value = "Consultando a nota na SEFAZ..."
+            view.update()
+            nfe_items = await get_items_from_nfe_url_async(url)
             if nfe_items and len(nfe_items) > 0:
                 scan_status_text.value = f"Criando lista com {len(nfe_items)} itens..."
                 view.update()
-                lista = await registrar_compra_nfe(nfe_items)
+                lista = await registrar_compra_nfe(nfe_items, chave_nfe=chave, user_id=user_id)
                 if lista:
                     scan_status_text.value = f"✅ Lista criada com {len(nfe_items)} itens!"
                     scan_progress.visible = False
                     scan_banner.visible = False
                     view.update()
-                    page.go(f"/lista/{lista['id']}")
+                    page.go(f"/lista/{lista.id}")
                 else:
                     scan_status_text.value = "⚠️ Erro ao salvar no banco."
                     scan_progress.visible = False
@@ -107,7 +130,7 @@ def get_listas_view(page: ft.Page):
         async def fazer_exclusao(dlg):
             dlg.open = False
             page.update()
-            ok = await delete_lista(lista_id)
+            ok = await delete_lista(lista_id, user_id=user_id)
             if ok:
                 await perform_load_data()
 
@@ -130,10 +153,10 @@ def get_listas_view(page: ft.Page):
         page.update()
 
     def build_lista_card(lista):
-        lista_id = lista.get("id")
-        nome = lista.get("nome", "Sem nome")
-        descricao = lista.get("descricao", "")
-        data_str = lista.get("data", "")
+        lista_id = lista.id
+        nome = lista.nome
+        descricao = lista.descricao
+        data_str = lista.data
 
         # Formata data
         try:
@@ -142,6 +165,10 @@ def get_listas_view(page: ft.Page):
         except:
             data_fmt = data_str
 
+        # Resumo desnormalizado (triggers) — nenhuma consulta extra por card
+        comprados = lista.qtd_itens - lista.qtd_pendentes
+        progresso = comprados / lista.qtd_itens if lista.qtd_itens else 0.0
+
         return ft.Container(
             content=ft.Row([
                 ft.Container(
@@ -151,7 +178,13 @@ def get_listas_view(page: ft.Page):
                         ft.Row([
                             ft.Icon(ft.Icons.CALENDAR_TODAY_OUTLINED, size=11, color=TEXT_SECONDARY),
                             ft.Text(data_fmt, size=11, color=TEXT_SECONDARY),
+                            ft.Text("•", size=11, color=TEXT_SECONDARY),
+                            ft.Text(f"R$ {lista.total:.2f}", size=11, color=CYAN, weight=ft.FontWeight.W_500),
+                            ft.Text("•", size=11, color=TEXT_SECONDARY),
+                            ft.Text(f"{comprados}/{lista.qtd_itens} itens", size=11, color=TEXT_SECONDARY),
                         ], spacing=4),
+                        ft.ProgressBar(value=progresso, color=CYAN, bgcolor=BG_COLOR, height=3,
+                                       visible=lista.qtd_itens > 0),
                     ], spacing=4, expand=True),
                     expand=True,
                     on_click=lambda e, lid=lista_id: page.run_task(abrir_lista, lid),
@@ -171,8 +204,43 @@ def get_listas_view(page: ft.Page):
             border=ft.border.all(1, ft.Colors.with_opacity(0.08, ft.Colors.WHITE)),
         )
 
-    async def perform_load_data():
-        listas = await get_listas()
+    # Cards já desenhados: lista_id -> (Lista, card). Ao revalidar, o card de
+    # uma lista que não mudou é reaproveitado e o Flet só envia os que mudaram
+    desenhados = {}
+
+    def card_de(lista):
+        anterior = desenhados.get(lista.id)
+        if anterior and anterior[0] == lista:
+            return anterior[1]
+        card = build_lista_card(lista)
+        desenhados[lista.id] = (lista, card)
+        return card
+
+    btn_carregar_mais = ft.TextButton(
+        "Carregar mais",
+        icon=ft.Icons.EXPAND_MORE,
+        style=ft.ButtonStyle(color=CYAN),
+        on_click=lambda e: page.run_task(carregar_mais),
+    )
+    rodape = ft.Container(content=btn_carregar_mais, alignment=ft.alignment.center, height=80)
+
+    async def carregar_mais():
+        if cursor_listas[0] is None or carregando_mais[0]:
+            return
+        carregando_mais[0] = True
+        try:
+            listas, cursor_listas[0] = await get_listas_pagina(cursor=cursor_listas[0], user_id=user_id)
+            list_content.controls.remove(rodape)
+            for lista in listas:
+                list_content.controls.append(card_de(lista))
+            btn_carregar_mais.visible = cursor_listas[0] is not None
+            list_content.controls.append(rodape)
+            view.update()
+        finally:
+            carregando_mais[0] = False
+
+    def mostrar_listas(listas):
+        """Monta a primeira página (sem enviar ao cliente)."""
         list_content.controls.clear()
 
         if not listas:
@@ -189,9 +257,16 @@ def get_listas_view(page: ft.Page):
             )
         else:
             for lista in listas:
-                list_content.controls.append(build_lista_card(lista))
+                list_content.controls.append(card_de(lista))
+        for lista_id in set(desenhados) - {lista.id for lista in listas}:
+            del desenhados[lista_id]
 
-        list_content.controls.append(ft.Container(height=80))
+        btn_carregar_mais.visible = cursor_listas[0] is not None
+        list_content.controls.append(rodape)
+
+    async def perform_load_data():
+        listas, cursor_listas[0] = await get_listas_pagina(user_id=user_id)
+        mostrar_listas(listas)
         view.update()
 
     # ─── Bottom Sheet para criar nova lista ───────────────────────────────────
@@ -247,7 +322,7 @@ def get_listas_view(page: ft.Page):
         except:
             pass
 
-        nova = await create_lista(nome, desc, data_iso)
+        nova = await create_lista(nome, desc, data_iso, user_id=user_id)
         if nova:
             bs.open = False
             page.update()
@@ -257,7 +332,7 @@ def get_listas_view(page: ft.Page):
             bs_error.value = ""
             await perform_load_data()
             # Abre diretamente a lista criada
-            page.go(f"/lista/{nova['id']}")
+            page.go(f"/lista/{nova.id}")
 
     bs = ft.BottomSheet(
         content=ft.Container(
@@ -301,10 +376,28 @@ def get_listas_view(page: ft.Page):
 
     nav_bar = create_navbar(page, selected_index=0)
 
+    def compartilhar(e):
+        """Copia o link que abre estas mesmas listas em outro aparelho."""
+        page.set_clipboard(link_da_casa(page))
+        sb = ft.SnackBar(
+            ft.Text("Link copiado! Abra-o no outro aparelho para ver as mesmas listas.", color=BG_COLOR),
+            bgcolor=CYAN, open=True,
+        )
+        page.overlay.append(sb)
+        page.update()
+
     header = ft.Column([
         ft.Row([
             ft.Text("Minhas Listas", size=24, weight=ft.FontWeight.BOLD, color=TEXT_PRIMARY),
-            ft.Icon(ft.Icons.SHOPPING_CART_OUTLINED, color=CYAN, size=28),
+            ft.Row([
+                ft.IconButton(
+                    icon=ft.Icons.DEVICES_OUTLINED,
+                    icon_color=CYAN,
+                    tooltip="Usar estas listas em outro aparelho",
+                    on_click=compartilhar,
+                ),
+                ft.Icon(ft.Icons.SHOPPING_CART_OUTLINED, color=CYAN, size=28),
+            ], spacing=0),
         ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
         ft.Text("Selecione ou crie uma lista de compras", size=12, color=TEXT_SECONDARY),
         ft.Container(height=4),
@@ -344,6 +437,13 @@ def get_listas_view(page: ft.Page):
         floating_action_button_location=ft.FloatingActionButtonLocation.END_FLOAT,
     )
 
+    # Stale-while-revalidate: a view já nasce com o snapshot da última leitura
+    # e a leitura real troca só os cards que mudaram
+    salvo = snapshot_listas(user_id=user_id)
+    if salvo:
+        listas, cursor_listas[0] = salvo
+        mostrar_listas(listas)
+
     async def load_data(*args):
         await perform_load_data()
 
@@ -1,7 +1,10 @@
 import flet as ft
+import asyncio
+from datetime import date, timedelta
 from app_colors import BG_COLOR, CARD_COLOR, CYAN, TEXT_PRIMARY, TEXT_SECONDARY
 from database import get_historico_compras, get_totais_por_categoria
 from components.navbar import create_navbar
+from sessao import usuario_da_sessao
 
 # Ícones por categoria
 ICONES_CATEGORIA = {
@@ -14,7 +17,17 @@ ICONES_CATEGORIA = {
     "Outros":     ft.Icons.CATEGORY_OUTLINED,
 }
 
+MESES = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+         "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+
+def limites_mes(ref: date) -> tuple[str, str]:
+    """Primeiro e último dia (ISO) do mês de `ref`."""
+    inicio = ref.replace(day=1)
+    proximo = (inicio + timedelta(days=32)).replace(day=1)
+    return str(inicio), str(proximo - timedelta(days=1))
+
 def get_orcamento_view(page: ft.Page):
+    user_id = usuario_da_sessao(page)
 
     header_col = ft.Row([
         ft.Text("Orçamento", size=24, weight=ft.FontWeight.BOLD, color=TEXT_PRIMARY),
@@ -29,6 +42,22 @@ def get_orcamento_view(page: ft.Page):
         )
     ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN)
 
+    # ─── Seletor de mês (padrão: mês atual) ──────────────────────────────────
+    mes_ref = [date.today().replace(day=1)]
+    mes_text = ft.Text("", color=TEXT_PRIMARY, size=14, weight=ft.FontWeight.W_600)
+
+    def mudar_mes(delta: int):
+        d = mes_ref[0]
+        anos, mes = divmod(d.month - 1 + delta, 12)
+        mes_ref[0] = date(d.year + anos, mes + 1, 1)
+        page.run_task(perform_load_data)
+
+    mes_row = ft.Row([
+        ft.IconButton(ft.Icons.CHEVRON_LEFT, icon_color=TEXT_SECONDARY, on_click=lambda e: mudar_mes(-1)),
+        mes_text,
+        ft.IconButton(ft.Icons.CHEVRON_RIGHT, icon_color=TEXT_SECONDARY, on_click=lambda e: mudar_mes(1)),
+    ], alignment=ft.MainAxisAlignment.CENTER, spacing=4)
+
     # ─── Anel de progresso ────────────────────────────────────────────────────
     progress_container = ft.Container(
         content=ft.Stack([
@@ -51,6 +80,7 @@ def get_orcamento_view(page: ft.Page):
     main_container = ft.Container(
         content=ft.Column([
             header_col,
+            mes_row,
             progress_container,
             meta_text,
             ft.Container(height=6),
@@ -109,12 +139,16 @@ def get_orcamento_view(page: ft.Page):
     META_GLOBAL = 2000.00
 
     async def perform_load_data(*args):
-        # Busca dados reais
-        historico = await get_historico_compras()
-        categorias = await get_totais_por_categoria()
+        # Busca dados reais do mês selecionado (agregados no servidor)
+        inicio, fim = limites_mes(mes_ref[0])
+        mes_text.value = f"{MESES[mes_ref[0].month - 1]} {mes_ref[0].year}"
+        historico, categorias = await asyncio.gather(
+            get_historico_compras(inicio, fim, user_id=user_id),
+            get_totais_por_categoria(inicio, fim, user_id=user_id),
+        )
 
-        total_gasto = sum(h.get("total", 0) for h in historico)
-        total_comprado = sum(c.get("total", 0) for c in categorias)
+        total_gasto = sum(h.total for h in historico)
+        total_comprado = sum(c.total for c in categorias)
         qtd_compras = len(historico)
         pct_global = total_gasto / META_GLOBAL if META_GLOBAL > 0 else 0
 
@@ -157,7 +191,7 @@ def get_orcamento_view(page: ft.Page):
             list_content.controls.append(ft.Container(
                 content=ft.Column([
                     ft.Icon(ft.Icons.RECEIPT_LONG_OUTLINED, color=TEXT_SECONDARY, size=40),
-                    ft.Text("Nenhum item comprado ainda.", color=TEXT_SECONDARY, size=13, text_align=ft.TextAlign.CENTER),
+                    ft.Text("Nenhum item comprado neste mês.", color=TEXT_SECONDARY, size=13, text_align=ft.TextAlign.CENTER),
                     ft.Text("Escaneie um recibo NF-e para ver os gastos por categoria.", color=TEXT_SECONDARY, size=11, text_align=ft.TextAlign.CENTER),
                 ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=6),
                 alignment=ft.alignment.center,
@@ -166,7 +200,7 @@ def get_orcamento_view(page: ft.Page):
         else:
             for c in categorias:
                 list_content.controls.append(
-                    build_category_row(c["categoria"], c["total"], total_comprado, c["qtd_itens"])
+                    build_category_row(c.categoria, c.total, total_comprado, c.qtd_itens)
                 )
 
         list_content.controls.append(ft.Container(height=60))
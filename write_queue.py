@@ -0,0 +1,205 @@
+"""
+Fila de escrita (write-behind) por sessão.
+
+Toques rápidos em checkboxes não viram uma requisição cada: as alterações
+são mescladas por item (o último valor vence) e gravadas em lote a cada
+`intervalo` segundos — itens com o mesmo patch (ex.: comprado=True) vão
+numa única requisição `update_items`. Falhas são re-enfileiradas e
+tentadas de novo com backoff exponencial.
+
+Limites:
+  - As pendências ficam na memória do processo e, com `armazenamento`
+    (client_storage), também no navegador: se a sessão cair ou o servidor
+    reiniciar, a próxima fila do mesmo usuário naquele navegador as regrava
+    (`carregar` + `retomar`). Sem armazenamento, somem com a sessão.
+  - Um item que falha MAX_TENTATIVAS vezes seguidas (ex.: excluído em outro
+    aparelho, e o UPDATE não altera nenhuma linha) é descartado e avisado
+    pelo `on_erro`.
+
+Deve ser usada de dentro do event loop (handlers async do Flet), exceto
+`carregar`, que lê o navegador de forma síncrona ao montar a tela.
+"""
+import json
+import asyncio
+import random
+from dataclasses import replace
+
+import database
+from sessao import usuario_da_sessao
+
+INTERVALO_FLUSH = 0.3
+BACKOFF_MAX = 30.0
+MAX_TENTATIVAS = 8
+_CHAVE_FILA = "listacompras.fila.{}"
+
+
+class FilaEscrita:
+    def __init__(self, user_id: str, intervalo: float = INTERVALO_FLUSH, on_erro=None, armazenamento=None):
+        self.user_id = user_id
+        self.intervalo = intervalo
+        self.on_erro = on_erro            # callback(qtd_pendentes, qtd_descartados) a cada lote que falha
+        self.armazenamento = armazenamento   # get/set como page.client_storage (opcional)
+        self._pendentes: dict[int, dict] = {}
+        self._em_voo: dict[int, dict] = {}   # lote sendo gravado agora
+        self._tentativas: dict[int, int] = {}
+        self._tarefa: asyncio.Task | None = None
+        self._salvando: asyncio.Task | None = None
+        self._sujo = False
+        self._falhas = 0
+        self.stats = {"enfileirados": 0, "mesclados": 0, "requisicoes": 0, "falhas": 0, "descartados": 0}
+
+    # ─── API ─────────────────────────────────────────────────────────────
+    def enfileirar(self, item_id: int, patch: dict):
+        """Agenda `patch` para o item; patches repetidos do mesmo item são mesclados."""
+        self.stats["enfileirados"] += 1
+        if item_id in self._pendentes:
+            self.stats["mesclados"] += 1
+        self._pendentes.setdefault(item_id, {}).update(patch)
+        self._salvar()
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.get_running_loop().create_task(self._loop())
+
+    def marcar_comprado(self, item_id: int, comprado: bool):
+        self.enfileirar(item_id, {"comprado": comprado})
+
+    def descartar(self, item_ids, campo: str):
+        """Esquece `campo` dos patches pendentes (uma gravação direta em lote o substitui)."""
+        for item_id in item_ids:
+            patch = self._pendentes.get(item_id)
+            if patch is not None:
+                patch.pop(campo, None)
+                if not patch:
+                    del self._pendentes[item_id]
+        self._salvar()
+
+    @property
+    def pendentes(self) -> int:
+        return len(self._pendentes)
+
+    def aplicar(self, itens: list) -> list:
+        """Sobrepõe as escritas ainda não confirmadas aos itens vindos do servidor."""
+        if not self._pendentes and not self._em_voo:
+            return itens
+        return [
+            replace(i, **{**self._em_voo.get(i.id, {}), **self._pendentes.get(i.id, {})})
+            if i.id in self._pendentes or i.id in self._em_voo else i
+            for i in itens
+        ]
+
+    async def flush(self):
+        """Grava imediatamente o que estiver pendente (ex.: ao sair da tela)."""
+        if self._pendentes:
+            await self._gravar_lote()
+
+    def carregar(self) -> int:
+        """Lê as pendências deixadas no navegador por uma sessão anterior. Retorna quantas."""
+        if self.armazenamento is None:
+            return 0
+        try:
+            salvo = self.armazenamento.get(_CHAVE_FILA.format(self.user_id))
+            for item_id, patch in (json.loads(salvo) if salvo else {}).items():
+                self._pendentes.setdefault(int(item_id), {}).update(patch)
+        except Exception as e:
+            print(f"[Fila] Pendências guardadas ilegíveis, ignoradas: {e}")
+        return len(self._pendentes)
+
+    async def retomar(self):
+        """Regrava as pendências carregadas (ver `carregar`)."""
+        if self._pendentes and (self._tarefa is None or self._tarefa.done()):
+            self._tarefa = asyncio.get_running_loop().create_task(self._loop())
+
+    # ─── Internos ────────────────────────────────────────────────────────
+    def _salvar(self):
+        """Agenda a cópia das pendências (inclusive o lote em voo) no navegador."""
+        if self.armazenamento is None:
+            return
+        self._sujo = True
+        if self._salvando is None or self._salvando.done():
+            self._salvando = asyncio.get_running_loop().create_task(self._loop_salvar())
+
+    async def _loop_salvar(self):
+        # Uma gravação por vez: o navegador sempre fica com o estado mais novo
+        while self._sujo:
+            self._sujo = False
+            estado: dict[str, dict] = {}
+            for fonte in (self._em_voo, self._pendentes):
+                for item_id, patch in fonte.items():
+                    estado.setdefault(str(item_id), {}).update(patch)
+            try:
+                # client_storage espera a resposta do navegador: fora do loop
+                await asyncio.to_thread(self.armazenamento.set, _CHAVE_FILA.format(self.user_id), json.dumps(estado))
+            except Exception as e:
+                print(f"[Fila] Não foi possível guardar as pendências no navegador: {e}")
+                return
+
+    async def _loop(self):
+        while self._pendentes:
+            await asyncio.sleep(self.intervalo)
+            if not await self._gravar_lote():
+                self._falhas += 1
+                espera = min(BACKOFF_MAX, self.intervalo * 2 ** self._falhas)
+                await asyncio.sleep(espera * random.uniform(0.5, 1.0))
+            else:
+                self._falhas = 0
+
+    async def _gravar_lote(self) -> bool:
+        lote, self._pendentes = self._pendentes, {}
+        if not lote:
+            return True
+
+        # Agrupa itens com patch idêntico: um UPDATE ... WHERE id IN (...) por grupo
+        grupos: dict[tuple, list[int]] = {}
+        for item_id, patch in lote.items():
+            grupos.setdefault(tuple(sorted(patch.items())), []).append(item_id)
+
+        chaves = list(grupos)
+        self.stats["requisicoes"] += len(chaves)
+        self._em_voo = lote
+        try:
+            resultados = await asyncio.gather(
+                *(database.update_items(grupos[k], dict(k), user_id=self.user_id) for k in chaves)
+            )
+        finally:
+            self._em_voo = {}
+
+        # update_items só confirma o lote se alguma linha mudou de fato
+        ok, descartados = True, 0
+        for k, sucesso in zip(chaves, resultados):
+            if sucesso:
+                for item_id in grupos[k]:
+                    self._tentativas.pop(item_id, None)
+                continue
+            ok = False
+            # Devolve à fila; escritas mais novas do mesmo item têm prioridade
+            for item_id in grupos[k]:
+                tentativas = self._tentativas.get(item_id, 0) + 1
+                if tentativas >= MAX_TENTATIVAS:
+                    self._tentativas.pop(item_id, None)
+                    descartados += 1
+                    continue
+                self._tentativas[item_id] = tentativas
+                self._pendentes[item_id] = {**dict(k), **self._pendentes.get(item_id, {})}
+        self._salvar()
+        if not ok:
+            self.stats["falhas"] += 1
+            self.stats["descartados"] += descartados
+            print(f"[Fila] Falha ao gravar lote; {len(self._pendentes)} item(ns) aguardando nova tentativa"
+                  + (f", {descartados} descartado(s) após {MAX_TENTATIVAS} tentativas." if descartados else "."))
+            if self.on_erro:
+                self.on_erro(len(self._pendentes), descartados)
+        return ok
+
+
+def fila_da_sessao(page) -> FilaEscrita:
+    """
+    Uma fila por sessão Flet — sobrevive à troca de rotas (views são
+    recriadas). Ao ser criada, regrava o que uma sessão anterior deixou
+    pendente neste navegador.
+    """
+    fila = page.session.get("fila_escrita")
+    if fila is None:
+        fila = FilaEscrita(usuario_da_sessao(page), armazenamento=page.client_storage)
+        if fila.carregar():
+            page.run_task(fila.retomar)
+        page.session.set("fila_escrita", fila)
+    return fila